@@ -0,0 +1,100 @@
+"""
+Benchmark field-level diffs of large checksum files.
+
+Two synthetic checksum files in the 1-0-0 schema format are generated, with
+a fraction of fields changed, added and removed. Streaming the files with
+diff_checksum_files is compared against loading both files with json.load
+and diffing the loaded checksums, for run time and peak memory (measured
+with tracemalloc).
+
+Usage:
+    python benchmarks/bench_checksum_diff.py --n-fields 200000 --n-timesteps 10
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from model_config_tests.checksum_diff import diff_checksum_files, diff_checksums
+
+
+def write_checksums(
+    path: Path, n_fields: int, n_timesteps: int, changed: float, seed: int
+) -> None:
+    """Write a checksum file, changing a fraction of the fields for seeds
+    other than 0"""
+    rng = random.Random(seed)
+    output = {}
+    for i in range(n_fields):
+        checksums = [str(hash((i, t)) & 0xFFFFFFFFFFFFFFFF) for t in range(n_timesteps)]
+        if seed and rng.random() < changed:
+            checksums[rng.randrange(n_timesteps)] = "0"
+        output[f"field_{i:07d}"] = checksums
+    if seed:
+        # Remove the first field and add a new one
+        output.pop("field_0000000")
+        output["new_field"] = ["0"] * n_timesteps
+    with open(path, "w") as f:
+        json.dump({"schema_version": "1-0-0", "output": output}, f, indent=2)
+
+
+def load_and_diff(expected_path: Path, produced_path: Path) -> dict:
+    """Baseline: load both files into memory before diffing"""
+    with open(expected_path) as f:
+        expected = json.load(f)
+    with open(produced_path) as f:
+        produced = json.load(f)
+    return diff_checksums(expected, produced)
+
+
+def measure(func, *args) -> tuple[float, float, dict]:
+    """Return the run time in seconds, peak traced memory in MiB and result.
+    Memory is traced in a separate call, as tracing slows the run down"""
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024**2, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--n-fields", type=int, default=200000)
+    parser.add_argument("--n-timesteps", type=int, default=10)
+    parser.add_argument("--changed", type=float, default=0.01)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        expected_path = Path(tmp_dir) / "expected.json"
+        produced_path = Path(tmp_dir) / "produced.json"
+        write_checksums(expected_path, args.n_fields, args.n_timesteps, 0, seed=0)
+        write_checksums(
+            produced_path, args.n_fields, args.n_timesteps, args.changed, seed=1
+        )
+        size_mb = expected_path.stat().st_size / 1024**2
+        print(f"Checksum files: {size_mb:.1f} MB, {args.n_fields} fields")
+
+        base_time, base_peak, base_report = measure(
+            load_and_diff, expected_path, produced_path
+        )
+        time_, peak, report = measure(diff_checksum_files, expected_path, produced_path)
+        assert report["changed"] == base_report["changed"]
+
+        print(
+            f"Changed: {report['n_changed']}, added: {report['n_added']}, "
+            f"removed: {report['n_removed']}"
+        )
+        print(f"json.load + diff:    {base_time:.2f} s, peak {base_peak:.1f} MiB")
+        print(f"diff_checksum_files: {time_:.2f} s, peak {peak:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark the checksum history database with many commits.
+
+Synthetic checksum sets are added for a sequence of commits, where each
+commit changes a few fields. Queries for the commits with a checksum digest
+and the first commit where a field changed are timed against scanning
+historical checksum files, which is what's needed without the database.
+
+Usage:
+    python benchmarks/bench_checksum_history.py --n-commits 500 --n-fields 2000
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from model_config_tests.checksum_digest import checksum_digest
+from model_config_tests.checksum_history import ChecksumHistory
+
+
+def generate_commits(n_commits: int, n_fields: int, n_changes: int) -> list[dict]:
+    """Return checksums for each commit, changing n_changes fields per commit"""
+    rng = random.Random(0)
+    output = {f"field_{i:05d}": [str(rng.getrandbits(63))] for i in range(n_fields)}
+    commits = []
+    for _ in range(n_commits):
+        output = dict(output)
+        for field in rng.sample(sorted(output), n_changes):
+            output[field] = [str(rng.getrandbits(63))]
+        commits.append({"schema_version": "1-0-0", "output": output})
+    return commits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--n-commits", type=int, default=500)
+    parser.add_argument("--n-fields", type=int, default=2000)
+    parser.add_argument("--n-changes", type=int, default=2)
+    parser.add_argument("--n-queries", type=int, default=20)
+    args = parser.parse_args()
+
+    commits = generate_commits(args.n_commits, args.n_fields, args.n_changes)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Write a historical checksum file for each commit
+        files = []
+        for i, checksums in enumerate(commits):
+            path = Path(tmp_dir) / f"{i:05d}" / "historical-3hr-checksum.json"
+            path.parent.mkdir()
+            with open(path, "w") as f:
+                json.dump(checksums, f, indent=2)
+            files.append(path)
+
+        db_path = Path(tmp_dir) / "history.sqlite"
+        start = time.perf_counter()
+        with ChecksumHistory(db_path) as history:
+            for i, path in enumerate(files):
+                history.ingest_file(path, "config", f"{i:05d}")
+        ingest_time = time.perf_counter() - start
+        print(
+            f"Ingested {args.n_commits} commits with {args.n_fields} fields in "
+            f"{ingest_time:.2f} s ({db_path.stat().st_size / 1024**2:.1f} MB)"
+        )
+
+        rng = random.Random(1)
+        digests = [checksum_digest(rng.choice(commits)) for _ in range(args.n_queries)]
+        fields = [f"field_{rng.randrange(args.n_fields):05d}" for _ in digests]
+
+        # Baseline: scan all the checksum files for each query
+        start = time.perf_counter()
+        for digest, field in zip(digests, fields):
+            previous = None
+            found_digest = found_change = False
+            for i, path in enumerate(files):
+                with open(path) as f:
+                    checksums = json.load(f)
+                found_digest |= checksum_digest(checksums) == digest
+                values = checksums["output"].get(field)
+                found_change |= i > 0 and values != previous
+                previous = values
+        scan_time = (time.perf_counter() - start) / len(digests)
+
+        start = time.perf_counter()
+        with ChecksumHistory(db_path) as history:
+            for digest, field in zip(digests, fields):
+                history.commits_with_digest(digest)
+                history.first_change("config", field)
+        query_time = (time.perf_counter() - start) / len(digests)
+
+        print(f"Scan files:      {scan_time * 1000:.1f} ms per digest + field query")
+        print(
+            f"ChecksumHistory: {query_time * 1000:.1f} ms per digest + field query "
+            f"({scan_time / query_time:.0f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark cloning a large synthetic configuration into experiment control
+directories.
+
+The synthetic configuration has large read-only forcing files, a large
+read-only git pack file and large manifests, similar to configurations that
+keep inputs in the control directory. Cloning with shutil.copytree is
+compared against clone_tree, which reflinks files, or otherwise hardlinks
+large read-only files.
+
+Usage:
+    python benchmarks/bench_clone_config.py --size-mb 2048 --n-exps 4
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from model_config_tests.util import clone_tree
+
+# Fractions of the configuration size in each type of file
+FORCING_FRACTION = 0.8
+GIT_PACK_FRACTION = 0.15
+MANIFEST_FRACTION = 0.05
+
+
+def write_file(path: Path, size: int, read_only: bool = False) -> None:
+    """Write a file of the given size in bytes"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    block = b"\1" * (1024 * 1024)
+    with open(path, "wb") as f:
+        for _ in range(size // len(block)):
+            f.write(block)
+        f.write(block[: size % len(block)])
+    if read_only:
+        path.chmod(0o444)
+
+
+def write_synthetic_config(path: Path, size_mb: int, n_forcing: int) -> None:
+    """Write a configuration of approximately size_mb"""
+    size = size_mb * 1024 * 1024
+    (path / "ocean").mkdir(parents=True)
+    (path / "config.yaml").write_text("model: access-om2\n")
+    (path / "accessom2.nml").write_text("&date_manager_nml\n/\n")
+    (path / "ocean" / "input.nml").write_text("&ocean_nml\n/\n")
+    for i in range(100):
+        (path / "ocean" / f"table_{i}").write_text("small read-only file\n")
+
+    for i in range(n_forcing):
+        write_file(
+            path / "INPUT" / f"forcing_{i}.nc",
+            int(size * FORCING_FRACTION / n_forcing),
+            read_only=True,
+        )
+    # Git writes pack files read-only
+    write_file(
+        path / ".git" / "objects" / "pack" / "pack-0.pack",
+        int(size * GIT_PACK_FRACTION),
+        read_only=True,
+    )
+    for name in ["input", "exe", "restart"]:
+        write_file(
+            path / "manifests" / f"{name}.yaml", int(size * MANIFEST_FRACTION / 3)
+        )
+
+
+def time_clones(clone_func, config: Path, tmp_dir: Path, n_exps: int) -> float:
+    """Return the wall time in seconds to clone the configuration n_exps times"""
+    dsts = [tmp_dir / f"exp_{i}" for i in range(n_exps)]
+    start = time.perf_counter()
+    for dst in dsts:
+        clone_func(config, dst)
+    seconds = time.perf_counter() - start
+    for dst in dsts:
+        shutil.rmtree(dst)
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=1024, help="Config size in MB")
+    parser.add_argument("--n-forcing", type=int, default=16, help="Forcing files")
+    parser.add_argument("--n-exps", type=int, default=4, help="Experiments to clone")
+    parser.add_argument("--tmp-dir", default=None, help="Directory for the clones")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.tmp_dir) as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        config = tmp_dir / "config"
+        write_synthetic_config(config, args.size_mb, args.n_forcing)
+
+        counts = clone_tree(config, tmp_dir / "counts")
+        shutil.rmtree(tmp_dir / "counts")
+
+        print(f"Synthetic config size: {args.size_mb} MB, experiments: {args.n_exps}")
+        print(f"clone_tree methods: {counts}")
+        for name, func in [
+            ("copytree", lambda src, dst: shutil.copytree(src, dst, symlinks=True)),
+            ("clone_tree", clone_tree),
+        ]:
+            seconds = time_clones(func, config, tmp_dir, args.n_exps)
+            print(f"{name:>10}: {seconds * 1000:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
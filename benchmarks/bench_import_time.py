@@ -0,0 +1,95 @@
+"""
+Benchmark the import time of the modules loaded when model-config-tests
+starts and pytest collects the configuration tests.
+
+Each module is imported in a fresh interpreter with `python -X importtime`,
+and the cumulative import time reported for the module is used. Modules
+with slow imports (e.g. netCDF4 and requests) that should only be imported
+on first use are also checked. The script exits with an error if the total
+import time is over the budget, or if any of those modules were imported.
+
+Usage:
+    python benchmarks/bench_import_time.py --budget-ms 120
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+# Modules that are always needed, which are imported first and not counted
+BASELINE_MODULES = ["pytest"]
+
+# Modules imported by the model-config-tests command and test collection
+MODULES = [
+    "model_config_tests.cmds.config_tests_cmd",
+    "model_config_tests.config_tests.conftest",
+    "model_config_tests.exp_test_helper",
+    "model_config_tests.config_tests.qa.test_config",
+    "model_config_tests.config_tests.test_bit_reproducibility",
+]
+
+# Modules that should only be imported when they are first used
+LAZY_MODULES = ["netCDF4", "requests", "jsonschema", "payu", "ruamel"]
+
+
+def import_times(modules: list[str]) -> tuple[dict[str, float], set[str]]:
+    """
+    Import modules in a fresh interpreter, returning the cumulative import
+    time in milliseconds of each module that wasn't already imported by a
+    previous module, and the names of all imported top-level packages
+    """
+    code = "; ".join(f"import {module}" for module in BASELINE_MODULES + modules)
+    code += "; import sys; print(' '.join(sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Only include modules imported at the top level, not as
+        # dependencies of other modules, so times aren't counted twice
+        if name[1:] in modules:
+            times[name[1:]] = int(cumulative) / 1000
+    packages = {name.split(".")[0] for name in result.stdout.split()}
+    return times, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--budget-ms", type=float, default=120)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = []
+    for _ in range(args.repeat):
+        times, packages = import_times(MODULES)
+        runs.append(times)
+
+    # The first module to import a dependency is charged for it, so the
+    # total is the sum over modules
+    totals = [sum(times.values()) for times in runs]
+    for module in MODULES:
+        median = statistics.median(times.get(module, 0) for times in runs)
+        print(f"{module}: {median:.1f} ms")
+    total = statistics.median(totals)
+    print(f"Total: {total:.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    errors = []
+    eager = sorted(set(LAZY_MODULES) & packages)
+    if eager:
+        errors.append(f"Modules that should be imported lazily: {', '.join(eager)}")
+    if total > args.budget_ms:
+        errors.append(f"Import time is over budget: {total:.1f} ms")
+    if errors:
+        sys.exit("\n".join(errors))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark MOM5 checksum extraction from large synthetic `<model>.out` logs.
+
+The synthetic log is built by repeating an example ACCESS-OM2 log from the
+test resources, so the mix of checksum and non-checksum lines is realistic.
+Throughput of the streaming scanner is reported next to the original
+line-by-line regex scan.
+
+Usage:
+    python benchmarks/bench_mom5_extract_checksums.py --size-mb 2048
+"""
+
+import argparse
+import re
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from model_config_tests.models.mom5 import mom5_extract_checksums
+
+HERE = Path(__file__).parent
+EXAMPLE_LOG = (
+    HERE.parent / "tests" / "resources" / "access-om2" / "output000" / "access-om2.out"
+)
+
+
+def line_by_line_extract_checksums(output_filename):
+    """Original implementation: run the regex on every line of the file"""
+    pattern = r"\[chksum\]\s+(.+)\s+(-?\d+)"
+    output_checksums = defaultdict(list)
+    with open(output_filename) as f:
+        for line in f:
+            match = re.match(pattern, line)
+            if match:
+                field = match.group(1).strip()
+                checksum = match.group(2).strip()
+                output_checksums[field].append(checksum)
+    return output_checksums
+
+
+def write_synthetic_log(path: Path, size_mb: int) -> int:
+    """Write a log of approximately size_mb by repeating the example log"""
+    example = EXAMPLE_LOG.read_bytes()
+    target = size_mb * 1024 * 1024
+    written = 0
+    with open(path, "wb") as f:
+        while written < target:
+            f.write(example)
+            written += len(example)
+    return written
+
+
+def time_extract(func, path: Path, size: int, repeat: int) -> float:
+    """Return the best throughput in MB/s over repeated runs"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(path)
+        best = min(best, time.perf_counter() - start)
+    return size / (1024 * 1024) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=256, help="Log size in MB")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per method")
+    parser.add_argument("--tmp-dir", default=None, help="Directory for the log")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.tmp_dir) as tmp_dir:
+        path = Path(tmp_dir) / "access-om2.out"
+        size = write_synthetic_log(path, args.size_mb)
+
+        # Check both methods agree before timing
+        assert dict(mom5_extract_checksums(path)) == dict(
+            line_by_line_extract_checksums(path)
+        )
+
+        print(f"Synthetic log size: {size / (1024 * 1024):.0f} MB")
+        for name, func in [
+            ("line-by-line regex", line_by_line_extract_checksums),
+            ("streaming scanner", mom5_extract_checksums),
+        ]:
+            throughput = time_extract(func, path, size, args.repeat)
+            print(f"{name:>20}: {throughput:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
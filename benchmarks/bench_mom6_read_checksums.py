@@ -0,0 +1,106 @@
+"""
+Benchmark reading the checksum attributes of MOM6 restart files.
+
+Synthetic restart files are generated with many 3D variables that each
+have a checksum attribute, in netCDF classic (64-bit offset and CDF-5) and
+netCDF4 formats. The variables are record variables and no data is written,
+so the files are extended to the requested size as sparse files and can be
+generated quickly. Reading the attributes from the file
+metadata with mom6_read_checksums is compared against the original approach
+of opening each file with netCDF4.Dataset and walking all the variables.
+
+Usage:
+    python benchmarks/bench_mom6_read_checksums.py --size-mb 4096 --n-files 4
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import netCDF4
+
+from model_config_tests.models.mom6 import mom6_read_checksums
+
+FORMATS = ["NETCDF3_64BIT_OFFSET", "NETCDF3_64BIT_DATA", "NETCDF4"]
+
+
+def write_restart(path: Path, file_format: str, size_mb: int, n_vars: int) -> None:
+    """Write a restart file with n_vars variables, extended to size_mb"""
+    with netCDF4.Dataset(path, "w", format=file_format) as ds:
+        ds.createDimension("Time", None)
+        ds.createDimension("Layer", 75)
+        ds.createDimension("lath", 1080)
+        ds.createDimension("lonh", 1440)
+        time_var = ds.createVariable("Time", "f8", ("Time",))
+        time_var.units = "days"
+        for i in range(n_vars):
+            var = ds.createVariable(
+                f"var_{i:03d}", "f8", ("Time", "Layer", "lath", "lonh")
+            )
+            var.long_name = f"Variable {i}"
+            var.units = "m s-1"
+            var.checksum = f"{i:016X}"
+    # Extend the file without writing any data
+    with open(path, "r+b") as f:
+        f.truncate(max(size_mb * 1024**2, f.seek(0, 2)))
+
+
+def dataset_read_checksums(restart: Path) -> dict[str, str]:
+    """Original implementation: open the file with netCDF4.Dataset"""
+    checksums = {}
+    with netCDF4.Dataset(restart, "r") as rootgrp:
+        for vname in sorted(rootgrp.variables):
+            var = rootgrp[vname]
+            if "checksum" in var.ncattrs():
+                checksums[vname.strip()] = var.checksum.strip()
+    return checksums
+
+
+def best_time(func, paths: list[Path], repeat: int) -> float:
+    """Return the best wall time in seconds to read all files"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in paths:
+            func(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--size-mb", type=int, default=4096)
+    parser.add_argument("--n-vars", type=int, default=200)
+    parser.add_argument("--n-files", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for file_format in FORMATS:
+            paths = []
+            for i in range(args.n_files):
+                path = Path(tmp_dir) / f"{file_format}.{i}.nc"
+                write_restart(path, file_format, args.size_mb, args.n_vars)
+                paths.append(path)
+
+            assert all(
+                mom6_read_checksums(path) == dataset_read_checksums(path)
+                for path in paths
+            )
+            size_gb = paths[0].stat().st_size / 1024**3
+            print(
+                f"{file_format}: {args.n_files} files of {size_gb:.1f} GB, "
+                f"{args.n_vars} variables"
+            )
+            baseline = best_time(dataset_read_checksums, paths, args.repeat)
+            elapsed = best_time(mom6_read_checksums, paths, args.repeat)
+            print(f"  netCDF4.Dataset:     {baseline * 1000:.1f} ms")
+            print(
+                f"  mom6_read_checksums: {elapsed * 1000:.1f} ms "
+                f"({baseline / elapsed:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark setting variables in a large Fortran namelist.
+
+A synthetic namelist similar to the UM `namelists` file is generated with
+many groups and variables. Patching only the assignment lines in place is
+compared against the original approach of fully parsing the namelist with
+f90nml, updating it and writing it back out.
+
+Usage:
+    python benchmarks/bench_patch_namelist.py --n-groups 200 --n-variables 50
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import f90nml
+
+from model_config_tests.config_patch import patch_namelist
+
+PATCH = {
+    "NLSTCGEN": {"DUMPFREQim": [48, 0, 0, 0]},
+    "setup_nml": {"dumpfreq": "d"},
+}
+
+
+def write_synthetic_namelist(path: Path, n_groups: int, n_variables: int) -> None:
+    """Write a namelist with n_groups groups of n_variables variables"""
+    lines = []
+    for group in ["NLSTCGEN", "setup_nml"] + [f"group_{i}" for i in range(n_groups)]:
+        lines.append(f"&{group}\n")
+        for i in range(n_variables):
+            lines.append(f" var_{i}= {i} , {i * 2} , {i * 3} ,\n")
+            lines.append(f" str_{i}='value {i}',\n")
+        if group == "NLSTCGEN":
+            lines.append(" DUMPFREQim= 0 , 0 , 0 , 1 ,\n")
+        if group == "setup_nml":
+            lines.append("  , dumpfreq = 'm'   ! restart frequency\n")
+        lines.append("/\n")
+    path.write_text("".join(lines))
+
+
+def read_write_namelist(path: Path, patch: dict) -> None:
+    """Original implementation: parse, update and write the namelist"""
+    with open(path) as f:
+        nml = f90nml.read(f)
+    for group, values in patch.items():
+        for name, value in values.items():
+            nml[group][name] = value
+    nml.write(path, force=True)
+
+
+def time_patch(func, path: Path, contents: str, repeat: int) -> float:
+    """Return the best wall time in seconds over repeated runs"""
+    best = float("inf")
+    for _ in range(repeat):
+        path.write_text(contents)
+        start = time.perf_counter()
+        func(path, PATCH)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--n-groups", type=int, default=100, help="Namelist groups")
+    parser.add_argument("--n-variables", type=int, default=50, help="Group variables")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per method")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "namelists"
+        write_synthetic_namelist(path, args.n_groups, args.n_variables)
+        contents = path.read_text()
+
+        # Check both methods agree before timing
+        patch_namelist(path, PATCH)
+        patched = f90nml.read(path)
+        path.write_text(contents)
+        read_write_namelist(path, PATCH)
+        assert patched == f90nml.read(path)
+
+        n_lines = len(contents.splitlines())
+        print(f"Synthetic namelist: {n_lines} lines, {len(contents) / 1024:.0f} KB")
+        for name, func in [
+            ("read and write", read_write_namelist),
+            ("patch lines", patch_namelist),
+        ]:
+            seconds = time_patch(func, path, contents, args.repeat)
+            print(f"{name:>15}: {seconds * 1000:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Benchmark parsing qstat json output for job states.
+
+A recorded `qstat -x -f -F json` output can be given with --qstat-json,
+otherwise a synthetic output is generated with full job records similar to
+those reported on Gadi. The original approach of parsing the output for all
+jobs is compared against parsing only the job records of the tracked jobs,
+with the unused fields of each record discarded once it has been parsed.
+The output is not parsed incrementally, so discarding fields only reduces
+the memory kept for the parsed output.
+
+Usage:
+    python benchmarks/bench_qstat_parse.py --n-jobs 20000 --n-tracked 4
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from model_config_tests.util import _slim_job_record, extract_job_info
+
+
+def synthetic_job_record(i: int) -> dict:
+    """Return a full qstat job record"""
+    return {
+        "Job_Name": f"test_jobname_{i}",
+        "Job_Owner": "abc123@gadi-login-01.gadi.nci.org.au",
+        "resources_used": {
+            "cpupercent": 9876,
+            "cput": "123:45:06",
+            "jobfs": "0b",
+            "mem": "75520704kb",
+            "ncpus": 240,
+            "vmem": "75520704kb",
+            "walltime": "00:41:21",
+        },
+        "job_state": "F" if i % 3 else "R",
+        "queue": "normal-exec",
+        "server": "gadi-pbs-01.gadi.nci.org.au",
+        "Checkpoint": "u",
+        "ctime": "Thu Apr 10 16:01:02 2025",
+        "Error_Path": f"gadi.nci.org.au:/home/123/abc123/control/job.e{i}",
+        "exec_host": "/".join(f"gadi-cpu-clx-{n:04d}/0*48" for n in range(5)),
+        "exec_vnode": "+".join(
+            f"(gadi-cpu-clx-{n:04d}:ncpus=48:mem=195035136kb)" for n in range(5)
+        ),
+        "Hold_Types": "n",
+        "Join_Path": "n",
+        "Keep_Files": "n",
+        "Mail_Points": "a",
+        "mtime": "Thu Apr 10 16:43:00 2025",
+        "Output_Path": f"gadi.nci.org.au:/home/123/abc123/control/job.o{i}",
+        "Priority": 0,
+        "qtime": "Thu Apr 10 16:01:02 2025",
+        "Rerunable": "False",
+        "Resource_List": {
+            "jobfs": "629145600b",
+            "mem": "1073741823996b",
+            "mpiprocs": 240,
+            "ncpus": 240,
+            "nodect": 5,
+            "place": "free",
+            "select": "5:ncpus=48:mem=195035136kb:mpiprocs=48",
+            "storage": "gdata/tm70+gdata/vk83+scratch/tm70",
+            "walltime": "03:00:00",
+            "wd": 1,
+        },
+        "stime": "Thu Apr 10 16:01:39 2025",
+        "session_id": 1234567,
+        "Variable_List": {
+            "PBS_O_HOME": "/home/123/abc123",
+            "PBS_O_PATH": ":".join(f"/apps/tool{n}/bin" for n in range(30)),
+            "PBS_O_WORKDIR": "/home/123/abc123/control",
+            "PBS_O_QUEUE": "normal",
+        },
+        "comment": "Job run at Thu Apr 10 at 16:01 on (gadi-cpu-clx-0001:ncpus=48)",
+        "etime": "Thu Apr 10 16:01:02 2025",
+        "Exit_status": 0,
+        "project": "tm70",
+    }
+
+
+def synthetic_qstat_json(n_jobs: int) -> dict:
+    """Return qstat json output for n_jobs jobs"""
+    return {
+        "timestamp": 1744267002,
+        "pbs_version": "2024.1.1",
+        "pbs_server": "gadi-pbs-01.gadi.nci.org.au",
+        "Jobs": {f"{i}.gadi-pbs": synthetic_job_record(i) for i in range(n_jobs)},
+    }
+
+
+def parse_all_jobs(output: str) -> dict:
+    """Original implementation: parse the full output for all jobs"""
+    return extract_job_info(json.loads(output))
+
+
+def parse_tracked_jobs(output: str) -> dict:
+    """Parse output for tracked jobs, discarding unused fields"""
+    return extract_job_info(json.loads(output, object_pairs_hook=_slim_job_record))
+
+
+def time_parse(func, output: str, repeat: int) -> float:
+    """Return the best wall time in seconds over repeated runs"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(output)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--qstat-json", type=Path, help="Recorded qstat output")
+    parser.add_argument("--n-jobs", type=int, default=10000, help="Synthetic jobs")
+    parser.add_argument("--n-tracked", type=int, default=4, help="Tracked jobs")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per method")
+    args = parser.parse_args()
+
+    if args.qstat_json:
+        qstat_json = json.loads(args.qstat_json.read_text())
+    else:
+        qstat_json = synthetic_qstat_json(args.n_jobs)
+
+    # Output of a targeted query is the same document with only tracked jobs
+    tracked_ids = list(qstat_json["Jobs"])[-args.n_tracked :]
+    tracked_json = dict(qstat_json)
+    tracked_json["Jobs"] = {
+        job_id: qstat_json["Jobs"][job_id] for job_id in tracked_ids
+    }
+
+    all_output = json.dumps(qstat_json, indent=4)
+    tracked_output = json.dumps(tracked_json, indent=4)
+
+    # Check both methods agree on the tracked jobs before timing
+    all_jobs = parse_all_jobs(all_output)
+    tracked_jobs = parse_tracked_jobs(tracked_output)
+    assert tracked_jobs == {job_id: all_jobs[job_id] for job_id in tracked_ids}
+
+    print(f"Jobs in output: {len(qstat_json['Jobs'])}, tracked: {len(tracked_ids)}")
+    for name, func, output in [
+        ("all jobs", parse_all_jobs, all_output),
+        ("all jobs (slim)", parse_tracked_jobs, all_output),
+        ("tracked jobs", parse_tracked_jobs, tracked_output),
+    ]:
+        seconds = time_parse(func, output, args.repeat)
+        size_mb = len(output) / (1024 * 1024)
+        print(f"{name:>16}: {size_mb:8.2f} MB {seconds * 1000:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
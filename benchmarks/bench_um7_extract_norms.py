@@ -0,0 +1,97 @@
+"""
+Benchmark UM7 'Final Absolute Norm' extraction from large synthetic logs.
+
+The synthetic `atm.fort6.pe0` log is built by repeating an example
+ACCESS-ESM1.6 AMIP log from the test resources. The memory-mapped reverse
+scan is compared against the original forward scan over every line.
+
+Usage:
+    python benchmarks/bench_um7_extract_norms.py --size-mb 2048
+"""
+
+import argparse
+import re
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from model_config_tests.models.um7 import (
+    DEFAULT_N_NORMS,
+    FINAL_ABSOLUTE_NORM,
+    um7_extract_norms,
+)
+
+HERE = Path(__file__).parent
+EXAMPLE_LOG = (
+    HERE.parent
+    / "tests"
+    / "resources"
+    / "access-esm1.6"
+    / "amip-output000"
+    / "atmosphere"
+    / "atm.fort6.pe0"
+)
+
+
+def forward_extract_norms(output_filename, n_norms=DEFAULT_N_NORMS):
+    """Original implementation: run the regex on every line of the file"""
+    pattern = rf"\s*{FINAL_ABSOLUTE_NORM}\s+:\s+(\d+\.?\d*E?-?\d*)"
+    output_norms = defaultdict(list)
+    with open(output_filename) as f:
+        for line in f:
+            match = re.match(pattern, line)
+            if match:
+                output_norms[FINAL_ABSOLUTE_NORM].append(match.group(1).strip())
+    if FINAL_ABSOLUTE_NORM in output_norms:
+        output_norms[FINAL_ABSOLUTE_NORM] = output_norms[FINAL_ABSOLUTE_NORM][-n_norms:]
+    return output_norms
+
+
+def write_synthetic_log(path: Path, size_mb: int) -> int:
+    """Write a log of approximately size_mb by repeating the example log"""
+    example = EXAMPLE_LOG.read_bytes()
+    target = size_mb * 1024 * 1024
+    written = 0
+    with open(path, "wb") as f:
+        while written < target:
+            f.write(example)
+            written += len(example)
+    return written
+
+
+def time_extract(func, path: Path, repeat: int) -> float:
+    """Return the best wall time in seconds over repeated runs"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=256, help="Log size in MB")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per method")
+    parser.add_argument("--tmp-dir", default=None, help="Directory for the log")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.tmp_dir) as tmp_dir:
+        path = Path(tmp_dir) / "atm.fort6.pe0"
+        size = write_synthetic_log(path, args.size_mb)
+
+        # Check both methods agree before timing
+        assert dict(um7_extract_norms(path)) == dict(forward_extract_norms(path))
+
+        print(f"Synthetic log size: {size / (1024 * 1024):.0f} MB")
+        for name, func in [
+            ("forward scan", forward_extract_norms),
+            ("mmap reverse scan", um7_extract_norms),
+        ]:
+            seconds = time_extract(func, path, args.repeat)
+            print(f"{name:>18}: {seconds * 1000:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
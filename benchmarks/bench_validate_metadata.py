@@ -0,0 +1,108 @@
+"""
+Benchmark validating many metadata files against one JSON schema.
+
+A synthetic schema similar to the ACCESS-NRI experiment metadata schema is
+generated, along with a valid metadata document for each configuration.
+Calling jsonschema.validate for each document, which checks the schema and
+builds a new validator every call, is compared against reusing a validator
+cached by the schema digest, and validating all documents in one batch.
+
+Usage:
+    python benchmarks/bench_validate_metadata.py --n-configs 100
+"""
+
+import argparse
+import time
+
+import jsonschema
+
+from model_config_tests.schema_validation import validate, validate_many
+
+
+def make_schema(n_properties: int) -> dict:
+    """Return a schema with string, enum, array and nested object fields"""
+    properties = {}
+    for i in range(n_properties):
+        properties[f"text_{i}"] = {"type": "string", "minLength": 1}
+        properties[f"enum_{i}"] = {"enum": ["ocean", "atmosphere", "land", "seaIce"]}
+        properties[f"list_{i}"] = {
+            "type": "array",
+            "items": {"type": "string", "pattern": "^[A-Za-z0-9_-]+$"},
+        }
+        properties[f"object_{i}"] = {
+            "type": "object",
+            "properties": {
+                "url": {"type": "string", "format": "uri"},
+                "version": {"type": "string"},
+            },
+            "additionalProperties": False,
+        }
+    return {
+        "$schema": "https://json-schema.org/draft/2020-12/schema",
+        "type": "object",
+        "properties": properties,
+        "additionalProperties": False,
+    }
+
+
+def make_metadata(n_properties: int, index: int) -> dict:
+    metadata = {}
+    for i in range(n_properties):
+        metadata[f"text_{i}"] = f"configuration {index}"
+        metadata[f"enum_{i}"] = "ocean"
+        metadata[f"list_{i}"] = ["ocean", f"config_{index}"]
+        metadata[f"object_{i}"] = {
+            "url": "https://github.com/ACCESS-NRI/model-config-tests",
+            "version": f"1.{index}",
+        }
+    return metadata
+
+
+def best_time(func, repeat: int) -> float:
+    """Return the best wall time in seconds over repeated runs"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--n-configs", type=int, default=100)
+    parser.add_argument("--n-properties", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    schema = make_schema(args.n_properties)
+    documents = {
+        f"config_{i}/metadata.yaml": make_metadata(args.n_properties, i)
+        for i in range(args.n_configs)
+    }
+
+    def validate_each():
+        for document in documents.values():
+            # Each configuration gets a freshly parsed schema, as in the tests
+            jsonschema.validate(instance=document, schema=dict(schema))
+
+    def validate_cached():
+        for document in documents.values():
+            validate(instance=document, schema=dict(schema))
+
+    def validate_batch():
+        assert not validate_many(documents, schema)
+
+    print(f"{args.n_configs} metadata files, {4 * args.n_properties} fields")
+    baseline = best_time(validate_each, args.repeat)
+    print(f"jsonschema.validate each: {baseline * 1000:.1f} ms")
+    for label, func in [
+        ("cached validator each", validate_cached),
+        ("validate_many batch", validate_batch),
+    ]:
+        elapsed = best_time(func, args.repeat)
+        print(f"{label}: {elapsed * 1000:.1f} ms ({baseline / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+# Copyright 2024 ACCESS-NRI and contributors. See the top-level COPYRIGHT file for details.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Local cache for files downloaded by the QA tests (e.g. the experiment
+metadata schema and licence text)"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import warnings
+from pathlib import Path
+from typing import Any, Optional
+
+# Environment variables used to configure the cache
+ARTIFACT_CACHE_DIR_ENV = "MODEL_CONFIG_TESTS_CACHE_DIR"
+ARTIFACT_CACHE_OFFLINE_ENV = "MODEL_CONFIG_TESTS_OFFLINE"
+ARTIFACT_CACHE_TTL_ENV = "MODEL_CONFIG_TESTS_CACHE_TTL"
+
+# Time after which cached files that are not pinned are downloaded again
+DEFAULT_ARTIFACT_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+DOWNLOAD_TIMEOUT_SECONDS = 30
+
+
+def default_cache_dir() -> Path:
+    """Return the default cache directory, under $XDG_CACHE_HOME or ~/.cache"""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "model-config-tests" / "artifacts"
+
+
+def _sha256(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+class ArtifactCache:
+    """
+    Downloaded files stored by the SHA-256 digest of their content.
+
+    The cache directory contains a blobs/<digest> file for each distinct
+    content, and a urls/<digest of URL>.json record of the content digest
+    and download time for each URL. Files are only written atomically, so a
+    cache directory can be shared between processes, pre-seeded with add(),
+    or vendored and used in offline mode.
+
+    Parameters
+    ----------
+    cache_dir: Path
+        The cache directory
+    ttl: Optional[float]
+        Seconds after which files that are not pinned are downloaded again.
+        If None, cached files never expire
+    offline: bool
+        Never download files. Cached files are used regardless of their
+        age, and an error is raised for files that are not in the cache
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        ttl: Optional[float] = DEFAULT_ARTIFACT_CACHE_TTL_SECONDS,
+        offline: bool = False,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.offline = offline
+
+    @classmethod
+    def from_environment(
+        cls, cache_dir: Optional[Path] = None, offline: bool = False
+    ) -> "ArtifactCache":
+        """
+        Create a cache configured by environment variables, unless the
+        cache directory or offline mode are given explicitly
+        """
+        if cache_dir is None:
+            cache_dir = os.environ.get(ARTIFACT_CACHE_DIR_ENV) or default_cache_dir()
+        offline = offline or os.environ.get(ARTIFACT_CACHE_OFFLINE_ENV, "").lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+        ttl = os.environ.get(ARTIFACT_CACHE_TTL_ENV)
+        ttl = float(ttl) if ttl else DEFAULT_ARTIFACT_CACHE_TTL_SECONDS
+        return cls(cache_dir, ttl=ttl, offline=offline)
+
+    def get(self, url: str, pinned: bool = False) -> bytes:
+        """
+        Return the content of the URL, downloading it if it is not cached
+        or has expired. If downloading an expired file fails, the cached
+        content is used with a warning.
+
+        Parameters
+        ----------
+        url: str
+            The URL to download
+        pinned: bool
+            Whether the content of the URL never changes (e.g. a file at a
+            specific git commit), so cached content never expires
+        """
+        record = self._read_record(url)
+        content = self._read_blob(record["sha256"]) if record else None
+        if content is not None and (
+            pinned or self.offline or not self._expired(record)
+        ):
+            return content
+
+        if self.offline:
+            raise RuntimeError(
+                f"{url} is not in the artifact cache {self.cache_dir}, and "
+                "downloads are disabled in offline mode"
+            )
+
+        # Only import requests when downloading, as it is slow to import
+        import requests
+
+        try:
+            downloaded = self._download(url)
+        except (requests.RequestException, RuntimeError) as e:
+            if content is None:
+                raise RuntimeError(f"Failed to download {url}: {e}") from e
+            warnings.warn(f"Failed to download {url}, using cached copy: {e}")
+            return content
+
+        try:
+            self.add(url, downloaded)
+        except OSError as e:
+            # The cache is an optimisation, so failing to write it (e.g. to
+            # a read-only vendored cache) only raises a warning
+            warnings.warn(f"Failed to write artifact cache {self.cache_dir}: {e}")
+        return downloaded
+
+    def cached(self, url: str, pinned: bool = False) -> Optional[bytes]:
+        """Return the cached content of the URL without downloading it, or
+        None if it is not cached or has expired"""
+        record = self._read_record(url)
+        if record is None or not (pinned or self.offline or not self._expired(record)):
+            return None
+        return self._read_blob(record["sha256"])
+
+    def get_text(self, url: str, pinned: bool = False) -> str:
+        """Return the content of the URL decoded as UTF-8 text"""
+        return self.get(url, pinned=pinned).decode("utf-8")
+
+    def get_json(self, url: str, pinned: bool = False) -> Any:
+        """Return the content of the URL parsed as JSON"""
+        return json.loads(self.get(url, pinned=pinned))
+
+    def add(self, url: str, content: bytes) -> str:
+        """Store the content for the URL, returning its SHA-256 digest"""
+        digest = _sha256(content)
+        blob_path = self._blob_path(digest)
+        if not blob_path.exists():
+            self._write(blob_path, content)
+        record = {"url": url, "sha256": digest, "fetched": time.time()}
+        self._write(self._record_path(url), json.dumps(record).encode())
+        return digest
+
+    def _download(self, url: str) -> bytes:
+        import requests
+
+        response = requests.get(url, timeout=DOWNLOAD_TIMEOUT_SECONDS)
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP status {response.status_code}")
+        return response.content
+
+    def _expired(self, record: dict) -> bool:
+        return self.ttl is not None and time.time() - record["fetched"] > self.ttl
+
+    def _record_path(self, url: str) -> Path:
+        return self.cache_dir / "urls" / f"{_sha256(url.encode())}.json"
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.cache_dir / "blobs" / digest
+
+    def _read_record(self, url: str) -> Optional[dict]:
+        try:
+            with open(self._record_path(url)) as f:
+                record = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if record.get("url") != url:
+            return None
+        return record
+
+    def _read_blob(self, digest: str) -> Optional[bytes]:
+        """Read the content for a digest, or None if it is missing or
+        doesn't match the digest"""
+        try:
+            content = self._blob_path(digest).read_bytes()
+        except OSError:
+            return None
+        return content if _sha256(content) == digest else None
+
+    def _write(self, path: Path, content: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}")
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
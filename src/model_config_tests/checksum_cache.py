@@ -0,0 +1,163 @@
+# Copyright 2024 ACCESS-NRI and contributors. See the top-level COPYRIGHT file for details.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Persistent cache for checksums extracted from experiment output"""
+
+import contextlib
+import copy
+import json
+import os
+import threading
+import warnings
+from pathlib import Path
+from typing import Any, Optional
+
+# Name of the cache sidecar file stored in the experiment archive
+CHECKSUM_CACHE_FILENAME = "checksum-cache.json"
+
+# Version of the cache file layout. Cache files with a different version
+# are discarded
+CHECKSUM_CACHE_VERSION = 1
+
+
+def file_identity(path: Path) -> list:
+    """
+    Return the identity of a file used to detect changes: the path, size,
+    modification time (in nanoseconds) and inode number
+    """
+    stat = os.stat(path)
+    return [str(path), stat.st_size, stat.st_mtime_ns, stat.st_ino]
+
+
+class ChecksumCache:
+    """
+    Cache of extracted checksums stored as a JSON sidecar file.
+
+    Entries are keyed by a string (e.g. the extraction type, output directory
+    and schema version) and are only returned while the identities of the
+    files the checksums were extracted from are unchanged.
+
+    Parameters
+    ----------
+    cache_path: Path
+        The path to the JSON cache file
+    """
+
+    def __init__(self, cache_path: Path):
+        self.cache_path = cache_path
+        self._entries = None
+        # Keys set by this instance that have not been written to file yet
+        self._updated = set()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, files: list[Path]) -> Optional[Any]:
+        """
+        Return the cached checksums for the key, or None if there is no entry
+        or any of the files have changed since the entry was stored
+        """
+        try:
+            identities = [file_identity(file) for file in files]
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            entry = self._load().get(key)
+            if entry is None or entry["files"] != identities:
+                return None
+            # Copy so callers can't modify the cached checksums
+            return copy.deepcopy(entry["checksums"])
+
+    def set(self, key: str, files: list[Path], checksums: Any) -> None:
+        """Store checksums for the key and save the cache file"""
+        try:
+            identities = [file_identity(file) for file in files]
+        except FileNotFoundError:
+            return
+
+        with self._lock:
+            self._load()[key] = {
+                "files": identities,
+                "checksums": copy.deepcopy(checksums),
+            }
+            self._updated.add(key)
+            self._save()
+
+    def clear(self) -> None:
+        """Remove all cached entries and the cache file"""
+        with self._lock:
+            self._entries = {}
+            self._updated = set()
+            self.cache_path.unlink(missing_ok=True)
+
+    def _load(self) -> dict:
+        """Read cache entries from file, if not already loaded"""
+        if self._entries is None:
+            self._entries = self._read()
+        return self._entries
+
+    def _read(self) -> dict:
+        """Return the cache entries in the file, or no entries if the file
+        doesn't exist, is corrupt or has a different version"""
+        try:
+            with open(self.cache_path) as f:
+                content = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+        if (
+            isinstance(content, dict)
+            and content.get("version") == CHECKSUM_CACHE_VERSION
+        ):
+            return content.get("entries", {})
+        return {}
+
+    def _save(self) -> None:
+        """
+        Write cache entries to file. The cache may be shared with other
+        instances or processes, so the file is locked and re-read, and the
+        entries set by this instance are merged into it before it is
+        replaced. The cache is an optimisation, so failing to write it only
+        raises a warning
+        """
+        tmp_path = self.cache_path.with_name(
+            f".{self.cache_path.name}.{os.getpid()}.{threading.get_ident()}"
+        )
+        lock_path = self.cache_path.with_name(f".{self.cache_path.name}.lock")
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with _file_lock(lock_path):
+                entries = {
+                    **self._entries,
+                    **self._read(),
+                    **{key: self._entries[key] for key in self._updated},
+                }
+                content = {"version": CHECKSUM_CACHE_VERSION, "entries": entries}
+                with open(tmp_path, "w") as f:
+                    json.dump(content, f)
+                # Atomically replace the cache file
+                os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            warnings.warn(f"Failed to write checksum cache {self.cache_path}: {e}")
+            return
+
+        self._entries = entries
+        self._updated = set()
+
+
+@contextlib.contextmanager
+def _file_lock(lock_path: Path):
+    """Hold an exclusive lock on a lock file, shared between processes.
+    Without fcntl (e.g. on Windows), only the lock file is created"""
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None
+
+    with open(lock_path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,350 @@
+# Copyright 2024 ACCESS-NRI and contributors. See the top-level COPYRIGHT file for details.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Field-level comparison of checksums in the 1-0-0 checksum schema format"""
+
+import hashlib
+import json
+import re
+from collections.abc import Callable, Iterable, Iterator
+from pathlib import Path
+from typing import Any, BinaryIO, Optional
+
+from model_config_tests.models.model import SCHEMA_VERSION_1_0_0
+from model_config_tests.util import READ_BLOCK_SIZE
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+# Size of blocks read when re-reading a single field (64 KiB)
+FIELD_READ_BLOCK_SIZE = 64 * 1024
+DECODER = json.JSONDecoder()
+
+
+class JsonStream:
+    """
+    Incremental reader for a JSON document, so the members of large objects
+    can be read one at a time. Only a block of the file is held in memory,
+    apart from any single value that is larger than a block.
+
+    The file is decoded as latin-1 so positions in the buffer are byte
+    offsets in the file, and any non-ASCII strings are re-decoded as UTF-8.
+
+    Parameters
+    ----------
+    f: BinaryIO
+        The file, opened in binary mode
+    offset: int
+        Byte offset in the file to start reading from
+    block_size: int
+        Size of the blocks read from the file
+    """
+
+    def __init__(self, f: BinaryIO, offset: int = 0, block_size: int = READ_BLOCK_SIZE):
+        self.f = f
+        self.f.seek(offset)
+        self.block_size = block_size
+        self.buffer = ""
+        self.pos = 0
+        # Byte offset in the file of the start of the buffer
+        self.base = offset
+        self.eof = False
+        self.ascii = True
+
+    def offset(self) -> int:
+        """Return the byte offset in the file of the current position"""
+        return self.base + self.pos
+
+    def _fill(self) -> bool:
+        """Read the next block, dropping the consumed part of the buffer.
+        Returns False at the end of the file"""
+        if self.eof:
+            return False
+        data = self.f.read(self.block_size)
+        if not data:
+            self.eof = True
+            return False
+        self.base += self.pos
+        self.buffer = self.buffer[self.pos :] + data.decode("latin-1")
+        self.pos = 0
+        # Strings only need to be re-decoded if there are non-ASCII bytes
+        self.ascii = self.buffer.isascii()
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character, or an empty
+        string at the end of the file"""
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos : self.pos + 1]
+
+    def expect(self, char: str) -> None:
+        """Consume the next character, which must be char"""
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at byte {self.offset()}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next value"""
+        self.peek()
+        while True:
+            try:
+                value, end = DECODER.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                if self._fill():
+                    continue
+                raise ValueError(f"Invalid JSON at byte {self.offset()}: {e}")
+            # A number at the end of the buffer may continue in the next block
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value if self.ascii else _decode_utf8(value)
+
+    def members(self) -> Iterator[str]:
+        """
+        Iterate over the keys of the next object. The stream is left at the
+        start of each member's value, which must be consumed (e.g. with
+        value) before the next key is read
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError(f"Expected an object key at byte {self.offset()}")
+            self.expect(":")
+            self.peek()
+            yield key
+            separator = self.peek()
+            self.pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or '}}' at byte {self.offset() - 1}")
+
+
+def _decode_utf8(value: Any) -> Any:
+    """Re-decode strings in a value read as latin-1 as UTF-8"""
+    if isinstance(value, str):
+        return value if value.isascii() else value.encode("latin-1").decode("utf-8")
+    if isinstance(value, list):
+        return [_decode_utf8(item) for item in value]
+    if isinstance(value, dict):
+        return {_decode_utf8(key): _decode_utf8(item) for key, item in value.items()}
+    return value
+
+
+class ChecksumFile:
+    """
+    Reader for a checksum file in the 1-0-0 schema format, which reads the
+    checksums of one field at a time.
+
+    Parameters
+    ----------
+    path: Path
+        Path to the checksum file
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.schema_version = None
+        self._field_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self) -> None:
+        if self._field_file is not None:
+            self._field_file.close()
+            self._field_file = None
+
+    def fields(self) -> Iterator[tuple[str, list, int]]:
+        """
+        Iterate over the fields in the file, in file order. Yields the field
+        name, the list of checksums and the byte offset of the checksums in
+        the file, which can be passed to read_field. The schema version is
+        set once it has been read
+        """
+        with open(self.path, "rb") as f:
+            stream = JsonStream(f)
+            for key in stream.members():
+                if key != "output":
+                    value = stream.value()
+                    if key == "schema_version":
+                        self.schema_version = value
+                    continue
+                for field in stream.members():
+                    offset = stream.offset()
+                    yield field, stream.value(), offset
+
+    def read_field(self, offset: int) -> list:
+        """Read the checksums of a field at an offset given by fields"""
+        if self._field_file is None:
+            self._field_file = open(self.path, "rb")
+        return JsonStream(
+            self._field_file, offset, block_size=FIELD_READ_BLOCK_SIZE
+        ).value()
+
+
+def field_digest(checksums: list) -> bytes:
+    """Return a short digest of the checksums of a field"""
+    # The repr of a list of strings or numbers is canonical and faster to
+    # generate than JSON
+    return hashlib.blake2b(repr(checksums).encode(), digest_size=16).digest()
+
+
+def first_divergent_index(expected: list, produced: list) -> int:
+    """Return the index of the first checksum that differs. If one list is
+    a prefix of the other, this is the length of the shorter list"""
+    for index, (expected_checksum, produced_checksum) in enumerate(
+        zip(expected, produced)
+    ):
+        if expected_checksum != produced_checksum:
+            return index
+    return min(len(expected), len(produced))
+
+
+def _diff_fields(
+    expected_fields: Iterable[tuple[str, list, Any]],
+    read_expected: Callable[[Any], list],
+    produced_fields: Iterable[tuple[str, list, Any]],
+) -> dict[str, Any]:
+    """
+    Compare fields, holding only a digest of each expected field in memory.
+    Expected checksums are re-read with read_expected, from the location
+    yielded with the field, only for fields whose digests differ
+    """
+    expected_index = {
+        field: (field_digest(checksums), location)
+        for field, checksums, location in expected_fields
+    }
+
+    changed = {}
+    added = []
+    seen = set()
+    first_field = None
+    for field, checksums, _ in produced_fields:
+        seen.add(field)
+        if field not in expected_index:
+            added.append(field)
+        elif expected_index[field][0] != field_digest(checksums):
+            location = expected_index[field][1]
+            changed[field] = first_divergent_index(read_expected(location), checksums)
+        else:
+            continue
+        if first_field is None:
+            first_field = field
+
+    removed = [field for field in expected_index if field not in seen]
+    if first_field is None and removed:
+        first_field = removed[0]
+
+    return {
+        "equal": not (changed or added or removed),
+        "first_divergent_field": first_field,
+        "first_divergent_index": changed.get(first_field),
+        "n_fields": len(seen),
+        "n_changed": len(changed),
+        "n_added": len(added),
+        "n_removed": len(removed),
+        "changed": changed,
+        "added": added,
+        "removed": removed,
+    }
+
+
+def _check_schema_version(schema_version: Optional[str], name: str) -> None:
+    if schema_version != SCHEMA_VERSION_1_0_0:
+        raise ValueError(
+            f"Unsupported checksum schema version for {name}: {schema_version}"
+        )
+
+
+def diff_checksums(
+    expected: dict[str, Any], produced: dict[str, Any]
+) -> dict[str, Any]:
+    """
+    Compare checksums in the 1-0-0 schema format field by field.
+
+    Parameters
+    ----------
+    expected: dict[str, Any]
+        The reference checksums
+    produced: dict[str, Any]
+        The checksums to compare against the reference
+
+    Returns
+    -------
+    dict[str, Any]
+        The diff report, see diff_checksum_files
+    """
+    _check_schema_version(expected.get("schema_version"), "expected checksums")
+    _check_schema_version(produced.get("schema_version"), "produced checksums")
+
+    def fields(checksums):
+        for field, values in checksums["output"].items():
+            yield field, values, field
+
+    report = _diff_fields(fields(expected), expected["output"].get, fields(produced))
+    return {"schema_version": SCHEMA_VERSION_1_0_0, **report}
+
+
+def diff_checksum_files(expected_path: Path, produced_path: Path) -> dict[str, Any]:
+    """
+    Compare two checksum files in the 1-0-0 schema format field by field.
+
+    The files are streamed, so only one field of each file and a small
+    digest of each expected field are held in memory at a time. Expected
+    fields are only read a second time where their digests differ.
+
+    Parameters
+    ----------
+    expected_path: Path
+        Path to the reference checksum file
+    produced_path: Path
+        Path to the checksum file to compare against the reference
+
+    Returns
+    -------
+    dict[str, Any]
+        The diff report. "first_divergent_field" is the first changed or
+        added field in produced file order (or the first removed field),
+        and "first_divergent_index" is its first differing timestep index
+        if it is a changed field. "changed" maps each changed field to its
+        first differing index, and "added" and "removed" list fields only
+        in the produced or expected files.
+    """
+    with (
+        ChecksumFile(expected_path) as expected,
+        ChecksumFile(produced_path) as produced,
+    ):
+        report = _diff_fields(expected.fields(), expected.read_field, produced.fields())
+        _check_schema_version(expected.schema_version, str(expected_path))
+        _check_schema_version(produced.schema_version, str(produced_path))
+
+    return {
+        "schema_version": SCHEMA_VERSION_1_0_0,
+        "expected": str(expected_path),
+        "produced": str(produced_path),
+        **report,
+    }
+
+
+def format_checksum_diff(report: dict[str, Any]) -> str:
+    """Return a one line summary of a diff report"""
+    if report["equal"]:
+        return "No differences in checksums"
+
+    summary = (
+        f"{report['n_changed']} changed, {report['n_added']} added and "
+        f"{report['n_removed']} removed fields. "
+        f"First divergent field: {report['first_divergent_field']}"
+    )
+    if report["first_divergent_index"] is not None:
+        summary += f" (timestep index {report['first_divergent_index']})"
+    return summary
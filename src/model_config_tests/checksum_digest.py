@@ -0,0 +1,58 @@
+# Copyright 2024 ACCESS-NRI and contributors. See the top-level COPYRIGHT file for details.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Order-stable digests of extracted checksums"""
+
+import hashlib
+import json
+from typing import Any, Optional
+
+# Key of the digest stored in checksum output files
+CHECKSUM_DIGEST_KEY = "checksum_digest"
+
+# Hash algorithm, which is included as a prefix of the digest
+CHECKSUM_DIGEST_ALGORITHM = "blake2b"
+CHECKSUM_DIGEST_SIZE = 32
+
+
+def checksum_digest(checksums: Optional[dict[str, Any]]) -> Optional[str]:
+    """
+    Return a digest of a checksums dictionary, or None if there are no
+    checksums.
+
+    The checksums are serialised as canonical JSON (sorted keys, no
+    whitespace), so equal dictionaries have the same digest regardless of
+    key order. Any stored digest in the dictionary is ignored.
+
+    Parameters
+    ----------
+    checksums: Optional[dict[str, Any]]
+        Checksums, e.g. as returned by extract_checksums
+
+    Returns
+    -------
+    Optional[str]
+        The digest, in the form "blake2b:<hex digest>"
+    """
+    if checksums is None:
+        return None
+    if CHECKSUM_DIGEST_KEY in checksums:
+        checksums = strip_checksum_digest(checksums)
+
+    canonical = json.dumps(
+        checksums, sort_keys=True, separators=(",", ":"), default=str
+    )
+    digest = hashlib.blake2b(canonical.encode(), digest_size=CHECKSUM_DIGEST_SIZE)
+    return f"{CHECKSUM_DIGEST_ALGORITHM}:{digest.hexdigest()}"
+
+
+def add_checksum_digest(checksums: dict[str, Any]) -> dict[str, Any]:
+    """Return a copy of the checksums with the digest added"""
+    return {**checksums, CHECKSUM_DIGEST_KEY: checksum_digest(checksums)}
+
+
+def strip_checksum_digest(checksums: dict[str, Any]) -> dict[str, Any]:
+    """Return a copy of the checksums without any stored digest"""
+    return {
+        key: value for key, value in checksums.items() if key != CHECKSUM_DIGEST_KEY
+    }
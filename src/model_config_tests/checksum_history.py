@@ -0,0 +1,325 @@
+# Copyright 2024 ACCESS-NRI and contributors. See the top-level COPYRIGHT file for details.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Local database of historical checksums across configuration commits"""
+
+import json
+import re
+import sqlite3
+from pathlib import Path
+from typing import Any, Optional
+
+from model_config_tests.checksum_diff import field_digest
+from model_config_tests.checksum_digest import checksum_digest, strip_checksum_digest
+
+# Historical checksum files written by the reproducibility tests
+HISTORICAL_CHECKSUM_PATTERN = re.compile(r"historical-(\d+)hr-checksum\.json")
+
+# Version of the database layout, stored with PRAGMA user_version. Version
+# 1 databases, which weren't keyed by model version, must be re-ingested
+CHECKSUM_HISTORY_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checksum_sets (
+    id INTEGER PRIMARY KEY,
+    configuration TEXT NOT NULL,
+    commit_id TEXT NOT NULL,
+    model_version TEXT,
+    runtime_hours INTEGER NOT NULL,
+    schema_version TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    commit_time TEXT,
+    source TEXT
+);
+-- The model version is optional, so missing model versions are indexed as
+-- empty strings to be part of the key
+CREATE UNIQUE INDEX IF NOT EXISTS checksum_sets_key ON checksum_sets (
+    configuration, commit_id, IFNULL(model_version, ''), runtime_hours,
+    schema_version
+);
+CREATE INDEX IF NOT EXISTS checksum_sets_digest ON checksum_sets (digest);
+CREATE TABLE IF NOT EXISTS fields (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS field_checksums (
+    set_id INTEGER NOT NULL REFERENCES checksum_sets (id) ON DELETE CASCADE,
+    field_id INTEGER NOT NULL REFERENCES fields (id),
+    digest BLOB NOT NULL,
+    PRIMARY KEY (set_id, field_id)
+) WITHOUT ROWID;
+"""
+
+# Columns of a checksum set returned by queries
+SET_COLUMNS = [
+    "configuration",
+    "commit_id",
+    "model_version",
+    "runtime_hours",
+    "schema_version",
+    "digest",
+    "commit_time",
+    "source",
+]
+
+
+class ChecksumHistory:
+    """
+    SQLite database of checksum sets, e.g. the historical checksum files of
+    many commits of a configuration, for bisecting reproducibility changes.
+
+    Each checksum set is keyed by configuration, commit, model version,
+    runtime (in hours) and schema version, and is stored with its digest and a digest of each
+    output field. Commits are ordered by commit time, if given, and then in
+    the order they were added.
+
+    Parameters
+    ----------
+    db_path: Path
+        Path to the database file, which is created if it does not exist
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.connection = sqlite3.connect(self.db_path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        # Many checksum files are added at once, so avoid syncing the
+        # database file to disk on every commit
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, CHECKSUM_HISTORY_VERSION):
+            raise RuntimeError(
+                f"Unsupported checksum history database version {version} "
+                f"in {self.db_path}"
+            )
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+            self.connection.execute(f"PRAGMA user_version = {CHECKSUM_HISTORY_VERSION}")
+
+        # IDs of field names, which are shared by all checksum sets
+        self._field_ids = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def add(
+        self,
+        checksums: dict[str, Any],
+        configuration: str,
+        commit: str,
+        runtime_hours: int,
+        model_version: Optional[str] = None,
+        commit_time: Optional[str] = None,
+        source: Optional[str] = None,
+    ) -> str:
+        """
+        Add a set of checksums in the checksum schema format, replacing any
+        existing set with the same key. A replaced set keeps its place in
+        the order commits were added.
+
+        Parameters
+        ----------
+        checksums: dict[str, Any]
+            The checksums, with "schema_version" and "output" fields
+        configuration: str
+            Name of the configuration, e.g. the repository and branch
+        commit: str
+            The configuration commit the checksums are from
+        runtime_hours: int
+            The model runtime of the checksums
+        model_version: Optional[str]
+            The model version, e.g. the model release
+        commit_time: Optional[str]
+            Time of the commit in ISO 8601 format, used to order commits
+        source: Optional[str]
+            Where the checksums were read from
+
+        Returns
+        -------
+        str
+            The digest of the checksums
+        """
+        checksums = strip_checksum_digest(checksums)
+        digest = checksum_digest(checksums)
+        schema_version = checksums["schema_version"]
+        try:
+            with self.connection:
+                # Replace an existing set in place, so it keeps its ID and
+                # so its position in the commit order
+                row = self.connection.execute(
+                    "SELECT id FROM checksum_sets WHERE configuration = ? AND "
+                    "commit_id = ? AND model_version IS ? AND runtime_hours = ? "
+                    "AND schema_version = ?",
+                    (
+                        configuration,
+                        commit,
+                        model_version,
+                        runtime_hours,
+                        schema_version,
+                    ),
+                ).fetchone()
+                values = (
+                    configuration,
+                    commit,
+                    model_version,
+                    runtime_hours,
+                    schema_version,
+                    digest,
+                    commit_time,
+                    source,
+                )
+                if row is None:
+                    cursor = self.connection.execute(
+                        f"INSERT INTO checksum_sets ({', '.join(SET_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(SET_COLUMNS))})",
+                        values,
+                    )
+                    set_id = cursor.lastrowid
+                else:
+                    set_id = row["id"]
+                    self.connection.execute(
+                        "UPDATE checksum_sets SET "
+                        f"{', '.join(f'{column} = ?' for column in SET_COLUMNS)} "
+                        "WHERE id = ?",
+                        values + (set_id,),
+                    )
+                    self.connection.execute(
+                        "DELETE FROM field_checksums WHERE set_id = ?", (set_id,)
+                    )
+                rows = [
+                    (set_id, self._field_id(field), field_digest(values))
+                    for field, values in checksums["output"].items()
+                ]
+                self.connection.executemany(
+                    "INSERT INTO field_checksums (set_id, field_id, digest) "
+                    "VALUES (?, ?, ?)",
+                    rows,
+                )
+        except Exception:
+            # Any field names added in the failed transaction were rolled back
+            self._field_ids = None
+            raise
+        return digest
+
+    def _field_id(self, field: str) -> int:
+        """Return the ID of a field name, adding it if it is new"""
+        if self._field_ids is None:
+            self._field_ids = dict(
+                self.connection.execute("SELECT name, id FROM fields").fetchall()
+            )
+        if field not in self._field_ids:
+            cursor = self.connection.execute(
+                "INSERT INTO fields (name) VALUES (?)", (field,)
+            )
+            self._field_ids[field] = cursor.lastrowid
+        return self._field_ids[field]
+
+    def ingest_file(
+        self,
+        path: Path,
+        configuration: str,
+        commit: str,
+        model_version: Optional[str] = None,
+        commit_time: Optional[str] = None,
+    ) -> str:
+        """Add a historical-<runtime>hr-checksum.json file, with the runtime
+        taken from the filename. Returns the digest of the checksums"""
+        path = Path(path)
+        match = HISTORICAL_CHECKSUM_PATTERN.fullmatch(path.name)
+        if not match:
+            raise ValueError(f"Not a historical checksum file: {path}")
+
+        with open(path) as f:
+            checksums = json.load(f)
+        return self.add(
+            checksums,
+            configuration,
+            commit,
+            runtime_hours=int(match.group(1)),
+            model_version=model_version,
+            commit_time=commit_time,
+            source=str(path),
+        )
+
+    def ingest_output_dir(
+        self,
+        output_path: Path,
+        configuration: str,
+        commit: str,
+        model_version: Optional[str] = None,
+        commit_time: Optional[str] = None,
+    ) -> list[Path]:
+        """Add the historical checksum files written by the reproducibility
+        tests to the checksum directory of a test output path. Returns the
+        paths of the added files"""
+        paths = sorted(Path(output_path).glob("checksum/historical-*hr-checksum.json"))
+        for path in paths:
+            self.ingest_file(path, configuration, commit, model_version, commit_time)
+        return paths
+
+    def commits_with_digest(self, digest: str) -> list[dict[str, Any]]:
+        """Return all checksum sets with the given digest, in commit order"""
+        rows = self.connection.execute(
+            f"SELECT {', '.join(SET_COLUMNS)} FROM checksum_sets WHERE digest = ? "
+            "ORDER BY commit_time, id",
+            (digest,),
+        )
+        return [dict(row) for row in rows]
+
+    def first_change(
+        self,
+        configuration: str,
+        field: str,
+        runtime_hours: Optional[int] = None,
+        schema_version: Optional[str] = None,
+    ) -> Optional[dict[str, Any]]:
+        """
+        Return the first checksum set of a configuration where the checksums
+        of a field differ from the previous commit with the same runtime and
+        schema version, including where the field is added or removed.
+        Returns None if the field never changes.
+        """
+        columns = ", ".join(SET_COLUMNS)
+        row = self.connection.execute(
+            f"""
+            WITH history AS (
+                SELECT {", ".join(f"s.{column}" for column in SET_COLUMNS)},
+                    s.id,
+                    f.digest AS field_digest,
+                    LAG(f.digest) OVER runs AS previous_digest,
+                    ROW_NUMBER() OVER runs AS n
+                FROM checksum_sets s
+                LEFT JOIN field_checksums f ON f.set_id = s.id
+                    AND f.field_id = (SELECT id FROM fields WHERE name = ?)
+                WHERE s.configuration = ?
+                    AND (? IS NULL OR s.runtime_hours = ?)
+                    AND (? IS NULL OR s.schema_version = ?)
+                WINDOW runs AS (
+                    PARTITION BY s.runtime_hours, s.schema_version
+                    ORDER BY s.commit_time, s.id
+                )
+            )
+            SELECT {columns} FROM history
+            WHERE n > 1 AND field_digest IS NOT previous_digest
+            ORDER BY commit_time, id
+            LIMIT 1
+            """,
+            (
+                field,
+                configuration,
+                runtime_hours,
+                runtime_hours,
+                schema_version,
+                schema_version,
+            ),
+        ).fetchone()
+        return dict(row) if row else None
@@ -0,0 +1,121 @@
+"""Store and query historical checksums across configuration commits"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Optional
+
+from model_config_tests.checksum_digest import checksum_digest
+from model_config_tests.checksum_history import ChecksumHistory
+
+# Database used if --db is not set
+DEFAULT_CHECKSUM_HISTORY_DB = "checksum-history.sqlite"
+
+
+def parse_args(args: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--db",
+        type=Path,
+        default=Path(DEFAULT_CHECKSUM_HISTORY_DB),
+        help=f"Path to the checksum history database (default: {DEFAULT_CHECKSUM_HISTORY_DB})",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest = subparsers.add_parser(
+        "ingest",
+        help="Add historical checksum files, or the checksum files in test output directories",
+    )
+    ingest.add_argument("paths", nargs="+", type=Path)
+    ingest.add_argument("--configuration", required=True)
+    ingest.add_argument("--commit", required=True)
+    ingest.add_argument("--model-version")
+    ingest.add_argument("--commit-time", help="Commit time in ISO 8601 format")
+
+    commits = subparsers.add_parser(
+        "commits",
+        help="List commits with a checksum digest, or a checksum file's digest",
+    )
+    commits.add_argument("digest", help="A checksum digest or a checksum file")
+
+    first_change = subparsers.add_parser(
+        "first-change", help="Find the first commit where a field's checksums changed"
+    )
+    first_change.add_argument("field")
+    first_change.add_argument("--configuration", required=True)
+    first_change.add_argument("--runtime-hours", type=int)
+    first_change.add_argument("--schema-version")
+
+    return parser.parse_args(args)
+
+
+def format_checksum_set(checksum_set: dict[str, Any]) -> str:
+    """Return a one line description of a checksum set"""
+    description = (
+        f"{checksum_set['configuration']} {checksum_set['commit_id']} "
+        f"({checksum_set['runtime_hours']}hr, schema {checksum_set['schema_version']}"
+    )
+    for key in ["model_version", "commit_time"]:
+        if checksum_set[key]:
+            description += f", {checksum_set[key]}"
+    return description + f") {checksum_set['digest']}"
+
+
+def run(args: argparse.Namespace) -> int:
+    """Run a command, returning the exit code"""
+    with ChecksumHistory(args.db) as history:
+        if args.command == "ingest":
+            for path in args.paths:
+                if path.is_dir():
+                    files = history.ingest_output_dir(
+                        path,
+                        args.configuration,
+                        args.commit,
+                        args.model_version,
+                        args.commit_time,
+                    )
+                    if not files:
+                        print(f"No historical checksum files found in {path}")
+                else:
+                    history.ingest_file(
+                        path,
+                        args.configuration,
+                        args.commit,
+                        args.model_version,
+                        args.commit_time,
+                    )
+                    files = [path]
+                for file in files:
+                    print(f"Added {file}")
+            return 0
+
+        if args.command == "commits":
+            digest = args.digest
+            if Path(digest).is_file():
+                with open(digest) as f:
+                    digest = checksum_digest(json.load(f))
+            checksum_sets = history.commits_with_digest(digest)
+            for checksum_set in checksum_sets:
+                print(format_checksum_set(checksum_set))
+            if not checksum_sets:
+                print(f"No commits with checksum digest {digest}")
+                return 1
+            return 0
+
+        checksum_set = history.first_change(
+            args.configuration, args.field, args.runtime_hours, args.schema_version
+        )
+        if checksum_set is None:
+            print(f"Checksums of {args.field} did not change")
+            return 1
+        print(format_checksum_set(checksum_set))
+        return 0
+
+
+def main():
+    sys.exit(run(parse_args()))
+
+
+if __name__ == "__main__":
+    main()
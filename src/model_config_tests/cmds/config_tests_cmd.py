@@ -1,7 +1,17 @@
-"""Tests for a singular model configuration"""
+"""Tests for one or more model configurations"""
 
+import argparse
+import contextlib
+import io
+import os
 import sys
+import tempfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Optional
+
+from model_config_tests.util import default_output_path
 
 # Running pytests using --pyargs does not run pytest_addoption in conftest.py
 # Using workaround as described here:
@@ -9,13 +19,199 @@ from pathlib import Path
 HERE = Path(__file__)
 CONFIG_TESTS_DIR = "config_tests"
 
+# JUnit testsuite attributes that are summed for the combined report
+JUNIT_COUNT_ATTRIBUTES = ["tests", "failures", "errors", "skipped"]
+
+# Exit code of a configuration whose worker process failed, the same as
+# pytest.ExitCode.INTERNAL_ERROR
+WORKER_ERROR_EXIT_CODE = 3
+
+
+def parse_batch_args(args: list[str]) -> tuple[argparse.Namespace, list[str]]:
+    """Parse the batch mode options, returning the remaining pytest args"""
+    # Note: abbreviations are disabled so --control-path is passed to pytest
+    parser = argparse.ArgumentParser(add_help=False, allow_abbrev=False)
+    parser.add_argument("--control-paths", nargs="+", type=Path)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--junitxml", "--junit-xml", dest="junitxml")
+    parser.add_argument("--output-path", type=Path)
+    return parser.parse_known_args(args)
+
+
+def configuration_labels(control_paths: list[Path]) -> list[str]:
+    """Return a unique label for each configuration, based on the
+    directory name"""
+    labels = []
+    counts = {}
+    for path in control_paths:
+        name = path.resolve().name
+        counts[name] = counts.get(name, 0) + 1
+        labels.append(name if counts[name] == 1 else f"{name}-{counts[name] - 1}")
+    return labels
+
+
+def run_configuration(
+    test_path: str, control_path: Path, pytest_args: list[str], junitxml: str
+) -> tuple[int, str]:
+    """
+    Run the tests for one configuration in this process, returning the exit
+    code and the captured terminal output. Worker processes run many
+    configurations, so imports and in-process caches (e.g. schema validators
+    and spack.location files) are shared between them
+    """
+    import pytest
+
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        errcode = pytest.main(
+            [test_path]
+            + pytest_args
+            + [f"--control-path={control_path}", f"--junitxml={junitxml}"]
+        )
+    return int(errcode), output.getvalue()
+
+
+def merge_junit_reports(reports: dict[str, Path], output: Path) -> None:
+    """
+    Combine JUnit XML reports into one file, with a testsuite for each
+    configuration named by its label
+
+    Parameters
+    ----------
+    reports: dict[str, Path]
+        Configuration labels mapped to the JUnit XML report for the
+        configuration. Missing reports are skipped
+    output: Path
+        The path to write the combined report
+    """
+    combined = ET.Element("testsuites")
+    totals = dict.fromkeys(JUNIT_COUNT_ATTRIBUTES, 0)
+    total_time = 0.0
+    for label, path in reports.items():
+        if not path.exists():
+            continue
+        root = ET.parse(path).getroot()
+        suites = [root] if root.tag == "testsuite" else root.findall("testsuite")
+        for suite in suites:
+            suite.set("name", label)
+            for testcase in suite.iter("testcase"):
+                testcase.set("classname", f"{label}.{testcase.get('classname')}")
+            for attribute in JUNIT_COUNT_ATTRIBUTES:
+                totals[attribute] += int(suite.get(attribute, 0))
+            total_time += float(suite.get("time", 0))
+            combined.append(suite)
+
+    for attribute, total in totals.items():
+        combined.set(attribute, str(total))
+    combined.set("time", f"{total_time:.3f}")
+    ET.ElementTree(combined).write(output, encoding="utf-8", xml_declaration=True)
+
+
+def run_batch(
+    test_path: str,
+    control_paths: list[Path],
+    pytest_args: list[str],
+    workers: Optional[int] = None,
+    junitxml: Optional[str] = None,
+    output_path: Optional[Path] = None,
+) -> int:
+    """
+    Run the tests for many configurations (e.g. git worktrees of different
+    configuration branches) in parallel worker processes.
+
+    Parameters
+    ----------
+    test_path: str
+        The path to the tests to run
+    control_paths: list[Path]
+        The configuration directories to test
+    pytest_args: list[str]
+        Other pytest arguments, used for every configuration
+    workers: Optional[int]
+        The number of worker processes. Defaults to the number of
+        configurations, up to the number of CPUs
+    junitxml: Optional[str]
+        Path to write a JUnit XML report, with a testsuite per configuration
+    output_path: Optional[Path]
+        Test output directory, which contains a sub-directory for each
+        configuration. Defaults to $TMPDIR/test-model-repro
+
+    Returns
+    -------
+    int
+        0 if the tests passed for all configurations, otherwise the first
+        non-zero pytest exit code. A configuration whose worker process
+        failed has exit code WORKER_ERROR_EXIT_CODE
+    """
+    labels = configuration_labels(control_paths)
+    if output_path is None:
+        output_path = default_output_path()
+    if workers is None:
+        workers = min(len(control_paths), os.cpu_count() or 1)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        reports = {label: Path(tmp_dir) / f"{label}.xml" for label in labels}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            for label, control_path in zip(labels, control_paths):
+                # Separate outputs, e.g. for reproducibility tests
+                args = list(pytest_args) + [f"--output-path={output_path / label}"]
+                futures[label] = executor.submit(
+                    run_configuration,
+                    test_path,
+                    control_path,
+                    args,
+                    str(reports[label]),
+                )
+
+            errcodes = {}
+            errors = {}
+            for label, future in futures.items():
+                try:
+                    errcode, output = future.result()
+                except Exception as e:
+                    # e.g. the worker process crashed (BrokenProcessPool), so
+                    # record the error and keep the other configurations
+                    errcode = WORKER_ERROR_EXIT_CODE
+                    errors[label] = f"{type(e).__name__}: {e}"
+                    output = f"Error running tests: {errors[label]}"
+                errcodes[label] = errcode
+                print(f"{'=' * 10} {label} {'=' * 10}\n{output}")
+
+        if junitxml:
+            merge_junit_reports(reports, Path(junitxml))
+
+    print("Results by configuration:")
+    for label, control_path in zip(labels, control_paths):
+        status = "passed" if errcodes[label] == 0 else f"failed ({errcodes[label]})"
+        if label in errors:
+            status += f": {errors[label]}"
+        print(f"  {label} ({control_path}): {status}")
+
+    return next((errcode for errcode in errcodes.values() if errcode), 0)
+
 
 def main():
     import pytest
 
     test_path = str(HERE.parent.parent / CONFIG_TESTS_DIR)
 
-    errcode = pytest.main([test_path] + sys.argv[1:])
+    batch_args, pytest_args = parse_batch_args(sys.argv[1:])
+    if batch_args.control_paths is None:
+        errcode = pytest.main([test_path] + sys.argv[1:])
+    else:
+        if any(arg.startswith("--control-path=") for arg in pytest_args) or (
+            "--control-path" in pytest_args
+        ):
+            sys.exit("--control-path can't be used with --control-paths")
+        errcode = run_batch(
+            test_path,
+            batch_args.control_paths,
+            pytest_args,
+            workers=batch_args.workers,
+            junitxml=batch_args.junitxml,
+            output_path=batch_args.output_path,
+        )
     sys.exit(errcode)
 
 
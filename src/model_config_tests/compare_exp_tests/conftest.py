@@ -3,6 +3,14 @@
 from itertools import combinations
 from pathlib import Path
 
+import pytest
+
+from model_config_tests.experiment_comparison import ExperimentChecksumStore
+
+# Key for the experiment checksum store in the pytest config stash, so it
+# can be reported in the terminal summary
+EXPERIMENT_STORE_KEY = pytest.StashKey[ExperimentChecksumStore]()
+
 
 # Set up command line options and default for directory paths
 def pytest_addoption(parser):
@@ -30,8 +38,37 @@ def pytest_generate_tests(metafunc):
         metafunc.parametrize("experiment_1,experiment_2", dir_pairs, ids=ids)
 
 
-def get_experiment_pairs(dirs):
-    """Generate experiment directory pairs
+@pytest.fixture(scope="session")
+def experiment_store(request):
+    """Checksums of all experiments passed with --dirs, each extracted once
+    and shared by the pairwise comparisons"""
+    paths = get_experiment_paths(request.config.getoption("dirs"))
+    store = ExperimentChecksumStore(paths)
+    store.extract_all()
+    request.config.stash[EXPERIMENT_STORE_KEY] = store
+    return store
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    """Report experiments grouped by identical checksums"""
+    store = config.stash.get(EXPERIMENT_STORE_KEY, None)
+    if store is None:
+        return
+
+    terminalreporter.section("experiment equivalence classes")
+    compared = set()
+    for i, experiments in enumerate(store.equivalence_classes()):
+        names = " ".join(experiment.name for experiment in experiments)
+        terminalreporter.write_line(f"class {i}: {names}")
+        compared.update(experiments)
+    # Experiments where checksums could not be extracted
+    for experiment in store.experiments:
+        if experiment not in compared:
+            terminalreporter.write_line(f"not compared: {experiment.name}")
+
+
+def get_experiment_paths(dirs):
+    """Validate and resolve experiment directories
 
     Parameters
     ----------
@@ -40,8 +77,8 @@ def get_experiment_pairs(dirs):
 
     Returns
     -------
-    list[tuple[Path, Path]]
-        List of pairs of directories to compare
+    list[Path]
+        Sorted list of unique absolute directory paths
     """
     if dirs is None:
         raise ValueError(
@@ -66,6 +103,22 @@ def get_experiment_pairs(dirs):
     if len(paths) < 2:
         raise ValueError("Need at least two directories with --dirs to compare")
 
-    paths = sorted(list(paths))
+    return sorted(list(paths))
+
+
+def get_experiment_pairs(dirs):
+    """Generate experiment directory pairs
+
+    Parameters
+    ----------
+    dirs : str
+        Space separated list of directories to compare
+
+    Returns
+    -------
+    list[tuple[Path, Path]]
+        List of pairs of directories to compare
+    """
+    paths = get_experiment_paths(dirs)
     dir_pairs = list(combinations(paths, 2))
     return dir_pairs
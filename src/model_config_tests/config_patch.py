@@ -0,0 +1,394 @@
+# Copyright 2024 ACCESS-NRI and contributors. See the top-level COPYRIGHT file for details.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Batched edits to experiment configuration files"""
+
+import os
+import re
+import shutil
+import tempfile
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, Optional
+
+import yaml
+
+from model_config_tests.checksum_cache import file_identity
+
+# Use the LibYAML based loader when available, as it is much faster
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Regex patterns for lines in Fortran namelist files
+# Examples:
+# &date_manager_nml
+NAMELIST_GROUP_START_PATTERN = re.compile(r"^\s*[&$](\w+)")
+# / or &end
+NAMELIST_GROUP_END_PATTERN = re.compile(r"^\s*(/|[&$]end\b)", re.IGNORECASE)
+# restart_period = 0, 0, 10800
+# , dumpfreq = 'm'   ! comment
+# date%restart%stride = 86400
+NAMELIST_ASSIGNMENT_PATTERN = re.compile(
+    r"^(?P<lead>\s*,?\s*)"
+    r"(?P<name>[A-Za-z_]\w*(?:%[A-Za-z_]\w*)*)"
+    r"(?P<index>\s*\([^)]*\))?"
+    r"(?P<equals>\s*=\s*)"
+    r"(?P<rest>.*?)(?P<newline>\r?\n?)$"
+)
+
+
+def format_namelist_value(value: Any) -> str:
+    """Format a python value as a Fortran namelist value"""
+    if isinstance(value, (list, tuple)):
+        return ", ".join(format_namelist_value(v) for v in value)
+    if isinstance(value, bool):
+        return ".true." if value else ".false."
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    raise TypeError(f"Unsupported namelist value type: {type(value)}")
+
+
+def flatten_namelist_patch(patch: dict) -> dict[tuple[str, str], Any]:
+    """
+    Flatten a namelist patch into (group, variable) keys, with derived type
+    components joined with % (e.g. date%restart%stride). Names are lowercase
+    as namelists are case-insensitive
+    """
+    flat = {}
+
+    def flatten(group, prefix, values):
+        for name, value in values.items():
+            name = f"{prefix}%{name}" if prefix else name
+            if isinstance(value, dict):
+                flatten(group, name, value)
+            else:
+                flat[(group.lower(), name.lower())] = value
+
+    for group, values in patch.items():
+        flatten(group, "", values)
+    return flat
+
+
+def _split_comment(text: str) -> tuple[str, str]:
+    """Split a namelist value from a trailing ! comment, ignoring any ! in
+    quoted strings"""
+    quote = None
+    for i, char in enumerate(text):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char == "!":
+            return text[:i], text[i:]
+    return text, ""
+
+
+def _has_unquoted(text: str, chars: str) -> bool:
+    """Whether text has any of chars outside of quoted strings"""
+    quote = None
+    for char in text:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char in chars:
+            return True
+    return quote is not None
+
+
+def _ends_group(code: str) -> Optional[bool]:
+    """Whether namelist values (without a comment) end the group with a /
+    outside of quoted strings. Returns None if a quoted string is not closed,
+    so the line can't be understood on its own"""
+    quote = None
+    for char in code:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char == "/":
+            return True
+    return None if quote else False
+
+
+def patch_namelist_lines(lines: list[str], patch: dict) -> Optional[list[str]]:
+    """
+    Patch the values of namelist variables by replacing only the lines they
+    are assigned on, leaving all other lines untouched.
+
+    Only simple assignments on a single line can be patched this way.
+    Returns None if any patched variable is missing, assigned more than once,
+    assigned by index, or assigned over multiple lines, alongside other
+    variables or on the group's first line, or if the group structure is
+    unclear (e.g. a quoted string over multiple lines), in which case a full
+    namelist parser is needed. Groups end at a / outside of quoted strings
+    and comments, on any line, or at &end.
+
+    Parameters
+    ----------
+    lines: list[str]
+        Lines of the namelist file, including line endings
+    patch: dict
+        Nested dictionary of namelist groups and variables to set
+
+    Returns
+    -------
+    Optional[list[str]]
+        The patched lines, or None if the patch couldn't be applied
+    """
+    targets = flatten_namelist_patch(patch)
+    target_groups = {group for group, _ in targets}
+    patched_lines = list(lines)
+    found = set()
+    group = None
+
+    for i, line in enumerate(lines):
+        code, _ = _split_comment(line)
+        if group is None:
+            match = NAMELIST_GROUP_START_PATTERN.match(code)
+            if match:
+                group = match.group(1).lower()
+                values = code[match.end() :]
+                if values.strip():
+                    # Values on the group line (e.g. a one line group) are
+                    # not patched in place
+                    ends = _ends_group(values)
+                    if ends is None or group in target_groups:
+                        return None
+                    if ends:
+                        group = None
+            continue
+
+        if NAMELIST_GROUP_END_PATTERN.match(code):
+            group = None
+            continue
+
+        match = NAMELIST_ASSIGNMENT_PATTERN.match(line)
+        key = (group, match.group("name").lower()) if match else None
+        if key not in targets:
+            # The group can also end after values, e.g. x = 1 /
+            ends = _ends_group(code)
+            if ends is None:
+                return None
+            if ends:
+                group = None
+            continue
+
+        value, comment = _split_comment(match.group("rest"))
+        if (
+            key in found
+            or match.group("index")
+            or _has_unquoted(value, "=&/")
+            or _continues_on_next_line(lines, i + 1)
+        ):
+            return None
+        found.add(key)
+
+        # Keep any spacing between the value and comment
+        spacing = value[len(value.rstrip()) :] if comment else ""
+        patched_lines[i] = (
+            match.group("lead")
+            + match.group("name")
+            + match.group("equals")
+            + format_namelist_value(targets[key])
+            + spacing
+            + comment
+            + match.group("newline")
+        )
+
+    if found != set(targets):
+        return None
+    return patched_lines
+
+
+def _continues_on_next_line(lines: list[str], start: int) -> bool:
+    """Whether the next significant line continues the values of the
+    previous assignment, rather than starting a new assignment or ending
+    the group"""
+    for line in lines[start:]:
+        stripped = line.strip()
+        if not stripped or stripped.startswith("!"):
+            continue
+        return not (
+            NAMELIST_ASSIGNMENT_PATTERN.match(line)
+            or NAMELIST_GROUP_END_PATTERN.match(line)
+            or NAMELIST_GROUP_START_PATTERN.match(line)
+        )
+    return False
+
+
+def patch_namelist(path: Path, patch: dict) -> None:
+    """
+    Set namelist variables in a file in one pass. Lines assigning the
+    variables are replaced in place where possible, otherwise the namelist
+    is fully parsed, updated and written with f90nml. The file is replaced
+    atomically.
+
+    Parameters
+    ----------
+    path: Path
+        Path to the namelist file
+    patch: dict
+        Nested dictionary of namelist groups and variables to set, with
+        nested dictionaries for derived types
+    """
+    path = Path(path)
+    with open(path) as f:
+        lines = f.readlines()
+
+    patched_lines = patch_namelist_lines(lines, patch)
+
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    os.close(fd)
+    try:
+        if patched_lines is not None:
+            with open(tmp_path, "w") as f:
+                f.writelines(patched_lines)
+        else:
+            import f90nml
+
+            # Note: f90nml.patch is not used here, as it truncates values
+            # that are longer than existing values over multiple lines
+            nml = f90nml.reads("".join(lines))
+            _merge(nml, patch)
+            nml.write(tmp_path, force=True)
+        shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+class ConfigDocument:
+    """
+    A parsed YAML configuration file (e.g. config.yaml), loaded on first
+    access and shared by everything that reads or edits it.
+
+    Edits modify the parsed document in memory and mark it as modified, so
+    the file is only written once when the document is flushed. An
+    unmodified document is re-read if the file is changed on disk.
+
+    Parameters
+    ----------
+    path: Path
+        The path to the YAML file
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.modified = False
+        self._data = None
+        self._identity = None
+
+    @property
+    def data(self) -> dict:
+        """The parsed document, read from file on first access"""
+        if self._data is None or (
+            not self.modified and file_identity(self.path) != self._identity
+        ):
+            with open(self.path) as f:
+                self._identity = file_identity(self.path)
+                self._data = yaml.load(f, Loader=YAML_LOADER)
+        return self._data
+
+    def edit(self, edit: Callable[[dict], None]) -> None:
+        """Apply a function that edits the parsed document in place"""
+        edit(self.data)
+        self.modified = True
+
+    def flush(self) -> None:
+        """Write the document to file, if it has been modified"""
+        if not self.modified:
+            return
+        with open(self.path, "w") as f:
+            yaml.dump(self._data, f)
+        self._identity = file_identity(self.path)
+        self.modified = False
+
+
+class ConfigPatch:
+    """
+    Collects edits to an experiment's configuration files, so all the edits
+    to each file are applied in a single read/modify/write pass.
+
+    Edits are recorded by setup_for_test_run and the model set_model_runtime
+    methods, and are applied before payu is run.
+    """
+
+    def __init__(self):
+        # Paths to namelist files mapped to nested patch dictionaries
+        self.namelists: dict[Path, dict] = {}
+        # Paths to YAML files mapped to the shared parsed documents
+        self.documents: dict[Path, ConfigDocument] = {}
+        # Paths to nuopc.runconfig files mapped to the loaded Runconfig and
+        # the contents it was loaded with
+        self.runconfigs: dict[Path, tuple[Any, str]] = {}
+
+    def patch_namelist(self, path: Path, patch: dict) -> None:
+        """Record namelist variables to set, as a nested dictionary of groups
+        and variables (e.g. {"setup_nml": {"dumpfreq": "d"}})"""
+        _merge(self.namelists.setdefault(Path(path), {}), patch)
+
+    def document(self, path: Path) -> ConfigDocument:
+        """Return the shared document for a YAML file. It is loaded once on
+        first access, and written when the patch is applied if modified"""
+        path = Path(path)
+        if path not in self.documents:
+            self.documents[path] = ConfigDocument(path)
+        return self.documents[path]
+
+    def edit_yaml(self, path: Path, edit: Callable[[dict], None]) -> None:
+        """Edit the shared parsed YAML document in place"""
+        self.document(path).edit(edit)
+
+    def runconfig(self, path: Path):
+        """Return the Runconfig for a nuopc.runconfig file. It is loaded once
+        and shared, and written when the patch is applied if modified"""
+        path = Path(path)
+        if path not in self.runconfigs:
+            from payu.models.cesm_cmeps import Runconfig
+
+            runconfig = Runconfig(path)
+            self.runconfigs[path] = (runconfig, runconfig.contents)
+        return self.runconfigs[path][0]
+
+    @property
+    def pending(self) -> bool:
+        """Whether there are any edits that have not been applied"""
+        return bool(
+            self.namelists
+            or any(document.modified for document in self.documents.values())
+            or any(
+                runconfig.contents != contents
+                for runconfig, contents in self.runconfigs.values()
+            )
+        )
+
+    def apply(self) -> None:
+        """Apply all recorded edits, writing each modified file once. Parsed
+        YAML documents are kept, as they match the written files"""
+        for document in self.documents.values():
+            document.flush()
+
+        for path, patch in self.namelists.items():
+            patch_namelist(path, patch)
+
+        for runconfig, contents in self.runconfigs.values():
+            if runconfig.contents != contents:
+                runconfig.write()
+
+        self.namelists = {}
+        self.runconfigs = {}
+
+
+def _merge(base: dict, update: dict) -> None:
+    """Recursively merge update into base"""
+    for key, value in update.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            _merge(base[key], value)
+        else:
+            base[key] = value
@@ -1,12 +1,17 @@
 # Copyright 2024 ACCESS-NRI and contributors. See the top-level COPYRIGHT file for details.
 # SPDX-License-Identifier: Apache-2.0
 
-import os
 from pathlib import Path
 
 import pytest
-import yaml
-from ruamel.yaml import YAML
+
+from model_config_tests.artifact_cache import ArtifactCache
+from model_config_tests.config_patch import ConfigDocument
+from model_config_tests.util import (
+    TRASH_DIRNAME,
+    DirectoryReaper,
+    default_output_path,
+)
 
 
 @pytest.fixture(scope="session")
@@ -16,12 +21,22 @@ def output_path(request):
     """
     path = request.config.getoption("--output-path")
     if path is None:
-        # Set default to $TMPDIR/test-model-repro/
-        tmp_dir = os.environ.get("TMPDIR")
-        path = f"{tmp_dir}/test-model-repro"
+        return default_output_path()
     return Path(path)
 
 
+@pytest.fixture(scope="session")
+def directory_reaper(output_path: Path):
+    """Reaper to delete stale experiment directories in the background while
+    experiments are set up. Remaining deletions finish at the end of the
+    session"""
+    reaper = DirectoryReaper(output_path / "lab" / TRASH_DIRNAME)
+    # Clean up after any previous sessions that were interrupted
+    reaper.reap_leftovers()
+    yield reaper
+    reaper.reap()
+
+
 @pytest.fixture(scope="session")
 def control_path(request):
     """Set the path of the model configuration directory to test"""
@@ -39,12 +54,26 @@ def checksum_path(request):
     return Path(path) if path else None
 
 
+@pytest.fixture(scope="session")
+def artifact_cache(request):
+    """Local cache for files downloaded by the tests (e.g. the metadata
+    schema). Options default to the MODEL_CONFIG_TESTS_* environment
+    variables"""
+    cache_dir = request.config.getoption("--artifact-cache-dir")
+    return ArtifactCache.from_environment(
+        cache_dir=Path(cache_dir) if cache_dir else None,
+        offline=request.config.getoption("--offline"),
+    )
+
+
 @pytest.fixture(scope="session")
 def metadata(control_path: Path):
     """Read the metadata file in the control directory"""
     metadata_path = control_path / "metadata.yaml"
     # Use ruamel.yaml as that is what is used to read metadata files in Payu
     # It also errors out if there are duplicate keys in metadata
+    from ruamel.yaml import YAML
+
     content = YAML().load(metadata_path)
     return content
 
@@ -59,10 +88,7 @@ def skipif_no_metadata(control_path):
 @pytest.fixture(scope="session")
 def config(control_path: Path):
     """Read the config file in the control directory"""
-    config_path = control_path / "config.yaml"
-    with open(config_path) as f:
-        config_content = yaml.safe_load(f)
-    return config_content
+    return ConfigDocument(control_path / "config.yaml").data
 
 
 @pytest.fixture(scope="session")
@@ -82,6 +108,22 @@ def keep_archive(request):
     return request.config.getoption("--keep-archive")
 
 
+@pytest.fixture(scope="session")
+def live_compare(request):
+    """Set live_compare boolean flag. Enabling this compares the checksums
+    of paired experiments (e.g. for the determinism test) while they are
+    running, so divergence is reported before the jobs finish"""
+    return request.config.getoption("--live-compare")
+
+
+@pytest.fixture(scope="session")
+def cancel_diverged(request):
+    """Set cancel_diverged boolean flag. Enabling this cancels the jobs of
+    paired experiments with qdel once a live comparison finds their checksums
+    have diverged"""
+    return request.config.getoption("--cancel-diverged")
+
+
 # Set up command line options and default for directory paths
 def pytest_addoption(parser):
     """Attaches optional command line arguments"""
@@ -113,6 +155,33 @@ def pytest_addoption(parser):
         help="Keep archive from previous test run and disable running payu",
     )
 
+    parser.addoption(
+        "--artifact-cache-dir",
+        action="store",
+        help="Specify the directory to cache downloaded files, such as schemas",
+    )
+
+    parser.addoption(
+        "--offline",
+        action="store_true",
+        help="Only use cached downloaded files, and never access the network",
+    )
+
+    parser.addoption(
+        "--live-compare",
+        action="store_true",
+        help="Compare checksums of paired experiments while they are running",
+    )
+
+    parser.addoption(
+        "--cancel-diverged",
+        action="store_true",
+        help=(
+            "Cancel the jobs of paired experiments with qdel once their "
+            "checksums diverge. Used with --live-compare"
+        ),
+    )
+
 
 def pytest_configure(config):
     config.addinivalue_line(
@@ -100,13 +100,14 @@ class TestAccessEsm1p5:
     """ACCESS-ESM1.5 Specific configuration and metadata tests"""
 
     def test_access_esm1p5_manifest_exe_in_release_spack_location(
-        self, config, control_path
+        self, config, control_path, artifact_cache
     ):
         check_manifest_exes_in_spack_location(
             model_module_name=ACCESS_ESM1P5_MODULE_NAME,
             model_repo_name=ACCESS_ESM1P5_REPOSITORY_NAME,
             control_path=control_path,
             config=config,
+            artifact_cache=artifact_cache,
         )
 
     @pytest.mark.parametrize(
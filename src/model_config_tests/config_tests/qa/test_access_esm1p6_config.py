@@ -118,7 +118,7 @@ class TestAccessEsm1p6:
     """ACCESS-ESM1.6 Specific configuration and metadata tests"""
 
     def test_access_esm1p6_manifest_exe_in_release_spack_location(
-        self, branch, config, control_path
+        self, branch, config, control_path, artifact_cache
     ):
         if branch.config_type == "release":
             check_manifest_exes_in_spack_location(
@@ -126,6 +126,7 @@ class TestAccessEsm1p6:
                 model_repo_name=ACCESS_ESM1P6_REPOSITORY_NAME,
                 control_path=control_path,
                 config=config,
+                artifact_cache=artifact_cache,
             )
         else:
             pytest.skip(
@@ -202,7 +202,7 @@ class TestAccessOM2:
         ), f"Expected nominal_resolution field set to: {expected}"
 
     def test_access_om2_manifest_exe_in_release_spack_location(
-        self, config, branch, control_path
+        self, config, branch, control_path, artifact_cache
     ):
         # Infer module and repository name from branch - as different for the BGC configuration
         check_manifest_exes_in_spack_location(
@@ -210,6 +210,7 @@ class TestAccessOM2:
             model_repo_name=branch.model_repository_name,
             control_path=control_path,
             config=config,
+            artifact_cache=artifact_cache,
         )
 
     def test_access_om2_metadata_model(self, metadata):
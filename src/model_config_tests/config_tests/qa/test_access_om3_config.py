@@ -15,7 +15,7 @@ class TestAccessOM3:
     """ACCESS-OM3 Specific configuration and metadata tests"""
 
     def test_access_om3_manifest_exe_in_release_spack_location(
-        self, config, control_path
+        self, config, control_path, artifact_cache
     ):
 
         check_manifest_exes_in_spack_location(
@@ -23,4 +23,5 @@ class TestAccessOM3:
             model_repo_name="ACCESS-OM3",
             control_path=control_path,
             config=config,
+            artifact_cache=artifact_cache,
         )
@@ -4,15 +4,18 @@
 """Tests for checking configs and valid metadata files"""
 
 import re
+import threading
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any
+from typing import Any, Optional
 
-import jsonschema
 import pytest
-import requests
 import yaml
 
+from model_config_tests.artifact_cache import DOWNLOAD_TIMEOUT_SECONDS, ArtifactCache
+from model_config_tests.config_patch import YAML_LOADER
+from model_config_tests.schema_validation import validate
 from model_config_tests.util import get_git_branch_name
 
 # Experiment Metadata Schema
@@ -25,9 +28,17 @@ SCHEMA_COMMIT = "4b7207e47afe402a732c58741ff66acc5f93b8cf"
 LICENSE = "CC-BY-4.0"
 LICENSE_URL = "https://creativecommons.org/licenses/by/4.0/legalcode.txt"
 
+# ACCESS-NRI model release artefacts
+MODEL_RELEASES_URL = "https://github.com/ACCESS-NRI"
+SPACK_LOCATION_FILENAMES = ["Gadi.spack.location", "spack.location"]
+
 # Release modules location on NCI
 RELEASE_MODULE_LOCATION = "/g/data/vk83/modules"
 
+# spack.location files memoised by model repository name and version
+_spack_location_files: dict[tuple[str, str], str] = {}
+_spack_location_lock = threading.Lock()
+
 
 def insist_array(str_or_array):
     if isinstance(str_or_array, str):
@@ -109,14 +120,12 @@ class TestRelConfig:
             + "'tools' sub-directory"
         )
 
-    def test_validate_metadata(self, metadata):
-        # Get schema from Github
+    def test_validate_metadata(self, metadata, artifact_cache):
+        # Get schema from Github. It is pinned to a commit so a cached
+        # copy never expires
         schema_path = f"{BASE_SCHEMA_PATH}/{SCHEMA_VERSION}.json"
         url = f"{BASE_SCHEMA_URL}/{SCHEMA_COMMIT}/{schema_path}"
-
-        response = requests.get(url)
-        assert response.status_code == 200
-        schema = response.json()
+        schema = artifact_cache.get_json(url, pinned=True)
 
         # In schema version (1-0-0), required fields are name, experiment_uuid,
         # description and long_description. As name & experiment_uuid are
@@ -124,8 +133,9 @@ class TestRelConfig:
         # from the schema validation for now
         schema.pop("required")
 
-        # Validate field names and types
-        jsonschema.validate(instance=metadata, schema=schema)
+        # Validate field names and types. The validator is built once and
+        # reused for every configuration tested in the process
+        validate(instance=metadata, schema=schema)
 
     @pytest.mark.parametrize(
         "field",
@@ -178,16 +188,14 @@ class TestConfig:
             "storage" not in qsub_flags
         ), "Storage flags defined in qsub_flags will be silently ignored"
 
-    def test_license_file(self, control_path):
+    def test_license_file(self, control_path, artifact_cache):
         license_path = control_path / "LICENSE"
         assert license_path.exists(), (
             f"LICENSE file should exist and equal to {LICENSE} found here: "
             + LICENSE_URL
         )
 
-        response = requests.get(LICENSE_URL)
-        assert response.status_code == 200
-        license = response.text
+        license = artifact_cache.get_text(LICENSE_URL)
 
         with open(license_path) as f:
             content = f.read()
@@ -250,7 +258,7 @@ def read_exe_manifest_fullpaths(control_path: Path):
     """Return the full paths to the executables in the executable manifest file"""
     manifest_path = control_path / "manifests" / "exe.yaml"
     with open(manifest_path) as f:
-        _, data = yaml.safe_load_all(f)
+        _, data = yaml.load_all(f, Loader=YAML_LOADER)
     exe_fullpaths = {item["fullpath"] for item in data.values()}
     return exe_fullpaths
 
@@ -266,42 +274,79 @@ def read_config_model_exes(config: dict[str, Any]):
     return exes
 
 
-def get_spack_location_file(model_repo_name, model_version):
+def get_spack_location_file(
+    model_repo_name, model_version, artifact_cache: Optional[ArtifactCache] = None
+):
     """Return the spack.location file for the model version
     from a Github release artefact. Raises an AssertionError if the
-    release artefact or spack.location file is not found."""
-    base_url = f"https://github.com/ACCESS-NRI/{model_repo_name}/releases"
-    # Check whether there is a release artefact for the model version
+    release artefact or spack.location file is not found.
+
+    The release page and candidate spack.location files are requested
+    concurrently. As released artefacts don't change, files are stored in
+    the artifact cache and results are memoised for the session."""
+    key = (model_repo_name, model_version)
+    with _spack_location_lock:
+        if key in _spack_location_files:
+            return _spack_location_files[key]
+
+    import requests
+
+    if artifact_cache is None:
+        artifact_cache = ArtifactCache.from_environment()
+
+    base_url = f"{MODEL_RELEASES_URL}/{model_repo_name}/releases"
     release_url = f"{base_url}/tag/{model_version}"
-    assert (
-        requests.get(release_url).status_code == 200
-    ), f"Failed to find release artefact for model version at {release_url}"
 
-    # Urls for spack.location file in release artefacts assets,
-    # Note: Gadi.spack.location filename is used for models built with
-    # access-nri/build-cd version v4 and later
+    # Urls for spack.location file in release artefacts assets, in order of
+    # preference. Note: Gadi.spack.location filename is used for models built
+    # with access-nri/build-cd version v4 and later
     urls = [
-        f"{base_url}/download/{model_version}/spack.location",
-        f"{base_url}/download/{model_version}/Gadi.spack.location",
+        f"{base_url}/download/{model_version}/{filename}"
+        for filename in SPACK_LOCATION_FILENAMES
     ]
 
-    # Attempt to download a spack.location file
-    spack_location = None
-    for url in urls:
-        response = requests.get(url)
-        if response.status_code == 200:
-            spack_location = str(response.content)
+    # Use files cached by previous sessions, without checking the release
+    contents = [artifact_cache.cached(url, pinned=True) for url in urls]
+    if all(content is None for content in contents) and not artifact_cache.offline:
+        with ThreadPoolExecutor(max_workers=len(urls) + 1) as executor:
+            release = executor.submit(
+                requests.get, release_url, timeout=DOWNLOAD_TIMEOUT_SECONDS
+            )
+            downloads = [
+                executor.submit(_download_release_asset, artifact_cache, url)
+                for url in urls
+            ]
+            # Check whether there is a release artefact for the model version
+            assert (
+                release.result().status_code == 200
+            ), f"Failed to find release artefact for model version at {release_url}"
+            contents = [download.result() for download in downloads]
 
+    # Use the first spack.location file that was found
+    spack_location = next(
+        (str(content) for content in contents if content is not None), None
+    )
     assert spack_location is not None, (
         "Failed to download a spack.location or Gadi.spack.location file in "
         f"the release artefact for model version {model_version}. "
         f"Checked urls: {(', ').join(urls)}"
     )
+
+    with _spack_location_lock:
+        _spack_location_files[key] = spack_location
     return spack_location
 
 
+def _download_release_asset(artifact_cache: ArtifactCache, url: str) -> Optional[bytes]:
+    """Return the content of a release asset, or None if it doesn't exist"""
+    try:
+        return artifact_cache.get(url, pinned=True)
+    except RuntimeError:
+        return None
+
+
 def check_manifest_exes_in_spack_location(
-    model_module_name, model_repo_name, control_path, config
+    model_module_name, model_repo_name, control_path, config, artifact_cache=None
 ):
     """This compares executable paths in the executable manifest, and checks
     they match an install path in the spack.location release artefact. The
@@ -320,6 +365,8 @@ def check_manifest_exes_in_spack_location(
         The path to configuration directory
     config: Dict[str, Any]
         The contents of the config.yaml file
+    artifact_cache: Optional[ArtifactCache]
+        Cache for the downloaded spack.location file
     """
     help_msg = (
         "Expected module for the model is added to loaded modules in config.yaml. "
@@ -342,7 +389,9 @@ def check_manifest_exes_in_spack_location(
     _, module_version = modules[0].split("/")
 
     # Use the module version to download spack.location file
-    spack_location = get_spack_location_file(model_repo_name, module_version)
+    spack_location = get_spack_location_file(
+        model_repo_name, module_version, artifact_cache
+    )
 
     # Read exe full paths in the manifests
     exe_paths = read_exe_manifest_fullpaths(control_path)
@@ -9,8 +9,14 @@ from typing import Optional
 
 import pytest
 
+from model_config_tests.checksum_diff import diff_checksums, format_checksum_diff
+from model_config_tests.checksum_digest import (
+    add_checksum_digest,
+    checksum_digest,
+    strip_checksum_digest,
+)
 from model_config_tests.exp_test_helper import Experiments, ExpTestHelper, setup_exp
-from model_config_tests.util import DAY_IN_SECONDS, HOUR_IN_SECONDS
+from model_config_tests.util import DAY_IN_SECONDS, HOUR_IN_SECONDS, DirectoryReaper
 
 # Names of shared experiments
 EXP_DEFAULT_RUNTIME = "exp_default_runtime"
@@ -18,6 +24,10 @@ EXP_1D_RUNTIME = "exp_1d_runtime"
 EXP_2D_RUNTIME = "exp_2d_runtime"
 EXP_1D_RUNTIME_REPEAT = "exp_1d_runtime_repeat"
 
+# Pairs of experiments that are expected to have the same checksums, which
+# can be compared while the experiments are running
+LIVE_COMPARE_PAIRS = [(EXP_1D_RUNTIME, EXP_1D_RUNTIME_REPEAT)]
+
 
 def set_checksum_output_dir(output_path: Path):
     """Create an output directory for checksums and remove any pre-existing
@@ -52,7 +62,13 @@ def read_historical_checksums(
 
 
 def _experiments(
-    markers: list, output_path: Path, control_path: Path, keep_archive: Optional[bool]
+    markers: list,
+    output_path: Path,
+    control_path: Path,
+    keep_archive: Optional[bool],
+    reaper: Optional[DirectoryReaper] = None,
+    live_compare: bool = False,
+    cancel_diverged: bool = False,
 ) -> Experiments:
     """
     Run all requested experiments
@@ -70,6 +86,16 @@ def _experiments(
     keep_archive: Optional[bool]
         Whether to keep the previous archive for each experiment and
         disable calls to payu run. This is used in testing.
+    reaper: Optional[DirectoryReaper]
+        If set, used to delete pre-existing experiment archive and work
+        directories in the background.
+    live_compare: bool
+        Whether to compare the checksums of paired experiments (see
+        LIVE_COMPARE_PAIRS) while they are running, to report divergence
+        before the jobs finish.
+    cancel_diverged: bool
+        Whether to cancel the jobs of paired experiments once their
+        checksums diverge in a live comparison.
 
     Returns
     -------
@@ -108,25 +134,30 @@ def _experiments(
     set_checksum_output_dir(output_path=output_path)
 
     print("Submitting all requested experiments")
-    experiments = Experiments(control_path, output_path, keep_archive)
-    for exp_name, config in requested_experiments.items():
-        experiments.setup_and_submit(
-            exp_name=exp_name,
-            model_runtime=config["model_runtime"],
-            n_runs=config["n_runs"],
-        )
+    experiments = Experiments(control_path, output_path, keep_archive, reaper=reaper)
+    experiments.setup_and_submit_all(requested_experiments)
 
     # Wait for experiments to finish here and catching errors as some
     # some experiments may finish without errors so errors will be raised
     # instead in the tests if an dependent experiment fails
-    experiments.wait_for_all_experiments(catch_errors=True)
+    experiments.wait_for_all_experiments(
+        catch_errors=True,
+        live_compare=LIVE_COMPARE_PAIRS if live_compare else None,
+        cancel_diverged=cancel_diverged,
+    )
 
     return experiments
 
 
 @pytest.fixture(scope="class")
 def experiments(
-    request, output_path: Path, control_path: Path, keep_archive: Optional[bool]
+    request,
+    output_path: Path,
+    control_path: Path,
+    keep_archive: Optional[bool],
+    directory_reaper: DirectoryReaper,
+    live_compare: bool,
+    cancel_diverged: bool,
 ):
     """
     Parse the experiments markers from the requested tests and
@@ -144,7 +175,15 @@ def experiments(
             if marker:
                 experiments_markers.append(marker.args[0])
 
-    return _experiments(experiments_markers, output_path, control_path, keep_archive)
+    return _experiments(
+        experiments_markers,
+        output_path,
+        control_path,
+        keep_archive,
+        reaper=directory_reaper,
+        live_compare=live_compare,
+        cancel_diverged=cancel_diverged,
+    )
 
 
 @pytest.fixture
@@ -226,14 +265,45 @@ class TestBitReproducibility:
         # Extract checksums
         checksums = exp.extract_checksums(schema_version=schema_version)
 
-        # Write out checksums to output file
+        # Write out checksums to output file, with their digest for indexing
         checksum_output_file = checksum_output_dir / checksum_filename
         with open(checksum_output_file, "w") as file:
-            json.dump(checksums, file, indent=2)
+            json.dump(add_checksum_digest(checksums), file, indent=2)
+
+        # Remove any diff report from a previous test run
+        diff_output_file = output_path / checksum_filename.replace(
+            "-checksum.json", "-checksum-diff.json"
+        )
+        diff_output_file.unlink(missing_ok=True)
+
+        # Only compare the checksums in full if the digests differ
+        if checksum_digest(hist_checksums) == checksum_digest(checksums):
+            return
+        if hist_checksums is None:
+            pytest.fail(
+                "No historical checksums to compare against. The new checksums "
+                f"have been written to {checksum_output_file}."
+            )
+
+        # Write a report of the fields that differ
+        hist_checksums = strip_checksum_digest(hist_checksums)
+        message = "Checksums were not equal."
+        try:
+            report = diff_checksums(hist_checksums, checksums)
+        except ValueError:
+            # Field-level reports are only supported for some schema versions
+            pass
+        else:
+            with open(diff_output_file, "w") as file:
+                json.dump(report, file, indent=2)
+            message += (
+                f" {format_checksum_diff(report)}. A report of the differences "
+                f"has been written to {diff_output_file}."
+            )
 
         assert (
             hist_checksums == checksums
-        ), f"Checksums were not equal. The new checksums have been written to {checksum_output_file}."
+        ), f"{message} The new checksums have been written to {checksum_output_file}."
 
     @pytest.mark.repro
     @pytest.mark.repro_determinism
@@ -256,7 +326,9 @@ class TestBitReproducibility:
         expected = exp_1d_runtime.extract_checksums()
         produced = exp_1d_runtime_repeat.extract_checksums()
 
-        assert produced == expected
+        # Only compare the checksums in full if the digests differ
+        if checksum_digest(produced) != checksum_digest(expected):
+            assert produced == expected
 
     @pytest.mark.repro
     @pytest.mark.repro_restart
@@ -287,13 +359,13 @@ class TestBitReproducibility:
 
         # Use model specific comparision method for checksums
         model = exp_2d_runtime.model
-        matching_checksums = model.check_checksums_over_restarts(
+        mismatches = model.compare_checksums_over_restarts(
             long_run_checksum=checksums_2d,
             short_run_checksum_0=checksums_1d_0,
             short_run_checksum_1=checksums_1d_1,
         )
 
-        if not matching_checksums:
+        if mismatches:
             # Write checksums out to file
             with open(output_path / "restart-1d-0-checksum.json", "w") as file:
                 json.dump(checksums_1d_0, file, indent=2)
@@ -301,8 +373,14 @@ class TestBitReproducibility:
                 json.dump(checksums_1d_1, file, indent=2)
             with open(output_path / "restart-2d-0-checksum.json", "w") as file:
                 json.dump(checksums_2d, file, indent=2)
+            # Write a compact report of the fields that don't match
+            with open(output_path / "restart-mismatches.json", "w") as file:
+                json.dump(mismatches, file, indent=2)
 
-        assert matching_checksums
+        assert not mismatches, (
+            "Checksums from the 2-day run were not found in the 1-day runs "
+            f"for fields: {', '.join(mismatches)}"
+        )
 
     @pytest.mark.repro_determinism_restart
     @pytest.mark.experiments(
@@ -327,17 +405,24 @@ class TestBitReproducibility:
             exp_1d_runtime_repeat.model.output_1
         )
 
-        assert produced == expected
+        # Only compare the checksums in full if the digests differ
+        if checksum_digest(produced) != checksum_digest(expected):
+            assert produced == expected
 
 
 @pytest.mark.repro
 @pytest.mark.manifests
 @pytest.mark.repro_payu_setup
-def test_repro_payu_setup(control_path, output_path):
+def test_repro_payu_setup(control_path, output_path, directory_reaper):
     """
     Test payu setup with `--repro` flag which errors if md5 of any files in payu manifests are changed.
     """
-    experiment = setup_exp(control_path, output_path, exp_name="repro_payu_setup")
+    experiment = setup_exp(
+        control_path,
+        output_path,
+        exp_name="repro_payu_setup",
+        reaper=directory_reaper,
+    )
     try:
         experiment.setup_reproduce()
     except Exception as error:
@@ -346,12 +431,15 @@ def test_repro_payu_setup(control_path, output_path):
 
 @pytest.mark.manifests
 @pytest.mark.manifests_unchanged
-def test_manifests_unchanged(control_path, output_path):
+def test_manifests_unchanged(control_path, output_path, directory_reaper):
     """
     Test payu setup with `git diff` which errors if any files in payu manifests are changed.
     """
     experiment = setup_exp(
-        control_path, output_path, exp_name="setup_unchanged_manifests"
+        control_path,
+        output_path,
+        exp_name="setup_unchanged_manifests",
+        reaper=directory_reaper,
     )
     try:
         experiment.setup_manifests_unchanged()
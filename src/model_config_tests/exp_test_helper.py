@@ -6,15 +6,32 @@ import os
 import re
 import shutil
 import subprocess as sp
+import threading
 import warnings
 from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 from pathlib import Path
 from typing import Optional
 
-import yaml
-
+from model_config_tests.checksum_cache import CHECKSUM_CACHE_FILENAME, ChecksumCache
+from model_config_tests.config_patch import ConfigPatch
+from model_config_tests.live_compare import (
+    LIVE_POLL_SECONDS,
+    LiveComparison,
+    format_live_divergence,
+)
 from model_config_tests.models import index as model_index
-from model_config_tests.util import wait_for_qsub
+from model_config_tests.util import (
+    DirectoryReaper,
+    QsubJobTracker,
+    clone_tree,
+    qdel_jobs,
+    wait_for_qsub,
+)
+
+# Maximum number of experiments to set up and submit at the same time
+DEFAULT_SUBMIT_WORKERS = 4
 
 
 class ExpTestHelper:
@@ -52,14 +69,26 @@ class ExpTestHelper:
         self.restart000 = self.archive_path / "restart000"
         self.restart001 = self.archive_path / "restart001"
 
-        with open(self.config_path) as f:
-            self.config = yaml.safe_load(f)
+        # Edits to configuration files, applied before running payu
+        self.config_patch = ConfigPatch()
+        # Parsed config.yaml, shared by everything that reads or edits it
+        self.config_document = self.config_patch.document(self.config_path)
 
         self.set_model()
 
+        # Cache of extracted checksums, stored next to the archived output
+        self.checksum_cache = ChecksumCache(self.archive_path / CHECKSUM_CACHE_FILENAME)
+
         self.disable_payu_run = disable_payu_run
 
         self.run_id = None
+        # The payu run job currently being waited on
+        self.current_job_id = None
+
+    @property
+    def config(self) -> dict:
+        """The parsed config.yaml, including any edits not yet written"""
+        return self.config_document.data
 
     def set_model(self):
         """Set model based on payu config. Currently only setting top-level
@@ -73,8 +102,47 @@ class ExpTestHelper:
         output_directory: Path = None,
         schema_version: str = None,
     ):
-        """Use model subclass to extract checksums from output"""
-        return self.model.extract_checksums(output_directory, schema_version)
+        """Use model subclass to extract checksums from output. Checksums are
+        cached until the output files change"""
+        if output_directory is None:
+            output_directory = self.model.output_0
+        if schema_version is None:
+            schema_version = self.model.default_schema_version
+
+        return self._cached_extract(
+            f"checksums:{schema_version}:{output_directory}",
+            output_directory,
+            lambda: self.model.extract_checksums(output_directory, schema_version),
+        )
+
+    def extract_full_checksums(self, output_directory: Path = None):
+        """Use model subclass to extract all available checksums from output.
+        Checksums are cached until the output files change"""
+        if output_directory is None:
+            output_directory = self.model.output_0
+
+        return self._cached_extract(
+            f"full_checksums:{output_directory}",
+            output_directory,
+            lambda: self.model.extract_full_checksums(output_directory),
+        )
+
+    def _cached_extract(
+        self, key: str, output_directory: Path, extract: Callable[[], dict]
+    ) -> dict:
+        """Return cached checksums for the key if the model output files are
+        unchanged, otherwise extract and cache the checksums"""
+        try:
+            checksum_files = self.model.checksum_files(output_directory)
+        except (NotImplementedError, FileNotFoundError):
+            # Can't track the output files, so skip caching
+            return extract()
+
+        checksums = self.checksum_cache.get(key, checksum_files)
+        if checksums is None:
+            checksums = extract()
+            self.checksum_cache.set(key, checksum_files, checksums)
+        return checksums
 
     def has_run(self):
         """
@@ -87,25 +155,20 @@ class ExpTestHelper:
         Run payu setup command. If reproduce is True, run with --reproduce flag
         to check if md5 hashes have changed in the manifests.
         """
-        owd = Path.cwd()
-        # Change to experiment directory and run.
-        os.chdir(self.control_path)
+        # Write any pending configuration edits
+        self.config_patch.apply()
 
-        try:
-            setup_command = [
-                "payu",
-                "setup",
-                "--lab",
-                str(self.lab_path),
-            ]
-            if reproduce:
-                setup_command.append("--reproduce")
-            print(f"Running payu setup command: {setup_command}")
-            result = sp.run(setup_command, capture_output=True, text=True)
+        setup_command = [
+            "payu",
+            "setup",
+            "--lab",
+            str(self.lab_path),
+        ]
+        if reproduce:
+            setup_command.append("--reproduce")
 
-        finally:
-            # Change back to original working directory
-            os.chdir(owd)
+        print(f"Running payu setup command: {setup_command}")
+        result = self.run_payu(setup_command)
 
         if result.returncode != 0:
             raise RuntimeError(
@@ -115,6 +178,37 @@ class ExpTestHelper:
                 f"{'='*10}STDERR{'='*10}\n {result.stderr}\n"
             )
 
+    def run_payu(self, command: list[str], check: bool = False) -> sp.CompletedProcess:
+        """
+        Run a payu command in the experiment control directory.
+
+        The working directory is set for the subprocess only, rather than
+        changing the working directory of this process, so payu commands
+        for different experiments can be run from multiple threads.
+
+        Parameters
+        ----------
+        command: list[str]
+            The payu command and arguments to run
+        check: bool
+            Whether to raise a CalledProcessError on a non-zero exit status
+
+        Returns
+        ----------
+        sp.CompletedProcess
+            The completed process, with stdout and stderr captured as text
+        """
+        # Some tools use $PWD rather than the working directory of the process
+        env = {**os.environ, "PWD": str(self.control_path)}
+        return sp.run(
+            command,
+            cwd=self.control_path,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=check,
+        )
+
     def run_git_diff(self, path, extra_args=None):
         """
         Run git diff command on the given path and return the output.
@@ -169,15 +263,24 @@ but `payu setup` will take longer to run as it needs to re-calculate all the md5
                 error_message += f"\n{'='*10} Diff for {file} {'='*10}\n{top_lines}\n"
             raise RuntimeError(f"{error_message}")
 
-    def setup_for_test_run(self):
+    def setup_for_test_run(self, apply: bool = True):
         """
         Various config.yaml settings need to be modified in order to run in the
         test environment.
-        """
 
-        with open(self.config_path) as f:
-            doc = yaml.safe_load(f)
+        Parameters
+        ----------
+        apply: bool
+            Whether to write the changes to config.yaml straight away. If
+            False, the changes are applied with any other configuration edits
+            (e.g. from set_model_runtime) before payu is run
+        """
+        self.config_patch.edit_yaml(self.config_path, self._edit_config_for_test_run)
+        if apply:
+            self.config_patch.apply()
 
+    def _edit_config_for_test_run(self, doc: dict) -> None:
+        """Modify a parsed config.yaml to run in the test environment"""
         # Disable git runlog
         doc["runlog"] = False
 
@@ -198,9 +301,6 @@ but `payu setup` will take longer to run as it needs to re-calculate all the md5
             if "archive" in doc["userscripts"]:
                 doc["userscripts"].pop("archive")
 
-        with open(self.config_path, "w") as f:
-            yaml.dump(doc, f)
-
     def submit_payu_run(self, n_runs: int = None) -> str:
         """
         Submit a payu run job.
@@ -218,18 +318,13 @@ but `payu setup` will take longer to run as it needs to re-calculate all the md5
         if self.disable_payu_run:
             return
 
-        owd = Path.cwd()
-        try:
-            # Change to experiment directory and run.
-            os.chdir(self.control_path)
+        # Write any pending configuration edits
+        self.config_patch.apply()
 
+        try:
             # Run payu setup command
             print("Running payu setup")
-            result = sp.run(
-                ["payu", "setup", "--lab", str(self.lab_path)],
-                capture_output=True,
-                text=True,
-            )
+            result = self.run_payu(["payu", "setup", "--lab", str(self.lab_path)])
             if result.returncode != 0:
                 # Add additional error messaging for debugging
                 error_msg = (
@@ -243,19 +338,14 @@ but `payu setup` will take longer to run as it needs to re-calculate all the md5
 
             # Run payu sweep command
             print("Running payu sweep")
-            sp.run(
-                ["payu", "sweep", "--lab", str(self.lab_path)],
-                capture_output=True,
-                text=True,
-                check=True,
-            )
+            self.run_payu(["payu", "sweep", "--lab", str(self.lab_path)], check=True)
 
             # Run payu run command
             run_command = ["payu", "run", "--lab", str(self.lab_path)]
             if n_runs:
                 run_command.extend(["--nruns", str(n_runs)])
             print(f"Running payu run command: {' '.join(run_command)}")
-            result = sp.run(run_command, capture_output=True, text=True, check=True)
+            result = self.run_payu(run_command, check=True)
             self.run_id = parse_run_id(result.stdout)
             print(f"Run Job ID: {self.run_id}")
 
@@ -266,11 +356,10 @@ but `payu setup` will take longer to run as it needs to re-calculate all the md5
                 f"--- stdout ---\n{e.stdout}\n"
                 f"--- stderr ---\n{e.stderr}"
             )
-        finally:
-            # Change back to original working directory
-            os.chdir(owd)
 
-    def wait_for_payu_run(self, run_id: str = None) -> list[str]:
+    def wait_for_payu_run(
+        self, run_id: str = None, job_tracker: Optional[QsubJobTracker] = None
+    ) -> list[str]:
         """Given a run ID, wait for all the payu run jobs to finish.
 
         Parameters
@@ -278,6 +367,9 @@ but `payu setup` will take longer to run as it needs to re-calculate all the md5
         run_id: str
             The job ID of the payu run job to wait for. If None, use the
             run ID saved in the class.
+        job_tracker: Optional[QsubJobTracker]
+            A job tracker shared with other experiments, so all jobs are
+            polled together. If None, poll for this experiment's jobs only.
 
         Returns
         ----------
@@ -290,11 +382,24 @@ but `payu setup` will take longer to run as it needs to re-calculate all the md5
         if run_id is None:
             run_id = self.run_id
 
-        # Wait for payu PBS jobs to complete
+        # Wait for payu PBS jobs to complete. The job output files are
+        # written to the control directory when each job finishes
+        if job_tracker is not None:
+            wait_for_qsub_func = partial(
+                job_tracker.wait, control_path=self.control_path
+            )
+        else:
+            wait_for_qsub_func = partial(wait_for_qsub, control_path=self.control_path)
+
+        def wait_for_job(job_id: str) -> dict:
+            # Keep track of the running job, so it can be cancelled
+            self.current_job_id = job_id
+            return wait_for_qsub_func(job_id)
+
         output_files = wait_for_payu_jobs(
             control_path=self.control_path,
             run_id=run_id,
-            wait_for_qsub_func=wait_for_qsub,
+            wait_for_qsub_func=wait_for_job,
         )
         return output_files
 
@@ -313,6 +418,9 @@ class Experiments:
         for the test experiments
     keep_archive: bool
         Whether to keep previous test output. This is useful for testing
+    reaper: Optional[DirectoryReaper]
+        If set, previous archive and work directories are deleted in the
+        background by the reaper. Otherwise they are deleted during setup
     """
 
     def __init__(
@@ -320,12 +428,16 @@ class Experiments:
         control_path: Path,
         output_path: Path,
         keep_archive: Optional[bool] = False,
+        reaper: Optional[DirectoryReaper] = None,
     ):
         self.control_path = control_path
         self.output_path = output_path
         self.keep_archive = keep_archive
+        self.reaper = reaper
         self.experiments = {}
         self.experiment_errors = {}
+        # Reports of experiment pairs whose checksums diverged while running
+        self.live_divergences = {}
 
     def setup_and_submit(
         self,
@@ -352,7 +464,11 @@ class Experiments:
         """
         # Setup experiment
         exp = setup_exp(
-            self.control_path, self.output_path, exp_name, self.keep_archive
+            self.control_path,
+            self.output_path,
+            exp_name,
+            self.keep_archive,
+            reaper=self.reaper,
         )
 
         print(f"-----Setting up experiment {exp_name}-----")
@@ -367,6 +483,9 @@ class Experiments:
             # Set the default model runtime defined in the model class
             exp.model.set_model_runtime()
 
+        # Write all configuration edits for the experiment in one pass
+        exp.config_patch.apply()
+
         # Add experiment  to dictionary of saved experiments
         self.experiments[exp_name] = exp
 
@@ -378,13 +497,62 @@ class Experiments:
 
         return exp
 
+    def setup_and_submit_all(
+        self,
+        requested_experiments: dict[str, dict],
+        max_workers: int = DEFAULT_SUBMIT_WORKERS,
+        catch_errors: bool = True,
+    ) -> None:
+        """Setup and submit multiple payu experiments at the same time
+
+        Parameters
+        ----------
+        requested_experiments: dict[str, dict]
+            Experiment names mapped to the keyword arguments passed to
+            setup_and_submit, e.g. {"model_runtime": 86400, "n_runs": 2}
+        max_workers: int
+            The maximum number of experiments to setup and submit at once
+        catch_errors: bool
+            Whether to catch errors and continue submitting other test
+            experiments, or raise an error and stop the tests. Default is True.
+        """
+        if not requested_experiments:
+            return
+
+        max_workers = max(1, min(max_workers, len(requested_experiments)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.setup_and_submit, exp_name, **kwargs): exp_name
+                for exp_name, kwargs in requested_experiments.items()
+            }
+            for future in as_completed(futures):
+                exp_name = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    # Errors are raised in the tests that require the
+                    # experiment, so other experiments can still run
+                    self.experiment_errors[exp_name] = str(e)
+                    if catch_errors:
+                        print(f"Error submitting experiment {exp_name}: {e}")
+                    else:
+                        for other_future in futures:
+                            other_future.cancel()
+                        raise
+
     def get_experiment(self, exp_name: str) -> ExpTestHelper:
         """
         Return the experiment object for the given experiment name
         """
         return self.experiments.get(exp_name)
 
-    def wait_for_all_experiments(self, catch_errors=True) -> None:
+    def wait_for_all_experiments(
+        self,
+        catch_errors: bool = True,
+        live_compare: Optional[list[tuple[str, str]]] = None,
+        cancel_diverged: bool = False,
+        live_poll_interval: float = LIVE_POLL_SECONDS,
+    ) -> None:
         """
         Wait for all experiments to finish
 
@@ -393,18 +561,147 @@ class Experiments:
         catch_errors: bool
             Whether to catch errors and continue waiting for other test
             experiments, or raise an error and stop the tests. Default is True.
+        live_compare: Optional[list[tuple[str, str]]]
+            Pairs of (expected, produced) experiment names whose checksums
+            are compared while the experiments are running, so a divergence
+            is reported before the jobs finish. Only the first run of each
+            experiment is compared.
+        cancel_diverged: bool
+            Whether to cancel the jobs of both experiments in a pair with
+            qdel once their checksums diverge. The experiments are then
+            marked as failed with the divergence.
+        live_poll_interval: float
+            Seconds between reads of the output files of running experiments
         """
-        for exp_name, exp in self.experiments.items():
+        # Skip experiments that failed to be submitted
+        experiments = {
+            exp_name: exp
+            for exp_name, exp in self.experiments.items()
+            if exp_name not in self.experiment_errors
+        }
+        if not experiments:
+            return
+
+        # Only compare experiments that are being run
+        live_pairs = [
+            (expected_name, produced_name)
+            for expected_name, produced_name in live_compare or []
+            if expected_name in experiments
+            and produced_name in experiments
+            and not experiments[expected_name].disable_payu_run
+            and not experiments[produced_name].disable_payu_run
+        ]
+
+        # Wait for all experiments at once, with their jobs polled together
+        job_tracker = QsubJobTracker()
+        executor = ThreadPoolExecutor(max_workers=len(experiments) + len(live_pairs))
+        futures = {}
+        for exp_name, exp in experiments.items():
             print(f"-----Waiting for experiment {exp_name} to complete-----")
+            future = executor.submit(exp.wait_for_payu_run, job_tracker=job_tracker)
+            futures[future] = exp_name
+
+        # Compare running experiments until all experiments have finished
+        live_stop = threading.Event()
+        for expected_name, produced_name in live_pairs:
+            executor.submit(
+                self._compare_live,
+                expected_name,
+                produced_name,
+                live_stop,
+                cancel_diverged,
+                live_poll_interval,
+            )
+
+        try:
+            # Report experiments in the order they finish
+            for future in as_completed(futures):
+                exp_name = futures[future]
+                try:
+                    future.result()
+                    print(f"Experiment {exp_name} completed successfully")
+                except RuntimeError as e:
+                    # Keep the reason for experiments cancelled by a live
+                    # comparison
+                    self.experiment_errors.setdefault(exp_name, str(e))
+                    if catch_errors:
+                        print(f"Error running experiment {exp_name}: {e}")
+                    else:
+                        raise
+        finally:
+            # Stop waiting on any remaining jobs if an error was raised
+            live_stop.set()
+            job_tracker.close()
+            executor.shutdown(wait=True)
+
+    def _compare_live(
+        self,
+        expected_name: str,
+        produced_name: str,
+        stop: threading.Event,
+        cancel_diverged: bool,
+        poll_interval: float,
+    ) -> Optional[dict]:
+        """Compare the checksums of two experiments while they are running,
+        until stop is set. If the checksums diverge, the divergence is
+        reported and both experiments' jobs are optionally cancelled"""
+        expected = self.experiments[expected_name]
+        produced = self.experiments[produced_name]
+        try:
+            expected_file, parse_record = expected.model.live_output()
+            produced_file, _ = produced.model.live_output()
+        except NotImplementedError:
+            print(f"Live comparison is not supported for model {expected.model_name}")
+            return None
+
+        print(
+            f"-----Comparing checksums of experiments {expected_name} and "
+            f"{produced_name} while running-----"
+        )
+        comparison = LiveComparison(expected_file, produced_file, parse_record)
+        try:
+            report = comparison.follow(stop, poll_interval)
+        except (OSError, ValueError) as e:
+            print(
+                f"Error comparing checksums of experiments {expected_name} and "
+                f"{produced_name} while running: {e}"
+            )
+            return None
+        if report is None:
+            if comparison.n_compared == 0:
+                # e.g. the output files weren't where the models wrote them
+                print(
+                    f"No checksums of experiments {expected_name} and "
+                    f"{produced_name} were compared while running, from "
+                    f"{expected_file} and {produced_file}"
+                )
+            return None
+
+        message = (
+            f"Checksums of experiment {produced_name} diverged from "
+            f"{expected_name}: {format_live_divergence(report)}"
+        )
+        print(message)
+        self.live_divergences[(expected_name, produced_name)] = report
+
+        # Experiments may have finished by the time the divergence is found
+        if not cancel_diverged or stop.is_set():
+            return report
+
+        job_ids = []
+        for exp_name, exp in [(expected_name, expected), (produced_name, produced)]:
+            # Set before cancelling, so the error of the cancelled job is
+            # not recorded instead
+            self.experiment_errors.setdefault(exp_name, f"Cancelled. {message}")
+            if exp.current_job_id is not None:
+                job_ids.append(exp.current_job_id)
+        if job_ids:
+            print(f"Cancelling jobs {job_ids}")
             try:
-                exp.wait_for_payu_run()
-                print(f"Experiment {exp_name} completed successfully")
+                qdel_jobs(job_ids)
             except RuntimeError as e:
-                self.experiment_errors[exp_name] = str(e)
-                if catch_errors:
-                    print(f"Error running experiment {exp_name}: {e}")
-                else:
-                    raise
+                print(f"Failed to cancel jobs: {e}")
+        return report
 
     def check_experiment(self, exp_name: str) -> None:
         """
@@ -423,12 +720,17 @@ class Experiments:
 
 
 def setup_exp(
-    control_path: Path, output_path: Path, exp_name: str, keep_archive: bool = False
+    control_path: Path,
+    output_path: Path,
+    exp_name: str,
+    keep_archive: bool = False,
+    reaper: Optional[DirectoryReaper] = None,
 ) -> ExpTestHelper:
     """
     Create a experiment by copying over a base configuration to the control
     directory, and setting up the lab and archive directories, and
-    the config.yaml file
+    the config.yaml file. If a reaper is given, any pre-existing archive and
+    work directories are moved to the trash and deleted in the background
     """
     # Set experiment control path
     if control_path.name != "base-experiment":
@@ -436,10 +738,11 @@ def setup_exp(
 
     exp_control_path = output_path / "control" / exp_name
 
-    # Copy over base control directory (e.g. model configuration)
+    # Copy over base control directory (e.g. model configuration). Files
+    # are reflinked where supported, and large read-only files hardlinked
     if exp_control_path.exists():
         shutil.rmtree(exp_control_path)
-    shutil.copytree(control_path, exp_control_path, symlinks=True)
+    clone_tree(control_path, exp_control_path)
 
     exp_lab_path = output_path / "lab"
 
@@ -451,17 +754,18 @@ def setup_exp(
 
     # Remove any pre-existing archive or work directories for the experiment
     if not keep_archive:
-        try:
-            shutil.rmtree(exp.archive_path)
-        except FileNotFoundError:
-            pass
-        try:
-            shutil.rmtree(exp.work_path)
-        except FileNotFoundError:
-            pass
-
-    # Set up experiment config
-    exp.setup_for_test_run()
+        for path in [exp.archive_path, exp.work_path]:
+            if reaper is not None:
+                reaper.trash(path)
+            else:
+                try:
+                    shutil.rmtree(path)
+                except FileNotFoundError:
+                    pass
+
+    # Set up experiment config. The changes are written with any other
+    # configuration edits before payu is run
+    exp.setup_for_test_run(apply=False)
 
     return exp
 
@@ -0,0 +1,128 @@
+# Copyright 2024 ACCESS-NRI and contributors. See the top-level COPYRIGHT file for details.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Compare the checksums of many experiments, extracting each one once"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from model_config_tests.checksum_digest import checksum_digest
+from model_config_tests.exp_test_helper import ExpTestHelper
+
+# Default number of experiments to extract checksums from at once
+DEFAULT_EXTRACT_WORKERS = 4
+
+
+def get_lab_path(experiment: Path) -> Path:
+    """
+    Derive the lab path from the experiment configuration directory
+    archive symlink
+    """
+    archive_symlink = experiment / "archive"
+    if not archive_symlink.is_symlink():
+        raise ValueError(f"Archive symlink does not exist in {experiment}.")
+
+    # experiment/archive symlink points to lab_path/archive/exp_name
+    return archive_symlink.resolve().parent.parent
+
+
+def extract_experiment_checksums(experiment: Path) -> dict[str, Any]:
+    """Extract the full checksums from the first output of an experiment.
+    The model is used directly, rather than the cached extraction, so the
+    experiment archive is only read"""
+    exp = ExpTestHelper(
+        control_path=experiment,
+        lab_path=get_lab_path(experiment),
+        disable_payu_run=True,
+    )
+    return exp.model.extract_full_checksums(exp.model.output_0)
+
+
+class ExperimentChecksumStore:
+    """
+    Store of the checksums of a set of experiments, which are each extracted
+    once and shared by all comparisons.
+
+    Experiments are grouped into equivalence classes by the digest of their
+    checksums, so the checksums of N experiments are compared in O(N) rather
+    than comparing every pair.
+
+    Parameters
+    ----------
+    experiments: list[Path]
+        The experiment control directories
+    max_workers: int
+        The maximum number of experiments to extract checksums from at once
+    """
+
+    def __init__(
+        self,
+        experiments: list[Path],
+        max_workers: int = DEFAULT_EXTRACT_WORKERS,
+    ):
+        self.experiments = list(experiments)
+        self.max_workers = max_workers
+        self._checksums = {}
+        self._digests = {}
+        self._errors = {}
+        self._extracted = False
+
+    def extract_all(self) -> None:
+        """Extract the checksums of all experiments in parallel. Errors are
+        stored and raised when the experiment's checksums are used"""
+        if self._extracted or not self.experiments:
+            return
+
+        max_workers = max(1, min(self.max_workers, len(self.experiments)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                experiment: executor.submit(extract_experiment_checksums, experiment)
+                for experiment in self.experiments
+            }
+            for experiment, future in futures.items():
+                try:
+                    checksums = future.result()
+                except Exception as e:
+                    self._errors[experiment] = e
+                else:
+                    self._checksums[experiment] = checksums
+                    self._digests[experiment] = checksum_digest(checksums)
+        self._extracted = True
+
+    def checksums(self, experiment: Path) -> dict[str, Any]:
+        """Return the checksums of an experiment"""
+        self._check(experiment)
+        return self._checksums[experiment]
+
+    def digest(self, experiment: Path) -> str:
+        """Return the digest of an experiment's checksums"""
+        self._check(experiment)
+        return self._digests[experiment]
+
+    def _check(self, experiment: Path) -> None:
+        self.extract_all()
+        if experiment in self._errors:
+            raise RuntimeError(
+                f"Error extracting checksums for {experiment.name}: "
+                f"{self._errors[experiment]}"
+            ) from self._errors[experiment]
+        if experiment not in self._checksums:
+            raise KeyError(f"Experiment {experiment} is not in the store")
+
+    def equivalent(self, experiment_1: Path, experiment_2: Path) -> bool:
+        """Return whether two experiments have identical checksums"""
+        return self.digest(experiment_1) == self.digest(experiment_2)
+
+    def equivalence_classes(self) -> list[list[Path]]:
+        """
+        Group experiments with identical checksums, in the order each class
+        first appears in the experiments. Experiments whose checksums could
+        not be extracted are left out
+        """
+        self.extract_all()
+        classes = {}
+        for experiment in self.experiments:
+            if experiment in self._digests:
+                classes.setdefault(self._digests[experiment], []).append(experiment)
+        return list(classes.values())
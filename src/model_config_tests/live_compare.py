@@ -0,0 +1,182 @@
+# Copyright 2024 ACCESS-NRI and contributors. See the top-level COPYRIGHT file for details.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Comparison of checksums written by running experiments"""
+
+import threading
+from collections import Counter, deque
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any, Optional
+
+from model_config_tests.util import READ_BLOCK_SIZE
+
+# Seconds between reads of the output files of running experiments
+LIVE_POLL_SECONDS = 30.0
+
+
+class OutputFollower:
+    """
+    Read the lines appended to a model output file while the model is
+    running. The file is opened once it exists and is kept open, so lines
+    written before the file is moved (e.g. when payu archives the work
+    directory) are still read.
+
+    Parameters
+    ----------
+    path: Path
+        Path to the output file, which may not exist yet
+    block_size: int
+        Number of bytes to read at a time
+    """
+
+    def __init__(self, path: Path, block_size: int = READ_BLOCK_SIZE):
+        self.path = Path(path)
+        self.block_size = block_size
+        self._file = None
+        # Incomplete line at the end of the data read so far
+        self._remainder = b""
+
+    def read_lines(self, final: bool = False) -> Iterator[bytes]:
+        """
+        Yield the complete lines written since the last read, without the
+        trailing newlines. An incomplete last line is kept until it has been
+        finished, unless final is set (e.g. once the model has finished)
+        """
+        if self._file is None:
+            try:
+                self._file = open(self.path, "rb")
+            except FileNotFoundError:
+                return
+
+        while True:
+            block = self._file.read(self.block_size)
+            if not block:
+                break
+            data = self._remainder + block
+            end = data.rfind(b"\n") + 1
+            self._remainder = data[end:]
+            if end:
+                yield from data[: end - 1].split(b"\n")
+
+        if final and self._remainder:
+            yield self._remainder
+            self._remainder = b""
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class LiveComparison:
+    """
+    Compare the checksums written to the output files of two running
+    experiments, record by record, while the experiments are running.
+
+    Records are compared in the order they are written, so a divergence is
+    found as soon as both experiments have written their first differing
+    record, rather than once both runs have finished. Only the records that
+    one experiment has written ahead of the other are held in memory.
+
+    Parameters
+    ----------
+    expected_file: Path
+        Output file of the reference experiment
+    produced_file: Path
+        Output file of the experiment compared against the reference
+    parse_record: Callable[[bytes], Optional[tuple[str, str]]]
+        Parses a line of an output file into a (field, checksum) record,
+        returning None for lines that are not checksums
+    """
+
+    def __init__(
+        self,
+        expected_file: Path,
+        produced_file: Path,
+        parse_record: Callable[[bytes], Optional[tuple[str, str]]],
+    ):
+        self.followers = [OutputFollower(expected_file), OutputFollower(produced_file)]
+        self.parse_record = parse_record
+        # Records read from each file that have not been compared yet
+        self._pending = [deque(), deque()]
+        # Number of compared checksums of each field
+        self._field_counts = Counter()
+        self.n_compared = 0
+        self.divergence = None
+
+    def poll(self, final: bool = False) -> Optional[dict[str, Any]]:
+        """
+        Read any new records from both output files and compare them.
+        Returns a report of the first differing record once the records
+        have diverged, otherwise None.
+
+        The report has the "record_index" of the differing record, the
+        expected "field" and its "field_index" (the index of the checksum
+        in the field's list of extracted checksums), and the "expected" and
+        "produced" [field, checksum] records.
+        """
+        if self.divergence is not None:
+            return self.divergence
+
+        for follower, pending in zip(self.followers, self._pending):
+            for line in follower.read_lines(final):
+                record = self.parse_record(line)
+                if record:
+                    pending.append(record)
+
+        expected, produced = self._pending
+        while expected and produced:
+            expected_record = expected.popleft()
+            produced_record = produced.popleft()
+            field = expected_record[0]
+            if expected_record != produced_record:
+                self.divergence = {
+                    "record_index": self.n_compared,
+                    "field": field,
+                    "field_index": self._field_counts[field],
+                    "expected": list(expected_record),
+                    "produced": list(produced_record),
+                }
+                return self.divergence
+            self._field_counts[field] += 1
+            self.n_compared += 1
+
+        return None
+
+    def follow(
+        self, stop: threading.Event, poll_interval: float = LIVE_POLL_SECONDS
+    ) -> Optional[dict[str, Any]]:
+        """
+        Compare records as they are written until they diverge, or until
+        stop is set (e.g. once both experiments have finished), after which
+        the remaining records are compared. Returns the divergence report
+        (see poll), or None if all compared records are equal.
+        """
+        try:
+            while not stop.wait(poll_interval):
+                if self.poll():
+                    return self.divergence
+            return self.poll(final=True)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        for follower in self.followers:
+            follower.close()
+
+
+def format_live_divergence(report: dict[str, Any]) -> str:
+    """Return a one line summary of a live comparison divergence report"""
+    expected_field, expected_checksum = report["expected"]
+    produced_field, produced_checksum = report["produced"]
+    if expected_field != produced_field:
+        return (
+            f"checksum record {report['record_index']} is {produced_field} "
+            f"{produced_checksum}, expected {expected_field} {expected_checksum}"
+        )
+    return (
+        f"checksum record {report['record_index']} of {expected_field} "
+        f"(timestep index {report['field_index']}) is {produced_checksum}, "
+        f"expected {expected_checksum}"
+    )
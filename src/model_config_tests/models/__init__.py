@@ -1,12 +1,56 @@
-from model_config_tests.models.accessesm1p5 import AccessEsm1p5
-from model_config_tests.models.accessesm1p6 import AccessEsm1p6
-from model_config_tests.models.accessom2 import AccessOm2
-from model_config_tests.models.accessom3 import AccessOm3
+"""Model specific setup and post-processing. Model modules (and their
+dependencies, e.g. netCDF4) are only imported when first used"""
+
+import importlib
+from collections.abc import Iterator, Mapping
+
+
+class ModelIndex(Mapping):
+    """
+    Mapping of payu configuration model names to model classes. The module
+    for a model is imported when its class is first looked up.
+
+    Parameters
+    ----------
+    class_paths: dict[str, str]
+        Model names mapped to the module and class name, e.g.
+        "model_config_tests.models.accessom2.AccessOm2"
+    """
+
+    def __init__(self, class_paths: dict[str, str]):
+        self.class_paths = class_paths
+        self._classes = {}
+
+    def __getitem__(self, model_name: str) -> type:
+        if model_name not in self._classes:
+            module_name, class_name = self.class_paths[model_name].rsplit(".", 1)
+            module = importlib.import_module(module_name)
+            self._classes[model_name] = getattr(module, class_name)
+        return self._classes[model_name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.class_paths)
+
+    def __len__(self) -> int:
+        return len(self.class_paths)
+
 
 # Mapping payu configuration model name to class
-index = {
-    "access-om2": AccessOm2,
-    "access-om3": AccessOm3,
-    "access": AccessEsm1p5,
-    "access-esm1.6": AccessEsm1p6,
-}
+index = ModelIndex(
+    {
+        "access-om2": "model_config_tests.models.accessom2.AccessOm2",
+        "access-om3": "model_config_tests.models.accessom3.AccessOm3",
+        "access": "model_config_tests.models.accessesm1p5.AccessEsm1p5",
+        "access-esm1.6": "model_config_tests.models.accessesm1p6.AccessEsm1p6",
+    }
+)
+
+
+def __getattr__(name: str):
+    """Import model classes on first access, e.g.
+    from model_config_tests.models import AccessOm2"""
+    for class_path in index.class_paths.values():
+        module_name, class_name = class_path.rsplit(".", 1)
+        if class_name == name:
+            return getattr(importlib.import_module(module_name), class_name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
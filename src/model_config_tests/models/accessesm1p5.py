@@ -1,14 +1,16 @@
 """Specific ACCESS-ESM1.5 Model setup and post-processing"""
 
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any
-
-import f90nml
-import yaml
+from typing import Any, Optional
 
 from model_config_tests.models.model import SCHEMA_VERSION_1_0_0, Model
-from model_config_tests.models.mom5 import mom5_extract_checksums
-from model_config_tests.models.um7 import um7_extract_norms
+from model_config_tests.models.mom5 import (
+    mom5_extract_checksums,
+    parse_checksum_line,
+)
+from model_config_tests.models.um7 import parse_norm_line, um7_extract_norms
 from model_config_tests.util import DAY_IN_SECONDS
 
 # Default model runtime (24 hrs)
@@ -54,9 +56,6 @@ class AccessEsm1p5(Model):
     ):
         """Set config files to a short time period for experiment run.
         Default is 24 hours"""
-        with open(self.experiment.config_path) as f:
-            doc = yaml.safe_load(f)
-
         assert (
             seconds % DAY_IN_SECONDS == 0
         ), "Only days are supported in payu UM driver"
@@ -71,13 +70,15 @@ class AccessEsm1p5(Model):
             "days": days,
             "seconds": 0,
         }
-        if "calendar" in doc:
-            doc["calendar"]["runtime"] = runtime_config
-        else:
-            doc["calendar"] = {"runtime": runtime_config}
 
-        with open(self.experiment.config_path, "w") as f:
-            yaml.dump(doc, f)
+        def set_runtime(doc: dict) -> None:
+            if "calendar" in doc:
+                doc["calendar"]["runtime"] = runtime_config
+            else:
+                doc["calendar"] = {"runtime": runtime_config}
+
+        config_patch = self.experiment.config_patch
+        config_patch.edit_yaml(self.experiment.config_path, set_runtime)
 
         # Write UM and CICE restarts at daily frequency.
         # Only set when these components are present to allow for
@@ -87,27 +88,49 @@ class AccessEsm1p5(Model):
             atmosphere_config = (
                 self.experiment.control_path / self.submodels["um"] / "namelists"
             )
-            # Write atmosphere restarts at daily frequency
-            with open(atmosphere_config) as f:
-                atmosphere_nml = f90nml.read(f)
-            # 48 timesteps per day
-            atmosphere_nml["NLSTCGEN"]["DUMPFREQim"] = [48, 0, 0, 0]
-            atmosphere_nml.write(atmosphere_config, force=True)
+            # Write atmosphere restarts at daily frequency (48 timesteps per day)
+            config_patch.patch_namelist(
+                atmosphere_config, {"NLSTCGEN": {"DUMPFREQim": [48, 0, 0, 0]}}
+            )
 
         if "cice" in self.submodels:
             # Write ice restarts at daily frequency
             ice_config = (
                 self.experiment.control_path / self.submodels["cice"] / "cice_in.nml"
             )
-            with open(ice_config) as f:
-                ice_nml = f90nml.read(f)
-            ice_nml["setup_nml"]["dumpfreq"] = "d"
-            ice_nml.write(ice_config, force=True)
+            config_patch.patch_namelist(ice_config, {"setup_nml": {"dumpfreq": "d"}})
 
     def output_exists(self) -> bool:
         """Check for existing output file"""
         return self.output_file.exists()
 
+    def checksum_files(self, output_directory: Path = None) -> list[Path]:
+        """Return the submodel output files that checksums are extracted from"""
+        if output_directory is None:
+            output_directory = self.output_0
+
+        output_files = []
+        if "mom" in self.submodels:
+            output_files.append(output_directory / self.model_std_file)
+        if "um" in self.submodels:
+            output_files.append(
+                output_directory / self.submodels["um"] / UM_OUTPUT_FILE
+            )
+        return output_files
+
+    def live_output(
+        self,
+    ) -> tuple[Path, Callable[[bytes], Optional[tuple[str, str]]]]:
+        """Return the output file the checksums are extracted from while the
+        model is running, and its line parser, preferentially using mom5.
+        payu writes the model stdout to the control directory until the
+        model has finished, while the UM writes its output to the work
+        directory"""
+        if "mom" in self.submodels:
+            output_file = self.experiment.control_path / self.output_filename
+            return output_file, parse_checksum_line
+        return self.experiment.work_path / self.output_filename, parse_norm_line
+
     def extract_checksums(
         self,
         output_directory: Path = None,
@@ -159,14 +182,23 @@ class AccessEsm1p5(Model):
 
         return checksums
 
-    def extract_full_checksums(self, output_directory: Path = None) -> dict[str, Any]:
+    def extract_full_checksums(
+        self, output_directory: Path = None, max_workers: Optional[int] = None
+    ) -> dict[str, Any]:
         """
         Parse all available checksums from the output files.
 
+        The submodel output files are independent, so they are parsed at the
+        same time in a thread pool.
+
         Parameters
         ----------
         output_directory: str
             The output directory for the experiment run
+        max_workers: Optional[int]
+            The maximum number of submodel output files to parse at the same
+            time. Defaults to one worker per submodel output file. Setting to
+            1 parses the files one after the other.
 
         Returns
         ----------
@@ -176,14 +208,32 @@ class AccessEsm1p5(Model):
         if output_directory is None:
             output_directory = self.output_0
 
-        output_checksums = {}
+        # Map of submodel to checksum extraction function and output file
+        extract_tasks = {}
         if "mom" in self.submodels:
-            output_checksums["mom"] = dict(
-                mom5_extract_checksums(output_directory / self.model_std_file)
+            extract_tasks["mom"] = (
+                mom5_extract_checksums,
+                output_directory / self.model_std_file,
             )
 
         if "um" in self.submodels:
             um_output = output_directory / self.submodels["um"] / UM_OUTPUT_FILE
-            output_checksums["um"] = dict(um7_extract_norms(um_output))
+            extract_tasks["um"] = (um7_extract_norms, um_output)
 
-        return output_checksums
+        if max_workers is None:
+            max_workers = len(extract_tasks)
+
+        if max_workers <= 1 or len(extract_tasks) <= 1:
+            return {
+                submodel: dict(extract_func(output_file))
+                for submodel, (extract_func, output_file) in extract_tasks.items()
+            }
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                submodel: executor.submit(extract_func, output_file)
+                for submodel, (extract_func, output_file) in extract_tasks.items()
+            }
+            return {
+                submodel: dict(future.result()) for submodel, future in futures.items()
+            }
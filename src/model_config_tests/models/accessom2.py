@@ -1,16 +1,18 @@
 """Specific Access-OM2 Model setup and post-processing"""
 
+from collections.abc import Callable
 from pathlib import Path
-from typing import Any
-
-import f90nml
+from typing import Any, Optional
 
 from model_config_tests.models.model import (
     DEFAULT_RUNTIME_SECONDS,
     SCHEMA_VERSION_1_0_0,
     Model,
 )
-from model_config_tests.models.mom5 import mom5_extract_checksums
+from model_config_tests.models.mom5 import (
+    mom5_extract_checksums,
+    parse_checksum_line,
+)
 
 
 class AccessOm2(Model):
@@ -27,9 +29,6 @@ class AccessOm2(Model):
     ):
         """Set config files to a short time period for experiment run.
         Default is 3 hours"""
-        with open(self.accessom2_config) as f:
-            nml = f90nml.read(f)
-
         # Check that two of years, months, seconds is zero
         if sum(x == 0 for x in (years, months, seconds)) != 2:
             raise NotImplementedError(
@@ -37,13 +36,30 @@ class AccessOm2(Model):
                 + " at the same time. Two of which must be zero"
             )
 
-        nml["date_manager_nml"]["restart_period"] = [years, months, seconds]
-        nml.write(self.accessom2_config, force=True)
+        self.experiment.config_patch.patch_namelist(
+            self.accessom2_config,
+            {"date_manager_nml": {"restart_period": [years, months, seconds]}},
+        )
 
     def output_exists(self) -> bool:
         """Check for existing output file"""
         return self.output_file.exists()
 
+    def checksum_files(self, output_directory: Path = None) -> list[Path]:
+        """Return the output file that checksums are extracted from"""
+        if output_directory:
+            return [output_directory / self.output_filename]
+        return [self.output_file]
+
+    def live_output(
+        self,
+    ) -> tuple[Path, Callable[[bytes], Optional[tuple[str, str]]]]:
+        """Return the output file the model writes checksums to, and the
+        checksum line parser. payu writes the model stdout to the control
+        directory while the model is running, and only moves it to the work
+        directory once the model has finished"""
+        return self.experiment.control_path / self.output_filename, parse_checksum_line
+
     def extract_checksums(
         self,
         output_directory: Path = None,
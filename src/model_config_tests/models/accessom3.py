@@ -4,11 +4,8 @@ from collections import defaultdict
 from pathlib import Path
 from typing import Any
 
-import f90nml
-from netCDF4 import Dataset
-from payu.models.cesm_cmeps import Runconfig
-
 from model_config_tests.models.model import SCHEMA_VERSION_1_0_0, Model
+from model_config_tests.models.mom6 import mom6_read_checksums
 from model_config_tests.util import HOUR_IN_SECONDS
 
 # Default model runtime (6 hrs)
@@ -36,7 +33,7 @@ class AccessOm3(Model):
     ):
         """Set config files to a short time period for experiment run.
         Default is 6 hours"""
-        runconfig = Runconfig(self.runconfig)
+        runconfig = self.experiment.config_patch.runconfig(self.runconfig)
 
         # Check that ocean model component is MOM since checksums are obtained from
         # MOM6 restarts. Fail early if not
@@ -65,22 +62,34 @@ class AccessOm3(Model):
         runconfig.set("CLOCK_attributes", "stop_n", n)
         runconfig.set("CLOCK_attributes", "stop_option", freq)
 
-        runconfig.write()
-
         # Unfortunately WW3 doesn't (yet) obey the nuopc.runconfig. This should change in a
         # future release, but for now we have to set WW3 runtime in wav_in. See
         # https://github.com/COSIMA/access-om3/issues/239
         if self.wav_in.exists():
-            with open(self.wav_in) as f:
-                nml = f90nml.read(f)
-
-            nml["output_date_nml"]["date"]["restart"]["stride"] = int(n)
-            nml.write(self.wav_in, force=True)
+            self.experiment.config_patch.patch_namelist(
+                self.wav_in,
+                {"output_date_nml": {"date": {"restart": {"stride": int(n)}}}},
+            )
 
     def output_exists(self) -> bool:
         """Check for existing output file"""
         return self.mom_restart_pointer.exists()
 
+    def checksum_files(self, output_directory: Path = None) -> list[Path]:
+        """Return the restart pointer file and the restart files (or first
+        restart tiles) that checksums are extracted from"""
+        if output_directory:
+            mom_restart_pointer = output_directory / self.mom_restart_pointer_filename
+        else:
+            mom_restart_pointer = self.mom_restart_pointer
+
+        output_files = [mom_restart_pointer]
+        with open(mom_restart_pointer) as f:
+            for restart_file in f.readlines():
+                restart = mom_restart_pointer.parent / restart_file.rstrip()
+                output_files.append(self._collect_restart_tiles(restart))
+        return output_files
+
     def extract_checksums(
         self,
         output_directory: Path = None,
@@ -103,11 +112,10 @@ class AccessOm3(Model):
                 restart = mom_restart_pointer.parent / restart_file.rstrip()
                 # collect restart file / the first tile
                 restart_output = self._collect_restart_tiles(restart)
-                with Dataset(restart_output, "r") as rootgrp:
-                    for vname in sorted(rootgrp.variables):
-                        var = rootgrp[vname]
-                        if "checksum" in var.ncattrs():
-                            output_checksums[vname.strip()].append(var.checksum.strip())
+                # Only the file metadata is read, not the whole dataset
+                checksums = mom6_read_checksums(restart_output)
+                for vname, checksum in checksums.items():
+                    output_checksums[vname.strip()].append(checksum.strip())
 
         if schema_version is None:
             schema_version = self.default_schema_version
@@ -131,39 +139,16 @@ class AccessOm3(Model):
             schema_version=SCHEMA_VERSION_1_0_0,
         )["output"]
 
-    def check_checksums_over_restarts(
-        self, long_run_checksum, short_run_checksum_0, short_run_checksum_1
-    ) -> bool:
-        """Compare a checksums from a long run (e.g. 2 days) against
-        checksums from 2 short runs (e.g. 1 day)"""
-        short_run_checksums = short_run_checksum_0["output"]
-        for field, checksums in short_run_checksum_1["output"].items():
-            if field not in short_run_checksums:
-                short_run_checksums[field] = checksums
-            else:
-                short_run_checksums[field].extend(checksums)
-
-        matching_checksums = True
-        for field, checksums in long_run_checksum["output"].items():
-            for checksum in checksums:
-                if field not in short_run_checksums:
-                    print(
-                        f"Checksum field for {field} found in long run but not in short runs"
-                    )
-                    matching_checksums = False
-                else:
-                    if checksum not in short_run_checksums[field]:
-                        # Allow for checksums to differ by 8 in the first hex digit to allow
-                        # for differences in the sign of zero between restart arrays
-                        # See https://github.com/ACCESS-NRI/access-om3-configs/issues/823
-                        first_digit = int(checksum[0], 16)
-                        pmzeros_digit = (first_digit + 8) % 16
-                        pmzeros_checksum = f"{pmzeros_digit:X}" + checksum[1:]
-                        if pmzeros_checksum not in short_run_checksums[field]:
-                            print(f"Unequal checksum: {field}: {checksum}")
-                            matching_checksums = False
-
-        return matching_checksums
+    @staticmethod
+    def canonicalise_checksum(checksum: str) -> str:
+        """
+        Allow for checksums to differ by 8 in the first hex digit to allow
+        for differences in the sign of zero between restart arrays, by
+        clearing the top bit of the first hex digit.
+        See https://github.com/ACCESS-NRI/access-om3-configs/issues/823
+        """
+        first_digit = int(checksum[0], 16)
+        return f"{first_digit % 8:X}" + checksum[1:]
 
     @staticmethod
     def _collect_restart_tiles(restart: Path) -> list[Path]:
@@ -1,6 +1,9 @@
 """Generic Model class"""
 
+from collections import defaultdict
+from collections.abc import Callable
 from pathlib import Path
+from typing import Any, Optional
 
 from model_config_tests.util import HOUR_IN_SECONDS
 
@@ -68,6 +71,42 @@ class Model:
         """
         raise NotImplementedError
 
+    def checksum_files(self, output_directory: Path = None) -> list[Path]:
+        """
+        Return the output files that checksums are extracted from. This is
+        used to detect when cached checksums are out of date.
+
+        Parameters
+        ----------
+        output_directory: str
+            The output directory for the experiment run. The default output
+            directory is set in the model class
+
+        Returns
+        ----------
+        list[Path]
+            List of paths to the output files
+        """
+        raise NotImplementedError
+
+    def live_output(
+        self,
+    ) -> tuple[Path, Callable[[bytes], Optional[tuple[str, str]]]]:
+        """
+        Return the output file that checksums are written to while the
+        model is running (e.g. the model stdout in the control directory,
+        before payu moves it to the work directory), and a function
+        that parses a line of the file into a (field, checksum) record, or
+        None if the line is not a checksum. This is used to compare the
+        output of running experiments.
+
+        Returns
+        ----------
+        tuple[Path, Callable[[bytes], Optional[tuple[str, str]]]]
+            The path to the output file and the line parser
+        """
+        raise NotImplementedError
+
     def set_model_runtime(
         self, years: int = 0, months: int = 0, seconds: int = DEFAULT_RUNTIME_SECONDS
     ):
@@ -78,26 +117,99 @@ class Model:
         """Check for existing output files"""
         raise NotImplementedError
 
+    @staticmethod
+    def canonicalise_checksum(checksum: str) -> str:
+        """Return the form of a checksum used when comparing checksums
+        over restarts. By default checksums are compared as is"""
+        return checksum
+
+    def compare_checksums_over_restarts(
+        self, long_run_checksum, short_run_checksum_0, short_run_checksum_1
+    ) -> dict[str, dict[str, Any]]:
+        """Compare a checksums from a long run (e.g. 2 days) against
+        checksums from 2 short runs (e.g. 1 day), and return a report of
+        fields with mismatching checksums. See find_restart_mismatches"""
+        return find_restart_mismatches(
+            long_run_checksum,
+            [short_run_checksum_0, short_run_checksum_1],
+            canonicalise=self.canonicalise_checksum,
+        )
+
     def check_checksums_over_restarts(
         self, long_run_checksum, short_run_checksum_0, short_run_checksum_1
     ) -> bool:
         """Compare a checksums from a long run (e.g. 2 days) against
         checksums from 2 short runs (e.g. 1 day)"""
-        short_run_checksums = short_run_checksum_0["output"]
-        for field, checksums in short_run_checksum_1["output"].items():
-            if field not in short_run_checksums:
-                short_run_checksums[field] = checksums
-            else:
-                short_run_checksums[field].extend(checksums)
-
-        matching_checksums = True
-        for field, checksums in long_run_checksum["output"].items():
-            for checksum in checksums:
-                if (
-                    field not in short_run_checksums
-                    or checksum not in short_run_checksums[field]
-                ):
-                    print(f"Unequal checksum: {field}: {checksum}")
-                    matching_checksums = False
-
-        return matching_checksums
+        mismatches = find_restart_mismatches(
+            long_run_checksum,
+            [short_run_checksum_0, short_run_checksum_1],
+            canonicalise=self.canonicalise_checksum,
+        )
+        print_restart_mismatches(mismatches)
+        return not mismatches
+
+
+def find_restart_mismatches(
+    long_run_checksum: dict[str, Any],
+    short_run_checksums: list[dict[str, Any]],
+    canonicalise: Callable[[str], str] = None,
+) -> dict[str, dict[str, Any]]:
+    """
+    Check every checksum from a long run is found in the checksums of a
+    sequence of short runs, for the same field.
+
+    The short run checksums are indexed once into a hash set per field, so
+    each long run checksum is checked in constant time.
+
+    Parameters
+    ----------
+    long_run_checksum: dict[str, Any]
+        Checksums from the long run, in the checksum schema format
+    short_run_checksums: list[dict[str, Any]]
+        Checksums from each of the short runs, in the checksum schema format
+    canonicalise: Callable[[str], str]
+        Function applied to checksums before comparison, e.g. to ignore
+        differences that are known to be harmless. Default is no change.
+
+    Returns
+    ----------
+    dict[str, dict[str, Any]]
+        Report of mismatching fields. For each field, "in_short_runs" is
+        whether the field is found in the short runs, and "unmatched" is the
+        list of long run checksums that were not found in the short runs.
+        An empty report means all checksums match.
+    """
+    if canonicalise is None:
+        canonicalise = Model.canonicalise_checksum
+
+    index = defaultdict(set)
+    for short_run_checksum in short_run_checksums:
+        for field, checksums in short_run_checksum["output"].items():
+            index[field].update(canonicalise(checksum) for checksum in checksums)
+
+    mismatches = {}
+    for field, checksums in long_run_checksum["output"].items():
+        if field not in index:
+            mismatches[field] = {"in_short_runs": False, "unmatched": list(checksums)}
+            continue
+
+        field_index = index[field]
+        unmatched = [
+            checksum
+            for checksum in checksums
+            if canonicalise(checksum) not in field_index
+        ]
+        if unmatched:
+            mismatches[field] = {"in_short_runs": True, "unmatched": unmatched}
+
+    return mismatches
+
+
+def print_restart_mismatches(mismatches: dict[str, dict[str, Any]]) -> None:
+    """Print out a report of mismatching checksums over restarts"""
+    for field, mismatch in mismatches.items():
+        if not mismatch["in_short_runs"]:
+            print(f"Checksum field for {field} found in long run but not in short runs")
+        else:
+            for checksum in mismatch["unmatched"]:
+                print(f"Unequal checksum: {field}: {checksum}")
@@ -3,17 +3,42 @@
 import re
 from collections import defaultdict
 from pathlib import Path
+from typing import Optional
 
+from model_config_tests.util import READ_BLOCK_SIZE, iter_lines_with_prefix
 
-def mom5_extract_checksums(output_filename: Path) -> dict[str, list[any]]:
-    """Given an <model>.out file, extract the checksums generated by the mom5 model"""
-    # Regex pattern for checksums in the `<model>.out` file
-    # Examples:
-    # [chksum] ht              -2390360641069121536
-    # [chksum] hu               6389284661071183872
-    # [chksum] htr               928360042410663049
-    pattern = r"\[chksum\]\s+(.+)\s+(-?\d+)"
+# All checksum lines in the `<model>.out` file start with this prefix
+CHECKSUM_PREFIX = b"[chksum]"
 
+# Regex pattern for checksums in the `<model>.out` file
+# Examples:
+# [chksum] ht              -2390360641069121536
+# [chksum] hu               6389284661071183872
+# [chksum] htr               928360042410663049
+CHECKSUM_PATTERN = re.compile(r"\[chksum\]\s+(.+)\s+(-?\d+)")
+
+
+def parse_checksum_line(line: bytes) -> Optional[tuple[str, str]]:
+    """Return the field and checksum of a `[chksum]` line, or None if the
+    line is not a checksum"""
+    if not line.startswith(CHECKSUM_PREFIX):
+        return None
+    match = CHECKSUM_PATTERN.match(line.decode())
+    if not match:
+        return None
+    return match.group(1).strip(), match.group(2).strip()
+
+
+def mom5_extract_checksums(
+    output_filename: Path, block_size: int = READ_BLOCK_SIZE
+) -> dict[str, list[any]]:
+    """
+    Given an <model>.out file, extract the checksums generated by the mom5 model.
+
+    The file is streamed in large binary blocks, and the full regex is only
+    run on lines starting with the checksum prefix, as these logs can reach
+    hundreds of MB for long high resolution runs.
+    """
     # checksums outputted in form:
     # {
     #   "ht": ["-2390360641069121536"],
@@ -23,15 +48,10 @@ def mom5_extract_checksums(output_filename: Path) -> dict[str, list[any]]:
     # with potential for multiple checksums for one key.
     output_checksums: dict[str, list[any]] = defaultdict(list)
 
-    with open(output_filename) as f:
-        for line in f:
-            # Check for checksum pattern match
-            match = re.match(pattern, line)
-            if match:
-                # Extract values
-                field = match.group(1).strip()
-                checksum = match.group(2).strip()
-
-                output_checksums[field].append(checksum)
+    for line in iter_lines_with_prefix(output_filename, CHECKSUM_PREFIX, block_size):
+        record = parse_checksum_line(line)
+        if record:
+            field, checksum = record
+            output_checksums[field].append(checksum)
 
     return output_checksums
@@ -0,0 +1,211 @@
+"""Specific MOM6 postprocessing"""
+
+import struct
+from pathlib import Path
+from typing import Any, BinaryIO
+
+# Magic numbers at the start of netCDF classic and HDF5 (netCDF4) files
+NETCDF_CLASSIC_MAGIC = b"CDF"
+HDF5_MAGIC = b"\x89HDF\r\n\x1a\n"
+
+# Errors reading a netCDF4 file with h5py, after which the file is opened
+# with netCDF4 instead. h5py raises OSError for files it can't open, and
+# KeyError, TypeError or ValueError for objects and attributes it can't read
+HDF5_READ_ERRORS = (ImportError, OSError, KeyError, TypeError, ValueError)
+
+# Tags for the lists in a netCDF classic header
+NC_DIMENSION = 0x0A
+NC_VARIABLE = 0x0B
+NC_ATTRIBUTE = 0x0C
+
+# netCDF classic external types, mapped to struct formats
+NC_CHAR = 2
+NC_TYPE_FORMATS = {
+    1: "b",  # NC_BYTE
+    NC_CHAR: "c",
+    3: "h",  # NC_SHORT
+    4: "i",  # NC_INT
+    5: "f",  # NC_FLOAT
+    6: "d",  # NC_DOUBLE
+    # CDF-5 types
+    7: "B",  # NC_UBYTE
+    8: "H",  # NC_USHORT
+    9: "I",  # NC_UINT
+    10: "q",  # NC_INT64
+    11: "Q",  # NC_UINT64
+}
+
+
+class NetcdfClassicHeader:
+    """
+    Reader for the header of a netCDF classic format file (CDF-1, CDF-2 or
+    CDF-5), which holds all the dimensions, attributes and variable
+    definitions before any data. Only the header is read, however large the
+    file is. See the netCDF classic file format specification for the
+    layout.
+
+    Parameters
+    ----------
+    f: BinaryIO
+        The file, opened in binary mode at the start of the file
+    """
+
+    def __init__(self, f: BinaryIO):
+        self.f = f
+        magic = self._read(4)
+        if magic[:3] != NETCDF_CLASSIC_MAGIC or magic[3] not in (1, 2, 5):
+            raise ValueError("Not a netCDF classic format file")
+        self.version = magic[3]
+
+        # Sizes and offsets are 64-bit in CDF-5, and offsets are 64-bit in
+        # CDF-2 (64-bit offset) files
+        self._size_format = ">q" if self.version == 5 else ">i"
+        self._offset_format = ">i" if self.version == 1 else ">q"
+
+        self.numrecs = self._non_neg()
+        self.dimensions = self._read_dimensions()
+        self.attributes = self._read_attributes()
+        self.variables = self._read_variables()
+
+    def _read(self, n: int) -> bytes:
+        data = self.f.read(n)
+        if len(data) != n:
+            raise ValueError("Truncated netCDF classic header")
+        return data
+
+    def _unpack(self, fmt: str) -> int:
+        return struct.unpack(fmt, self._read(struct.calcsize(fmt)))[0]
+
+    def _non_neg(self) -> int:
+        return self._unpack(self._size_format)
+
+    def _name(self) -> str:
+        length = self._non_neg()
+        name = self._read(length)
+        self._skip_padding(length)
+        return name.decode("utf-8")
+
+    def _skip_padding(self, length: int) -> None:
+        """Values are padded to a multiple of 4 bytes"""
+        self._read(-length % 4)
+
+    def _list_length(self, tag: int) -> int:
+        """Read the header of a list, which is either ABSENT (both zero) or
+        the tag and number of elements"""
+        list_tag = self._unpack(">i")
+        nelems = self._non_neg()
+        if list_tag not in (0, tag) or (list_tag == 0 and nelems != 0):
+            raise ValueError(f"Unexpected tag in netCDF classic header: {list_tag}")
+        return nelems
+
+    def _read_dimensions(self) -> dict[str, int]:
+        dimensions = {}
+        for _ in range(self._list_length(NC_DIMENSION)):
+            name = self._name()
+            dimensions[name] = self._non_neg()
+        return dimensions
+
+    def _read_attributes(self) -> dict[str, Any]:
+        attributes = {}
+        for _ in range(self._list_length(NC_ATTRIBUTE)):
+            name = self._name()
+            nc_type = self._unpack(">i")
+            nelems = self._non_neg()
+            if nc_type not in NC_TYPE_FORMATS:
+                raise ValueError(f"Unknown netCDF attribute type: {nc_type}")
+            fmt = NC_TYPE_FORMATS[nc_type]
+            size = nelems * struct.calcsize(fmt)
+            data = self._read(size)
+            self._skip_padding(size)
+
+            if nc_type == NC_CHAR:
+                value = data.decode("utf-8").rstrip("\x00")
+            else:
+                value = list(struct.unpack(f">{nelems}{fmt}", data))
+                if nelems == 1:
+                    value = value[0]
+            attributes[name] = value
+        return attributes
+
+    def _read_variables(self) -> dict[str, dict[str, Any]]:
+        variables = {}
+        for _ in range(self._list_length(NC_VARIABLE)):
+            name = self._name()
+            ndims = self._non_neg()
+            for _ in range(ndims):
+                self._non_neg()
+            variables[name] = self._read_attributes()
+            # Skip the type, size and data offset of the variable
+            self._unpack(">i")
+            self._non_neg()
+            self._unpack(self._offset_format)
+        return variables
+
+
+def mom6_read_checksums(restart: Path) -> dict[str, str]:
+    """
+    Return the checksum attributes of the variables in a MOM6 restart file,
+    sorted by variable name.
+
+    Only the file metadata is read: the header of netCDF classic files is
+    parsed directly, and netCDF4 (HDF5) files are read with h5py if it is
+    installed. Otherwise, the file is opened with netCDF4.Dataset.
+    """
+    with open(restart, "rb") as f:
+        magic = f.read(len(HDF5_MAGIC))
+        f.seek(0)
+        if magic.startswith(NETCDF_CLASSIC_MAGIC):
+            try:
+                header = NetcdfClassicHeader(f)
+            except ValueError:
+                # Unsupported header, so fall back to netCDF4
+                pass
+            else:
+                return {
+                    name: attributes["checksum"]
+                    for name, attributes in sorted(header.variables.items())
+                    if isinstance(attributes.get("checksum"), str)
+                }
+
+    if magic == HDF5_MAGIC:
+        try:
+            return _hdf5_read_checksums(restart)
+        except HDF5_READ_ERRORS:
+            # h5py is not installed, or couldn't read the file or its
+            # attributes, so fall back to netCDF4
+            pass
+    return _dataset_read_checksums(restart)
+
+
+def _hdf5_read_checksums(restart: Path) -> dict[str, str]:
+    """Read checksum attributes from a netCDF4 file using h5py. Raises an
+    ImportError if h5py is not installed, or one of HDF5_READ_ERRORS if
+    the file can't be read"""
+    import h5py
+
+    checksums = {}
+    with h5py.File(restart, "r") as f:
+        for name, dataset in f.items():
+            if not isinstance(dataset, h5py.Dataset):
+                continue
+            checksum = dataset.attrs.get("checksum")
+            if checksum is None:
+                continue
+            if isinstance(checksum, bytes):
+                checksum = checksum.decode("utf-8")
+            checksums[name] = str(checksum)
+    return dict(sorted(checksums.items()))
+
+
+def _dataset_read_checksums(restart: Path) -> dict[str, str]:
+    """Read checksum attributes by opening the file with netCDF4"""
+    # Imported here as netCDF4 (and numpy) are slow to import
+    import netCDF4
+
+    checksums = {}
+    with netCDF4.Dataset(restart, "r") as rootgrp:
+        for name in sorted(rootgrp.variables):
+            var = rootgrp[name]
+            if "checksum" in var.ncattrs():
+                checksums[name] = var.checksum
+    return checksums
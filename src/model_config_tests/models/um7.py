@@ -1,12 +1,32 @@
 """Specific Mom5 postprocessing"""
 
+import mmap
 import re
 from collections import defaultdict
 from pathlib import Path
+from typing import Optional
 
 FINAL_ABSOLUTE_NORM = "Final Absolute Norm"
 DEFAULT_N_NORMS = 10
 
+# Regex pattern for final absolute norms in the `atm.fort6.pe0` file
+# Examples:
+# Final Absolute Norm :   9.735899063190541E-003
+FINAL_ABSOLUTE_NORM_PATTERN = re.compile(
+    rf"\s*{FINAL_ABSOLUTE_NORM}\s+:\s+(\d+\.?\d*E?-?\d*)"
+)
+
+
+def parse_norm_line(line: bytes) -> Optional[tuple[str, str]]:
+    """Return the name and value of a final absolute norm line, or None if
+    the line is not a final absolute norm"""
+    if FINAL_ABSOLUTE_NORM.encode() not in line:
+        return None
+    match = FINAL_ABSOLUTE_NORM_PATTERN.match(line.decode())
+    if not match:
+        return None
+    return FINAL_ABSOLUTE_NORM, match.group(1).strip()
+
 
 def um7_extract_norms(
     output_filename: Path, n_norms: int = DEFAULT_N_NORMS
@@ -19,28 +39,62 @@ def um7_extract_norms(
     from the UM solver is sensitive to the atmosphere state, and will capture
     simulation divergence. For atmosphere only runs, the 'Final Absolute Norm'
     from the last timestep can be used in place of the MOM5 checksums.
-    """
-    # Regex pattern for final absolute norms in the `atm.fort6.pe0` file
-    # Examples:
-    # Final Absolute Norm :   9.735899063190541E-003
-    pattern = rf"\s*{FINAL_ABSOLUTE_NORM}\s+:\s+(\d+\.?\d*E?-?\d*)"
 
+    Only the last n_norms values are kept, so the file is memory-mapped and
+    searched backwards from the end, stopping once n_norms values are found.
+    As with a [-n_norms:] slice, all values are kept if n_norms is 0, and
+    all but the first -n_norms values if it is negative.
+    """
     # checksums outputted in form:
     # {
     #   "Final Absolute Norm": ["9.735899063190541E-003"],
     # }
-
     output_norms: dict[str, list[any]] = defaultdict(list)
 
-    with open(output_filename) as f:
-        for line in f:
-            # Check for checksum pattern match
-            match = re.match(pattern, line)
-            if match:
-                output_norms[FINAL_ABSOLUTE_NORM].append(match.group(1).strip())
+    with open(output_filename, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can not be memory-mapped
+            return output_norms
+
+        with mm:
+            if n_norms > 0:
+                norms = _reverse_find_norms(mm, n_norms)
+            else:
+                norms = _reverse_find_norms(mm)[-n_norms:]
 
-    # Save last n_norms
-    if FINAL_ABSOLUTE_NORM in output_norms:
-        output_norms[FINAL_ABSOLUTE_NORM] = output_norms[FINAL_ABSOLUTE_NORM][-n_norms:]
+    if norms:
+        output_norms[FINAL_ABSOLUTE_NORM] = norms
 
     return output_norms
+
+
+def _reverse_find_norms(mm: mmap.mmap, n_norms: Optional[int] = None) -> list[str]:
+    """Return the last n_norms final absolute norms in the mapped file, or
+    all of them if n_norms is None, in the order they were written"""
+    keyword = FINAL_ABSOLUTE_NORM.encode()
+    norms = []
+
+    end = len(mm)
+    while n_norms is None or len(norms) < n_norms:
+        pos = mm.rfind(keyword, 0, end)
+        if pos == -1:
+            break
+
+        # Expand the match out to the full line
+        line_start = mm.rfind(b"\n", 0, pos) + 1
+        line_end = mm.find(b"\n", pos)
+        if line_end == -1:
+            line_end = len(mm)
+
+        # Check for the norm pattern match
+        record = parse_norm_line(mm[line_start:line_end])
+        if record:
+            norms.append(record[1])
+
+        # Continue searching before this line
+        end = line_start
+
+    norms.reverse()
+    return norms
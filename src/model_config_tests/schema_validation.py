@@ -0,0 +1,104 @@
+# Copyright 2024 ACCESS-NRI and contributors. See the top-level COPYRIGHT file for details.
+# SPDX-License-Identifier: Apache-2.0
+
+"""JSON schema validation with validators reused across calls"""
+
+import hashlib
+import json
+import threading
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from jsonschema.exceptions import ValidationError
+
+# Validators keyed by the SHA-256 digest of their schema
+_validators: dict[str, Any] = {}
+_validators_lock = threading.Lock()
+
+
+def schema_digest(schema: dict) -> str:
+    """Return the SHA-256 digest of a schema's canonical JSON encoding"""
+    content = json.dumps(schema, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def get_validator(schema: dict):
+    """
+    Return a validator for the schema. The schema is only checked and the
+    validator only built the first time a schema with the same content is
+    used, and the validator is then shared. Raises a
+    jsonschema.exceptions.SchemaError if the schema is invalid.
+    """
+    digest = schema_digest(schema)
+    with _validators_lock:
+        validator = _validators.get(digest)
+    if validator is not None:
+        return validator
+
+    # Imported here as jsonschema is slow to import
+    import jsonschema
+
+    cls = jsonschema.validators.validator_for(schema)
+    cls.check_schema(schema)
+    # Build the validator from a copy, so later changes to the schema
+    # passed in don't affect the shared validator
+    validator = cls(json.loads(json.dumps(schema)))
+
+    with _validators_lock:
+        return _validators.setdefault(digest, validator)
+
+
+def validate(instance: Any, schema: dict) -> None:
+    """
+    Validate an instance against a schema using a shared validator. Like
+    jsonschema.validate, the most relevant error is raised as a
+    jsonschema.exceptions.ValidationError.
+    """
+    from jsonschema.exceptions import best_match
+
+    error = best_match(get_validator(schema).iter_errors(instance))
+    if error is not None:
+        raise error
+
+
+def validate_many(
+    instances: Mapping[str, Any], schema: dict
+) -> dict[str, list["ValidationError"]]:
+    """
+    Validate many instances (e.g. the metadata files of several
+    configurations) against one schema, collecting all errors rather than
+    stopping at the first.
+
+    Parameters
+    ----------
+    instances: Mapping[str, Any]
+        Instances to validate, keyed by a name used in the report (e.g. the
+        path to the file)
+    schema: dict
+        The JSON schema
+
+    Returns
+    -------
+    dict[str, list[ValidationError]]
+        The validation errors of each invalid instance. Valid instances are
+        not included
+    """
+    validator = get_validator(schema)
+    report = {}
+    for name, instance in instances.items():
+        errors = list(validator.iter_errors(instance))
+        if errors:
+            report[name] = errors
+    return report
+
+
+def format_validation_report(report: dict[str, list["ValidationError"]]) -> str:
+    """Format the errors from validate_many, one line per error"""
+    lines = []
+    for name, errors in report.items():
+        lines.append(f"{name}: {len(errors)} validation error(s)")
+        for error in errors:
+            location = "/".join(str(part) for part in error.absolute_path)
+            lines.append(f"  {location or '<root>'}: {error.message}")
+    return "\n".join(lines)
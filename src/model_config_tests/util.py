@@ -1,15 +1,325 @@
 # Copyright 2024 ACCESS-NRI and contributors. See the top-level COPYRIGHT file for details.
 # SPDX-License-Identifier: Apache-2.0
 
+import errno
+import fnmatch
 import json
+import os
+import re
+import shutil
 import subprocess as sp
+import threading
 import time
+import uuid
+import warnings
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from stat import S_IWGRP, S_IWOTH, S_IWUSR
+from typing import Optional
 
 # Time related constants
 MINUTE_IN_SECONDS = 60
 HOUR_IN_SECONDS = MINUTE_IN_SECONDS * 60
 DAY_IN_SECONDS = HOUR_IN_SECONDS * 24
 
+# Adaptive backoff settings for polling PBS job status. The first qstat
+# query is made after the initial interval, and the interval between
+# queries grows by the backoff factor up to the maximum interval.
+QSTAT_INITIAL_INTERVAL_SECONDS = 10
+QSTAT_MAX_INTERVAL_SECONDS = MINUTE_IN_SECONDS
+QSTAT_BACKOFF_FACTOR = 2
+
+# Number of failed qstat queries in a row before waiting jobs are failed
+QSTAT_MAX_FAILURES = 3
+
+# Interval for checking whether a job's output files have been written
+OUTPUT_FILE_POLL_SECONDS = 5
+
+# Exit status line in the resource usage summary at the end of a PBS job
+# stdout file, and the number of bytes read from the end of the file to find it
+JOB_EXIT_STATUS_PATTERN = re.compile(rb"^\s*Exit Status:\s*(\d+)\s*$", re.MULTILINE)
+JOB_OUTPUT_TAIL_SIZE = 64 * 1024
+
+# Job fields kept when parsing qstat json output
+QSTAT_JOB_FIELDS = ("job_state", "Exit_status")
+
+# Linux ioctl request code for cloning a file's extents (FICLONE), which
+# creates a copy-on-write reflink on filesystems that support it
+FICLONE = 0x40049409
+
+# Patterns of control directory file names that are modified in place when
+# setting up test experiments, by setup_for_test_run, set_model_runtime, or
+# payu setup (e.g. manifests). These files are never hardlinked, even if
+# they are read-only
+MUTABLE_CONFIG_PATTERNS = (
+    "*.yaml",
+    "*.yml",
+    "*.nml",
+    "namelists",
+    "nuopc.runconfig",
+    "nuopc.runseq",
+    "wav_in",
+)
+
+# Minimum size of a read-only file to hardlink rather than copy when cloning
+HARDLINK_MIN_SIZE = 1024 * 1024
+
+# Name of the directory in the lab that stale directories are moved to,
+# before being deleted in the background
+TRASH_DIRNAME = ".trash"
+
+# Size of binary blocks read when scanning large log files (4 MiB)
+READ_BLOCK_SIZE = 4 * 1024 * 1024
+
+# Name of the default test output directory, in $TMPDIR
+DEFAULT_OUTPUT_DIRNAME = "test-model-repro"
+
+
+def iter_lines_with_prefix(
+    filename: Path, prefix: bytes, block_size: int = READ_BLOCK_SIZE
+) -> Iterator[bytes]:
+    """
+    Stream a file in large binary blocks and yield only the lines that start
+    with the given prefix. Other lines are skipped without being split out
+    or decoded, so scanning cost is dominated by a substring search.
+
+    Parameters
+    ----------
+    filename: Path
+        The file to scan
+    prefix: bytes
+        The prefix a line must start with to be yielded
+    block_size: int
+        Number of bytes to read at a time
+
+    Returns
+    -------
+    Iterator[bytes]
+        Matching lines, without the trailing newline
+    """
+    with open(filename, "rb") as f:
+        # Partial line carried over from the end of the previous block
+        remainder = b""
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            data = remainder + block
+            # Only scan up to the last complete line in this block
+            end = data.rfind(b"\n") + 1
+            remainder = data[end:]
+            yield from _find_lines_with_prefix(data, prefix, end)
+
+        # Last line may not be terminated by a newline
+        yield from _find_lines_with_prefix(remainder, prefix, len(remainder))
+
+
+def _find_lines_with_prefix(data: bytes, prefix: bytes, end: int) -> Iterator[bytes]:
+    """Yield lines in data[:end] that start with prefix. data must start at
+    the beginning of a line"""
+    pos = data.find(prefix, 0, end)
+    while pos != -1:
+        line_end = data.find(b"\n", pos, end)
+        if line_end == -1:
+            line_end = end
+        # Only accept matches at the start of a line
+        if pos == 0 or data[pos - 1] == ord("\n"):
+            yield data[pos:line_end]
+        pos = data.find(prefix, line_end, end)
+
+
+def reflink_file(src: Path, dst: Path) -> bool:
+    """
+    Create dst as a copy-on-write clone of src. Returns False if reflinks
+    are not supported, in which case dst is not created
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return False
+
+    try:
+        with open(src, "rb") as fsrc, open(dst, "xb") as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    except OSError as e:
+        if e.errno == errno.EEXIST:
+            raise
+        Path(dst).unlink(missing_ok=True)
+        return False
+
+    shutil.copystat(src, dst)
+    return True
+
+
+class TreeCloner:
+    """
+    Copy function for shutil.copytree that clones files using the cheapest
+    method that is safe for the file. Files are reflinked if supported,
+    otherwise large read-only files (with no write permission bits) are
+    hardlinked, and all other files are copied. A hardlinked file shares
+    its contents with the source, so writable files are always copied in
+    case they are modified in place in the clone.
+
+    Parameters
+    ----------
+    mutable_patterns: tuple[str]
+        File name patterns of files that are modified in place, so are
+        never hardlinked
+    hardlink_min_size: int
+        Minimum size in bytes of a read-only file to hardlink rather than
+        copy
+    """
+
+    def __init__(
+        self,
+        mutable_patterns: tuple[str] = MUTABLE_CONFIG_PATTERNS,
+        hardlink_min_size: int = HARDLINK_MIN_SIZE,
+    ):
+        self.mutable_patterns = mutable_patterns
+        self.hardlink_min_size = hardlink_min_size
+        # Methods are disabled after the first failure, as failures are due
+        # to the filesystems rather than individual files
+        self.use_reflink = True
+        self.use_hardlink = True
+        self.counts = {"reflink": 0, "hardlink": 0, "copy": 0}
+
+    def is_mutable(self, path: Path) -> bool:
+        """Whether the file may be modified in place in the clone"""
+        name = Path(path).name
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.mutable_patterns)
+
+    def can_hardlink(self, path: Path) -> bool:
+        """Whether the file is large and can't be modified in the clone"""
+        if self.is_mutable(path):
+            return False
+        stat = os.stat(path)
+        read_only = not stat.st_mode & (S_IWUSR | S_IWGRP | S_IWOTH)
+        return read_only and stat.st_size >= self.hardlink_min_size
+
+    def __call__(self, src: str, dst: str) -> str:
+        if self.use_reflink:
+            if reflink_file(src, dst):
+                self.counts["reflink"] += 1
+                return dst
+            self.use_reflink = False
+
+        if self.use_hardlink and self.can_hardlink(src):
+            try:
+                os.link(src, dst)
+                self.counts["hardlink"] += 1
+                return dst
+            except OSError as e:
+                if e.errno == errno.EEXIST:
+                    raise
+                self.use_hardlink = False
+
+        shutil.copy2(src, dst)
+        self.counts["copy"] += 1
+        return dst
+
+
+def clone_tree(src: Path, dst: Path, **kwargs) -> dict[str, int]:
+    """
+    Clone a directory tree, preserving symlinks. Unchanged files are
+    reflinked or hardlinked where possible, rather than copied, so large
+    files are not duplicated (see TreeCloner for the keyword arguments)
+
+    Parameters
+    ----------
+    src: Path
+        The directory to clone
+    dst: Path
+        The destination directory, which must not exist
+
+    Returns
+    -------
+    dict[str, int]
+        The number of files cloned with each method
+    """
+    cloner = TreeCloner(**kwargs)
+    shutil.copytree(src, dst, symlinks=True, copy_function=cloner)
+    return cloner.counts
+
+
+class DirectoryReaper:
+    """
+    Delete directories in the background.
+
+    Directories are atomically renamed into a trash directory, so their
+    original paths can be reused straight away, and are then deleted by a
+    background thread. Deleting large directories (e.g. a previous run's
+    archive) on a parallel filesystem can be slow, so this lets experiments
+    be set up and submitted while the deletion continues.
+
+    Parameters
+    ----------
+    trash_path: Path
+        The trash directory. This must be on the same filesystem as the
+        directories to delete, so they can be renamed into it.
+    """
+
+    def __init__(self, trash_path: Path):
+        self.trash_path = trash_path
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="directory-reaper"
+        )
+        self._futures = []
+        self._lock = threading.Lock()
+
+    def trash(self, path: Path) -> None:
+        """Move a directory into the trash and schedule it for deletion. If
+        the directory can't be renamed into the trash, it is deleted
+        straight away. Directories that don't exist are ignored"""
+        self.trash_path.mkdir(parents=True, exist_ok=True)
+        trashed_path = self.trash_path / f"{path.name}-{uuid.uuid4().hex}"
+        try:
+            os.rename(path, trashed_path)
+        except FileNotFoundError:
+            return
+        except OSError:
+            # E.g. the directory is on a different filesystem to the trash
+            shutil.rmtree(path, ignore_errors=True)
+            return
+
+        self._schedule(trashed_path)
+
+    def reap_leftovers(self) -> None:
+        """Schedule deletion of anything left in the trash, e.g. from a
+        previous session that was interrupted"""
+        if not self.trash_path.exists():
+            return
+        for path in self.trash_path.iterdir():
+            self._schedule(path)
+
+    def reap(self) -> None:
+        """Wait for all scheduled deletions to finish, then remove the trash
+        directory if it is empty"""
+        with self._lock:
+            futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+        try:
+            self.trash_path.rmdir()
+        except FileNotFoundError:
+            pass
+        except OSError:
+            warnings.warn(f"Failed to delete all directories in {self.trash_path}")
+
+    def _schedule(self, path: Path) -> None:
+        """Delete the path in the background thread"""
+        with self._lock:
+            self._futures.append(self._executor.submit(_remove_path, path))
+
+
+def _remove_path(path: Path) -> None:
+    """Delete a directory tree, or a file"""
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        path.unlink(missing_ok=True)
+
 
 class JobInfoCache:
     """Singleton class to store PBS job information"""
@@ -32,27 +342,64 @@ class JobInfoCache:
         self._cache.clear()
 
 
-def qstat_all_jobs() -> dict:
+def _slim_job_record(pairs: list[tuple]) -> dict:
     """
-    Query PBS scheduler for all job information (including queued and
-    finished jobs)
+    object_pairs_hook for json.loads that only keeps the required fields of
+    job records. The whole qstat output is still parsed, but the rest of
+    each record is discarded once the record has been parsed, so only the
+    memory kept for the output is reduced, not the parse time
+    """
+    record = dict(pairs)
+    if "job_state" in record:
+        return {key: record[key] for key in QSTAT_JOB_FIELDS if key in record}
+    return record
+
+
+def qstat_jobs(job_ids: list[str]) -> dict:
+    """
+    Query PBS scheduler for information on the given jobs (including
+    finished jobs) in a single qstat call
+
+    Parameters
+    ----------
+    job_ids: list[str]
+        The job IDs to query
 
     Returns
     -------
     dict
-        A dictionary containing the qstat output in json format
+        A dictionary containing the qstat output in json format, with
+        only the job_state and Exit_status fields kept for each job
     """
-    try:
-        qstat_out = sp.run(
-            ["qstat", "-x", "-f", "-F", "json"],
-            capture_output=True,
-            text=True,
-            check=True,
+    # qstat exits with a non-zero status if any job ID is unknown, but still
+    # outputs information on the other jobs, so don't check the return code
+    qstat_out = sp.run(
+        ["qstat", "-x", "-f", "-F", "json", *job_ids],
+        capture_output=True,
+        text=True,
+    )
+    if not qstat_out.stdout.strip():
+        raise RuntimeError(
+            f"qstat command failed for job IDs {job_ids}: {qstat_out.stderr.strip()}"
         )
-    except sp.CalledProcessError as e:
-        raise RuntimeError(f"qstat command failed: {e}")
 
-    return json.loads(qstat_out.stdout)
+    return json.loads(qstat_out.stdout, object_pairs_hook=_slim_job_record)
+
+
+def qdel_jobs(job_ids: list[str]) -> None:
+    """
+    Cancel PBS jobs in a single qdel call
+
+    Parameters
+    ----------
+    job_ids: list[str]
+        The job IDs to cancel
+    """
+    result = sp.run(["qdel", *job_ids], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"qdel command failed for job IDs {job_ids}: {result.stderr.strip()}"
+        )
 
 
 def extract_job_info(qstat_json: dict) -> dict:
@@ -79,14 +426,64 @@ def extract_job_info(qstat_json: dict) -> dict:
     return job_info
 
 
-def wait_for_qsub(run_id) -> dict:
+def job_output_exit_status(control_path: Path, job_id: str) -> Optional[int]:
+    """
+    Return the exit status of a PBS job from its stdout file in the control
+    directory, once both the stdout and stderr files have been written.
+    PBS copies these files to the directory the job was submitted from once
+    the job has finished, so the stdout file may exist before it has been
+    fully written. Returns None until both files exist and the stdout file
+    contains the exit status.
+    """
+    job_number = job_id.split(".")[0]
+    stdout_files = list(control_path.glob(f"*.o{job_number}"))
+    if len(stdout_files) != 1 or not any(control_path.glob(f"*.e{job_number}")):
+        return None
+
+    try:
+        with open(stdout_files[0], "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(f.tell() - JOB_OUTPUT_TAIL_SIZE, 0))
+            tail = f.read()
+    except FileNotFoundError:
+        return None
+
+    matches = JOB_EXIT_STATUS_PATTERN.findall(tail)
+    return int(matches[-1]) if matches else None
+
+
+def wait_for_qsub(
+    run_id: str,
+    control_path: Optional[Path] = None,
+    initial_interval: float = QSTAT_INITIAL_INTERVAL_SECONDS,
+    max_interval: float = QSTAT_MAX_INTERVAL_SECONDS,
+    backoff_factor: float = QSTAT_BACKOFF_FACTOR,
+    file_poll_interval: float = OUTPUT_FILE_POLL_SECONDS,
+) -> dict:
     """
     Wait for the qsub job to terminate.
 
+    The job state is polled with qstat, starting with a short interval
+    that grows towards a maximum interval. If a control path is given,
+    the appearance of the job's stdout and stderr files in the control
+    directory is checked more frequently, and is treated as the job
+    having finished once the stdout file contains the job's exit status.
+
     Parameters
     ----------
     run_id : str
         The job ID of the qsub job to wait for.
+    control_path : Optional[Path]
+        The directory the job was submitted from, where the job stdout
+        and stderr files are written. If None, only qstat is used.
+    initial_interval : float
+        Seconds to wait before the first qstat query
+    max_interval : float
+        Maximum seconds to wait between qstat queries
+    backoff_factor : float
+        Factor to increase the interval between qstat queries by
+    file_poll_interval : float
+        Seconds between checks for the job output files
 
     Returns
     -------
@@ -101,11 +498,28 @@ def wait_for_qsub(run_id) -> dict:
         if job_info[run_id]["job_state"] == "F":
             return job_info[run_id]
 
+    qstat_interval = initial_interval
+    waited = 0
+
     # Wait for job
     while True:
-        time.sleep(MINUTE_IN_SECONDS)
-        # Query qstat for all jobs and save output to qstat_output_cache
-        qstat_json = qstat_all_jobs()
+        if control_path is not None:
+            step = min(file_poll_interval, qstat_interval - waited)
+        else:
+            step = qstat_interval - waited
+        time.sleep(step)
+        waited += step
+
+        if control_path is not None:
+            exit_status = job_output_exit_status(control_path, run_id)
+            if exit_status is not None:
+                return {"job_state": "F", "Exit_status": exit_status}
+
+        if waited < qstat_interval:
+            continue
+
+        # Query qstat for the job and save output to the job info cache
+        qstat_json = qstat_jobs([run_id])
         job_info = extract_job_info(qstat_json)
 
         if run_id not in job_info:
@@ -119,6 +533,203 @@ def wait_for_qsub(run_id) -> dict:
 
         # TODO: Are there other job states should check for?
 
+        # Back off before the next qstat query
+        waited = 0
+        qstat_interval = min(qstat_interval * backoff_factor, max_interval)
+
+
+class QsubJobTracker:
+    """
+    Track multiple PBS jobs with a single shared poll loop.
+
+    Threads waiting on jobs register them with the tracker. One of the
+    waiting threads runs the poll loop for all outstanding jobs, which
+    checks for job output files in control directories and queries qstat
+    for all outstanding jobs in one batched call, with the same adaptive
+    backoff as wait_for_qsub. When the polling thread's own job finishes,
+    another waiting thread takes over the poll loop.
+
+    A failed qstat query (e.g. a brief PBS server outage) is retried at the
+    next backoff interval, and the outstanding jobs are only failed after
+    max_qstat_failures queries in a row have failed.
+
+    Parameters
+    ----------
+    initial_interval : float
+        Seconds to wait before the first qstat query
+    max_interval : float
+        Maximum seconds to wait between qstat queries
+    backoff_factor : float
+        Factor to increase the interval between qstat queries by
+    file_poll_interval : float
+        Seconds between checks for the job output files
+    max_qstat_failures : int
+        Number of failed qstat queries in a row before the outstanding jobs
+        are failed
+    """
+
+    def __init__(
+        self,
+        initial_interval: float = QSTAT_INITIAL_INTERVAL_SECONDS,
+        max_interval: float = QSTAT_MAX_INTERVAL_SECONDS,
+        backoff_factor: float = QSTAT_BACKOFF_FACTOR,
+        file_poll_interval: float = OUTPUT_FILE_POLL_SECONDS,
+        max_qstat_failures: int = QSTAT_MAX_FAILURES,
+    ):
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.file_poll_interval = file_poll_interval
+        self.max_qstat_failures = max_qstat_failures
+
+        self._condition = threading.Condition()
+        # Outstanding job IDs mapped to their control paths
+        self._jobs = {}
+        # Finished job IDs mapped to job info, or the error raised
+        self._results = {}
+        self._polling = False
+        self._closed = False
+        self._qstat_interval = initial_interval
+        self._next_qstat = 0.0
+        self._qstat_failures = 0
+
+    def wait(self, job_id: str, control_path: Optional[Path] = None) -> dict:
+        """
+        Wait for the qsub job to terminate.
+
+        Parameters
+        ----------
+        job_id : str
+            The job ID of the qsub job to wait for.
+        control_path : Optional[Path]
+            The directory the job was submitted from, where the job stdout
+            and stderr files are written. If None, only qstat is used.
+
+        Returns
+        -------
+        dict
+            A dictionary containing partial job information
+        """
+        # Check if the job is already in last qstat output and has completed
+        job_info = JobInfoCache().get()
+        if job_id in job_info:
+            if job_info[job_id]["job_state"] == "F":
+                return job_info[job_id]
+
+        with self._condition:
+            if not self._jobs:
+                # Start the backoff again when there were no outstanding jobs
+                self._qstat_interval = self.initial_interval
+                self._next_qstat = time.monotonic() + self.initial_interval
+            self._jobs[job_id] = control_path
+
+            while job_id not in self._results:
+                if self._closed:
+                    self._jobs.pop(job_id, None)
+                    raise RuntimeError(f"Stopped waiting for job ID {job_id}")
+
+                if self._polling:
+                    # Wait for the polling thread to report finished jobs
+                    self._condition.wait()
+                    continue
+
+                self._polling = True
+                try:
+                    self._poll_until(job_id)
+                finally:
+                    # Hand over the poll loop to another waiting thread
+                    self._polling = False
+                    self._condition.notify_all()
+
+            result = self._results.pop(job_id)
+
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def close(self) -> None:
+        """Stop waiting for all outstanding jobs. Waiting threads raise a
+        RuntimeError"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def _poll_until(self, job_id: str) -> None:
+        """Poll all outstanding jobs until the given job has finished. Must be
+        called with the condition lock held"""
+        while job_id not in self._results and not self._closed:
+            timeout = self._next_qstat - time.monotonic()
+            if any(path is not None for path in self._jobs.values()):
+                timeout = min(self.file_poll_interval, timeout)
+            # Releases the lock while waiting, and wakes early if closed
+            self._condition.wait(timeout=max(timeout, 0))
+            if self._closed:
+                return
+
+            self._check_output_files()
+
+            if time.monotonic() < self._next_qstat or not self._jobs:
+                continue
+
+            self._query_qstat()
+
+            # Back off before the next qstat query
+            self._qstat_interval = min(
+                self._qstat_interval * self.backoff_factor, self.max_interval
+            )
+            self._next_qstat = time.monotonic() + self._qstat_interval
+
+    def _check_output_files(self) -> None:
+        """Finish jobs with complete output files in their control directory"""
+        for job_id, control_path in list(self._jobs.items()):
+            if control_path is None:
+                continue
+            exit_status = job_output_exit_status(control_path, job_id)
+            if exit_status is not None:
+                self._finish(job_id, {"job_state": "F", "Exit_status": exit_status})
+
+    def _query_qstat(self) -> None:
+        """Query qstat for all outstanding jobs and finish completed jobs"""
+        job_ids = list(self._jobs)
+        try:
+            job_info = extract_job_info(qstat_jobs(job_ids))
+        except RuntimeError as e:
+            self._qstat_failures += 1
+            if self._qstat_failures < self.max_qstat_failures:
+                print(
+                    f"qstat query failed ({self._qstat_failures} of "
+                    f"{self.max_qstat_failures} attempts), retrying: {e}"
+                )
+                return
+            self._qstat_failures = 0
+            for job_id in job_ids:
+                self._finish(job_id, e)
+            return
+        self._qstat_failures = 0
+
+        # Update the job info cache
+        job_info_cache = JobInfoCache()
+        job_info_cache.set({**job_info_cache.get(), **job_info})
+
+        for job_id in job_ids:
+            if job_id not in job_info:
+                error = RuntimeError(f"Job ID {job_id} not found in qstat output")
+                self._finish(job_id, error)
+            elif job_info[job_id]["job_state"] == "F":
+                self._finish(job_id, job_info[job_id])
+
+    def _finish(self, job_id: str, result) -> None:
+        """Record the result of a job and wake waiting threads"""
+        self._jobs.pop(job_id, None)
+        self._results[job_id] = result
+        self._condition.notify_all()
+
+
+def default_output_path() -> Path:
+    """Return the default test output directory, $TMPDIR/test-model-repro"""
+    tmp_dir = os.environ.get("TMPDIR")
+    return Path(f"{tmp_dir}/{DEFAULT_OUTPUT_DIRNAME}")
+
 
 def get_git_branch_name(path):
     """Get the git branch name of the given git directory"""
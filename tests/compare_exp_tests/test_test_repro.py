@@ -82,15 +82,14 @@ def test_test_pairwise_repro(tmp_path):
     )
 
     # Run test
-    subprocess.run(
+    result = subprocess.run(
         shlex.split(test_cmd),
         capture_output=True,
         text=True,
         cwd=str(tmp_path),
     )
 
-    # To print out test results, uncomment the following line and assign
-    # the above subprocess to a result variable
+    # To print out test results, uncomment the following line
     # print(f"Test stdout: {result.stdout}\nTest stderr: {result.stderr}")
 
     # Parse xml output file from the tests to check generated test results
@@ -105,3 +104,7 @@ def test_test_pairwise_repro(tmp_path):
 
     assert "test_pairwise_repro[exp2 vs exp3]" in test_results
     assert test_results["test_pairwise_repro[exp2 vs exp3]"] == "failed"
+
+    # Check experiments are grouped by identical checksums
+    assert "class 0: exp1 exp2" in result.stdout
+    assert "class 1: exp3" in result.stdout
@@ -7,6 +7,7 @@ import pytest
 
 # Disable specific warnings from test_config tests
 warnings.filterwarnings("ignore", category=pytest.PytestUnknownMarkWarning)
+from model_config_tests.artifact_cache import ArtifactCache
 from model_config_tests.config_tests.qa.test_config import TestConfig as ConfigValidator
 from model_config_tests.config_tests.qa.test_config import get_spack_location_file
 
@@ -86,6 +87,72 @@ def test_get_spack_location_file_no_spack_location():
             get_spack_location_file("fake-repo", "fake-version")
 
 
+@pytest.fixture
+def releases_server(http_server, monkeypatch):
+    """Local stand-in for model release artefacts, with memoised
+    spack.location files cleared"""
+    monkeypatch.setattr(
+        "model_config_tests.config_tests.qa.test_config.MODEL_RELEASES_URL",
+        http_server.url,
+    )
+    monkeypatch.setattr(
+        "model_config_tests.config_tests.qa.test_config._spack_location_files", {}
+    )
+    return http_server
+
+
+@pytest.mark.parametrize(
+    "filenames, expected",
+    [
+        (["spack.location"], "spack-location"),
+        (["Gadi.spack.location"], "gadi-spack-location"),
+        # Gadi.spack.location is preferred if both exist
+        (["spack.location", "Gadi.spack.location"], "gadi-spack-location"),
+    ],
+)
+def test_get_spack_location_file_cached(tmp_path, releases_server, filenames, expected):
+    """Test spack.location files are memoised for the session and cached
+    across sessions"""
+    releases_server.files["/ACCESS-OM2/releases/tag/2024.03.0"] = b"release"
+    for filename in filenames:
+        path = f"/ACCESS-OM2/releases/download/2024.03.0/{filename}"
+        releases_server.files[path] = filename.lower().replace(".", "-").encode()
+
+    artifact_cache = ArtifactCache(tmp_path / "cache")
+    spack_location = get_spack_location_file("ACCESS-OM2", "2024.03.0", artifact_cache)
+    assert expected in spack_location
+    # Check the release and all candidate files were requested
+    assert len(releases_server.requests) == 3
+
+    assert get_spack_location_file("ACCESS-OM2", "2024.03.0") == spack_location
+    assert len(releases_server.requests) == 3
+
+    # Check a new session uses the cached file without any requests
+    releases_server.files.clear()
+    with patch(
+        "model_config_tests.config_tests.qa.test_config._spack_location_files", {}
+    ):
+        offline_cache = ArtifactCache(tmp_path / "cache", offline=True)
+        assert (
+            get_spack_location_file("ACCESS-OM2", "2024.03.0", offline_cache)
+            == spack_location
+        )
+    assert len(releases_server.requests) == 3
+
+
+def test_get_spack_location_file_not_memoised_on_error(tmp_path, releases_server):
+    artifact_cache = ArtifactCache(tmp_path / "cache")
+    with pytest.raises(AssertionError, match=r"Failed to find release .*"):
+        get_spack_location_file("ACCESS-OM2", "2024.03.0", artifact_cache)
+
+    releases_server.files["/ACCESS-OM2/releases/tag/2024.03.0"] = b"release"
+    releases_server.files["/ACCESS-OM2/releases/download/2024.03.0/spack.location"] = (
+        b"spack-location"
+    )
+    spack_location = get_spack_location_file("ACCESS-OM2", "2024.03.0", artifact_cache)
+    assert "spack-location" in spack_location
+
+
 @pytest.fixture
 def checker():
     return ConfigValidator()
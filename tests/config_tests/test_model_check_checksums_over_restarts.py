@@ -1,6 +1,11 @@
+import copy
+from pathlib import Path
+from unittest.mock import Mock
+
 import pytest
 
 from model_config_tests.models import index as model_index
+from model_config_tests.models.model import find_restart_mismatches
 
 
 @pytest.mark.parametrize("model_name", ["access-om2", "access-om3"])
@@ -77,3 +82,80 @@ def test_check_checksums_over_restarts_om3_pmzeros():
     )
 
     assert matching_checksums is True
+
+
+@pytest.mark.parametrize("model_name", ["access-om2", "access-om3"])
+def test_check_checksums_over_restarts_missing_field(model_name, capsys):
+    model = model_index[model_name]
+
+    long_run_checksum = {"output": {"field1": ["12345678"], "field2": ["1"]}}
+    short_run_checksum = {"output": {"field1": ["12345678"]}}
+
+    matching_checksums = model.check_checksums_over_restarts(
+        model, long_run_checksum, short_run_checksum, short_run_checksum
+    )
+    captured = capsys.readouterr()
+
+    assert matching_checksums is False
+    assert captured.out == (
+        "Checksum field for field2 found in long run but not in short runs\n"
+    )
+
+
+def test_find_restart_mismatches():
+    long_run_checksum = {
+        "output": {
+            "field1": ["1", "2", "3"],
+            "field2": ["4", "5"],
+            "field3": ["6"],
+        }
+    }
+    short_run_checksum_0 = {"output": {"field1": ["1"], "field2": ["4"]}}
+    short_run_checksum_1 = {"output": {"field1": ["3"], "field2": ["4", "5"]}}
+    inputs = copy.deepcopy(
+        [long_run_checksum, short_run_checksum_0, short_run_checksum_1]
+    )
+
+    mismatches = find_restart_mismatches(
+        long_run_checksum, [short_run_checksum_0, short_run_checksum_1]
+    )
+
+    assert mismatches == {
+        "field1": {"in_short_runs": True, "unmatched": ["2"]},
+        "field3": {"in_short_runs": False, "unmatched": ["6"]},
+    }
+
+    # Check the input checksums are not modified
+    assert [long_run_checksum, short_run_checksum_0, short_run_checksum_1] == inputs
+
+
+@pytest.mark.parametrize(
+    "checksum, expected",
+    [
+        ("C92469973FB18B96", "492469973FB18B96"),
+        ("492469973FB18B96", "492469973FB18B96"),
+        ("F0", "70"),
+        ("00", "00"),
+    ],
+)
+def test_om3_canonicalise_checksum(checksum, expected):
+    model = model_index["access-om3"]
+    assert model.canonicalise_checksum(checksum) == expected
+
+
+def test_compare_checksums_over_restarts_om3_pmzeros():
+    mock_experiment = Mock()
+    mock_experiment.restart000 = Path("restart000")
+    mock_experiment.control_path = Path("control")
+    model = model_index["access-om3"](mock_experiment)
+
+    long_run_checksum = {"output": {"field1": ["C92469973FB18B96", "0000000000000001"]}}
+    short_run_checksum = {"output": {"field1": ["492469973FB18B96"]}}
+
+    mismatches = model.compare_checksums_over_restarts(
+        long_run_checksum, short_run_checksum, short_run_checksum
+    )
+
+    assert mismatches == {
+        "field1": {"in_short_runs": True, "unmatched": ["0000000000000001"]}
+    }
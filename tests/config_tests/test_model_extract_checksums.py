@@ -1,4 +1,7 @@
 import json
+import re
+import shutil
+from collections import defaultdict
 from pathlib import Path
 from unittest.mock import Mock
 
@@ -8,6 +11,13 @@ import requests
 import yaml
 
 from model_config_tests.models import index as model_index
+from model_config_tests.models.mom5 import mom5_extract_checksums
+from model_config_tests.models.um7 import (
+    DEFAULT_N_NORMS,
+    FINAL_ABSOLUTE_NORM,
+    um7_extract_norms,
+)
+from model_config_tests.util import READ_BLOCK_SIZE
 from tests.common import RESOURCES_DIR
 
 MODEL_NAMES = model_index.keys()
@@ -106,3 +116,190 @@ def get_schema_from_url(url):
     response = requests.get(url)
     assert response.status_code == 200
     return response.json()
+
+
+@pytest.mark.parametrize("model_name", ["access", "access-esm1.6", "access-om2"])
+@pytest.mark.parametrize("block_size", [7, 4096, READ_BLOCK_SIZE])
+def test_mom5_extract_checksums(model_name, block_size):
+    """Check the streaming scanner gives the expected checksums, including
+    when lines are split across read blocks"""
+    resources_dir = RESOURCES_DIR / model_name
+    output_file = resources_dir / "output000" / f"{model_name}.out"
+
+    checksums = mom5_extract_checksums(output_file, block_size=block_size)
+
+    with open(resources_dir / "checksums" / "1-0-0.json") as file:
+        expected_checksums = json.load(file)
+
+    assert dict(checksums) == expected_checksums["output"]
+
+
+def test_mom5_extract_checksums_line_start_only(tmp_path):
+    """Check only lines starting with the checksum prefix are parsed"""
+    output_file = tmp_path / "access-om2.out"
+    output_file.write_text(
+        "[chksum] ht              -2390360641069121536\n"
+        " [chksum] indented        1\n"
+        "some text [chksum] inline 2\n"
+        "[chksum] no checksum\n"
+        "[chksum] hu               6389284661071183872"
+    )
+
+    checksums = mom5_extract_checksums(output_file)
+
+    assert dict(checksums) == {
+        "ht": ["-2390360641069121536"],
+        "hu": ["6389284661071183872"],
+    }
+
+
+def forward_scan_um7_norms(output_filename, n_norms):
+    """Reference forward scan over every line of the UM log"""
+    pattern = rf"\s*{FINAL_ABSOLUTE_NORM}\s+:\s+(\d+\.?\d*E?-?\d*)"
+    output_norms = defaultdict(list)
+    with open(output_filename) as f:
+        for line in f:
+            match = re.match(pattern, line)
+            if match:
+                output_norms[FINAL_ABSOLUTE_NORM].append(match.group(1).strip())
+    if FINAL_ABSOLUTE_NORM in output_norms:
+        output_norms[FINAL_ABSOLUTE_NORM] = output_norms[FINAL_ABSOLUTE_NORM][-n_norms:]
+    return output_norms
+
+
+UM7_OUTPUT_FILE = (
+    RESOURCES_DIR / "access-esm1.6" / "amip-output000" / "atmosphere" / "atm.fort6.pe0"
+)
+
+
+def test_um7_extract_norms():
+    """Check the reverse scan gives the expected norms for the default n_norms"""
+    norms = um7_extract_norms(UM7_OUTPUT_FILE)
+
+    checksum_file = RESOURCES_DIR / "access-esm1.6" / "amip-checksums" / "1-0-0.json"
+    with open(checksum_file) as file:
+        expected_checksums = json.load(file)
+
+    assert dict(norms) == expected_checksums["output"]
+
+
+@pytest.mark.parametrize("n_norms", [1, 2, 10, 47, 48, 100, 0, -2])
+def test_um7_extract_norms_matches_forward_scan(n_norms):
+    """Check the reverse scan gives the same result as a forward scan"""
+    norms = um7_extract_norms(UM7_OUTPUT_FILE, n_norms=n_norms)
+    expected = forward_scan_um7_norms(UM7_OUTPUT_FILE, n_norms=n_norms)
+
+    assert dict(norms) == dict(expected)
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "",
+        "No norms in this log\n",
+        "  Final Absolute Norm :   1.0E-003\n"
+        "  Some other text with Final Absolute Norm : 2.0E-003\n"
+        "  Final Absolute Norm :\n"
+        "  Final Absolute Norm :   3.0E-003",
+    ],
+)
+def test_um7_extract_norms_edge_cases(tmp_path, content):
+    """Check the reverse scan matches a forward scan for unusual logs"""
+    output_file = tmp_path / "atm.fort6.pe0"
+    output_file.write_text(content)
+
+    norms = um7_extract_norms(output_file)
+    expected = forward_scan_um7_norms(output_file, n_norms=10)
+
+    assert dict(norms) == dict(expected)
+
+
+@pytest.mark.parametrize("max_workers", [None, 1, 2, 4])
+def test_esm_extract_full_checksums(tmp_path, max_workers):
+    """Check parsing the submodel output files in parallel gives the same
+    result as parsing them one after the other"""
+    resources_dir = RESOURCES_DIR / "access-esm1.6"
+
+    # Combine MOM and UM output into one output directory
+    output_dir = tmp_path / "output000"
+    (output_dir / "atmosphere").mkdir(parents=True)
+    shutil.copy(resources_dir / "output000" / "access-esm1.6.out", output_dir)
+    shutil.copy(UM7_OUTPUT_FILE, output_dir / "atmosphere")
+
+    # Mock ExpTestHelper
+    mock_experiment = Mock()
+    mock_experiment.output000 = output_dir
+    mock_experiment.config = {
+        "submodels": [
+            {"name": "atmosphere", "model": "um"},
+            {"name": "ocean", "model": "mom"},
+            {"name": "ice", "model": "cice"},
+        ]
+    }
+    model = model_index["access-esm1.6"](mock_experiment)
+
+    checksums = model.extract_full_checksums(max_workers=max_workers)
+
+    with open(resources_dir / "checksums" / "1-0-0.json") as file:
+        expected_mom = json.load(file)["output"]
+    with open(resources_dir / "amip-checksums" / "1-0-0.json") as file:
+        expected_um = json.load(file)["output"]
+
+    assert checksums == {"mom": expected_mom, "um": expected_um}
+    assert list(checksums) == ["mom", "um"]
+
+
+@pytest.mark.parametrize(
+    "model_name, submodels, live_dir, output_file, checksum_dir",
+    [
+        ("access-om2", None, "control", "access-om2.out", "checksums"),
+        ("access-esm1.6", ["um", "mom"], "control", "access-esm1.6.out", "checksums"),
+        (
+            "access-esm1.6",
+            ["um"],
+            "work",
+            "atmosphere/atm.fort6.pe0",
+            "amip-checksums",
+        ),
+    ],
+)
+def test_live_output(
+    tmp_path, model_name, submodels, live_dir, output_file, checksum_dir
+):
+    """Check the live output file is where the running model writes it (the
+    control directory for the model stdout, otherwise the work directory),
+    and parsing its lines one at a time gives the same checksums as
+    extraction"""
+    submodel_names = {"um": "atmosphere", "mom": "ocean"}
+    mock_experiment = Mock()
+    mock_experiment.output000 = tmp_path / "archive" / "output000"
+    mock_experiment.control_path = tmp_path / "control"
+    mock_experiment.work_path = tmp_path / "work"
+    mock_experiment.config = {
+        "submodels": [
+            {"name": submodel_names[submodel], "model": submodel}
+            for submodel in submodels or []
+        ]
+    }
+    model = model_index[model_name](mock_experiment)
+
+    live_file, parse_record = model.live_output()
+    assert live_file == tmp_path / live_dir / output_file
+
+    resources_dir = RESOURCES_DIR / model_name
+    output_dir = "amip-output000" if checksum_dir == "amip-checksums" else "output000"
+    checksums = defaultdict(list)
+    with open(resources_dir / output_dir / output_file, "rb") as f:
+        for line in f:
+            record = parse_record(line.rstrip(b"\n"))
+            if record:
+                checksums[record[0]].append(record[1])
+
+    with open(resources_dir / checksum_dir / "1-0-0.json") as file:
+        expected_checksums = json.load(file)["output"]
+    if FINAL_ABSOLUTE_NORM in checksums:
+        # Only the last norms are extracted
+        checksums[FINAL_ABSOLUTE_NORM] = checksums[FINAL_ABSOLUTE_NORM][
+            -DEFAULT_N_NORMS:
+        ]
+    assert dict(checksums) == expected_checksums
@@ -0,0 +1,177 @@
+import sys
+import types
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from netCDF4 import Dataset
+
+from model_config_tests.models import mom6
+from model_config_tests.models.mom6 import NetcdfClassicHeader, mom6_read_checksums
+
+CHECKSUMS = {"Temp": "  4C0F6BAD3F8E5E41", "u": "1F2C3A4B5D6E7F80", "v": "ABCD"}
+
+CLASSIC_FORMATS = ["NETCDF3_CLASSIC", "NETCDF3_64BIT_OFFSET", "NETCDF3_64BIT_DATA"]
+
+
+def write_restart(path, file_format):
+    """Write a small MOM6-like restart file with checksum attributes and
+    other attributes of various types"""
+    with Dataset(path, "w", format=file_format) as ds:
+        ds.title = "MOM6 restart"
+        ds.createDimension("Time", None)
+        ds.createDimension("lath", 3)
+        ds.createDimension("lonh", 4)
+
+        time = ds.createVariable("Time", "f8", ("Time",))
+        time.units = "days"
+        time[:] = [1.0]
+
+        lath = ds.createVariable("lath", "f8", ("lath",))
+        lath.long_name = "Latitude"
+        lath[:] = np.arange(3)
+
+        for name, checksum in CHECKSUMS.items():
+            var = ds.createVariable(name, "f8", ("Time", "lath", "lonh"))
+            var.checksum = checksum
+            var.valid_range = np.array([-10, 10], dtype="i4")
+            var.scale_factor = np.float32(0.5)
+            var[0] = np.ones((3, 4))
+
+
+@pytest.mark.parametrize("file_format", CLASSIC_FORMATS)
+def test_netcdf_classic_header(tmp_path, file_format):
+    path = tmp_path / "restart.nc"
+    write_restart(path, file_format)
+
+    with open(path, "rb") as f:
+        header = NetcdfClassicHeader(f)
+
+    with Dataset(path) as ds:
+        assert header.numrecs == 1
+        assert header.dimensions == {
+            name: len(dim) for name, dim in ds.dimensions.items()
+        } | {"Time": 0}
+        assert header.attributes == {"title": "MOM6 restart"}
+        assert list(header.variables) == list(ds.variables)
+        for name, attributes in header.variables.items():
+            expected = {
+                key: value.tolist() if isinstance(value, np.ndarray) else value
+                for key, value in ds[name].__dict__.items()
+            }
+            assert attributes == pytest.approx(expected)
+
+
+@pytest.mark.parametrize(
+    "file_format", CLASSIC_FORMATS + ["NETCDF4", "NETCDF4_CLASSIC"]
+)
+def test_mom6_read_checksums(tmp_path, file_format):
+    path = tmp_path / "restart.nc"
+    write_restart(path, file_format)
+
+    checksums = mom6_read_checksums(path)
+    assert checksums == dict(sorted(CHECKSUMS.items()))
+    assert list(checksums) == sorted(CHECKSUMS)
+
+
+def test_mom6_read_checksums_classic_without_netcdf4(tmp_path):
+    """Test the classic header is read without opening the dataset"""
+    path = tmp_path / "restart.nc"
+    write_restart(path, "NETCDF3_64BIT_OFFSET")
+
+    with patch.object(mom6, "_dataset_read_checksums") as mock_read:
+        assert mom6_read_checksums(path) == dict(sorted(CHECKSUMS.items()))
+    mock_read.assert_not_called()
+
+
+def test_mom6_read_checksums_invalid_header_fallback(tmp_path):
+    """Test files with an unexpected header are opened with netCDF4"""
+    path = tmp_path / "restart.nc"
+    path.write_bytes(b"CDF\x07" + bytes(32))
+
+    with patch.object(
+        mom6, "_dataset_read_checksums", return_value={"u": "1"}
+    ) as mock_read:
+        assert mom6_read_checksums(path) == {"u": "1"}
+    mock_read.assert_called_once_with(path)
+
+
+def test_mom6_read_checksums_hdf5_without_h5py(tmp_path):
+    """Test netCDF4 files are opened with netCDF4 if h5py is not installed"""
+    path = tmp_path / "restart.nc"
+    write_restart(path, "NETCDF4")
+
+    with patch.dict(sys.modules, {"h5py": None}):
+        with patch.object(
+            mom6, "_dataset_read_checksums", wraps=mom6._dataset_read_checksums
+        ) as mock_read:
+            assert mom6_read_checksums(path) == dict(sorted(CHECKSUMS.items()))
+    mock_read.assert_called_once_with(path)
+
+
+class StubDataset:
+    def __init__(self, attrs):
+        self.attrs = attrs
+
+
+def stub_h5py(items=None, error=None):
+    """Return a stand-in for the h5py module, with files containing the
+    given items, or that raise the given error when opened"""
+    module = types.ModuleType("h5py")
+    module.Dataset = StubDataset
+
+    class File:
+        def __init__(self, path, mode):
+            if error is not None:
+                raise error
+
+        def __enter__(self):
+            return items
+
+        def __exit__(self, *args):
+            pass
+
+    module.File = File
+    return module
+
+
+def test_mom6_read_checksums_hdf5_with_h5py(tmp_path):
+    """Test netCDF4 files are read with h5py if it is installed"""
+    path = tmp_path / "restart.nc"
+    write_restart(path, "NETCDF4")
+
+    h5py = stub_h5py(
+        {
+            "v": StubDataset({"checksum": b"ABCD"}),
+            "u": StubDataset({"checksum": "1F2C3A4B5D6E7F80"}),
+            "lath": StubDataset({"long_name": "Latitude"}),
+            "group": object(),
+        }
+    )
+    with patch.dict(sys.modules, {"h5py": h5py}):
+        with patch.object(mom6, "_dataset_read_checksums") as mock_read:
+            checksums = mom6_read_checksums(path)
+    assert checksums == {"u": "1F2C3A4B5D6E7F80", "v": "ABCD"}
+    assert list(checksums) == ["u", "v"]
+    mock_read.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "h5py",
+    [
+        stub_h5py(error=OSError("Unable to open file")),
+        stub_h5py({"u": StubDataset({"checksum": b"\xff"})}),
+    ],
+    ids=["open", "attribute"],
+)
+def test_mom6_read_checksums_hdf5_h5py_error(tmp_path, h5py):
+    """Test netCDF4 files are opened with netCDF4 if h5py can't read them"""
+    path = tmp_path / "restart.nc"
+    write_restart(path, "NETCDF4")
+
+    with patch.dict(sys.modules, {"h5py": h5py}):
+        with patch.object(
+            mom6, "_dataset_read_checksums", wraps=mom6._dataset_read_checksums
+        ) as mock_read:
+            assert mom6_read_checksums(path) == dict(sorted(CHECKSUMS.items()))
+    mock_read.assert_called_once_with(path)
@@ -0,0 +1,106 @@
+import f90nml
+import pytest
+import yaml
+
+from model_config_tests.exp_test_helper import ExpTestHelper
+
+
+def make_experiment(tmp_path, config: dict, files: dict[str, str]) -> ExpTestHelper:
+    """Create an experiment with the given config.yaml and control files"""
+    control_path = tmp_path / "control"
+    control_path.mkdir()
+    with open(control_path / "config.yaml", "w") as f:
+        yaml.dump(config, f)
+    for filename, contents in files.items():
+        path = control_path / filename
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(contents)
+    return ExpTestHelper(control_path=control_path, lab_path=tmp_path / "lab")
+
+
+def test_access_om2_set_model_runtime(tmp_path):
+    accessom2_nml = (
+        "&date_manager_nml\n"
+        "    forcing_start_date = '1900-01-01T00:00:00'\n"
+        "    restart_period = 5, 0, 0\n"
+        "/\n"
+    )
+    exp = make_experiment(
+        tmp_path, {"model": "access-om2"}, {"accessom2.nml": accessom2_nml}
+    )
+    exp.model.set_model_runtime(seconds=10800)
+    # Check the namelist is only written when the patch is applied
+    assert (exp.control_path / "accessom2.nml").read_text() == accessom2_nml
+
+    exp.config_patch.apply()
+    nml = f90nml.read(exp.control_path / "accessom2.nml")
+    assert nml["date_manager_nml"]["restart_period"] == [0, 0, 10800]
+    assert nml["date_manager_nml"]["forcing_start_date"] == "1900-01-01T00:00:00"
+
+
+def test_access_om3_set_model_runtime(tmp_path):
+    runconfig = (
+        "ALLCOMP_attributes::\n"
+        "     OCN_model = mom\n"
+        "::\n\n"
+        "CLOCK_attributes::\n"
+        "     restart_n = 1\n"
+        "     restart_option = nyears\n"
+        "     stop_n = 1\n"
+        "     stop_option = nyears\n"
+        "::\n"
+    )
+    wav_in = "&output_date_nml\n  date%restart%stride  = '86400'\n/\n"
+    exp = make_experiment(
+        tmp_path,
+        {"model": "access-om3"},
+        {"nuopc.runconfig": runconfig, "wav_in": wav_in},
+    )
+    exp.model.set_model_runtime(seconds=21600)
+    exp.config_patch.apply()
+
+    assert (exp.control_path / "nuopc.runconfig").read_text() == (
+        runconfig.replace("_n = 1", "_n = 21600").replace("nyears", "nseconds")
+    )
+    nml = f90nml.read(exp.control_path / "wav_in")
+    assert nml["output_date_nml"]["date"]["restart"]["stride"] == 21600
+
+
+@pytest.mark.parametrize(
+    "submodels",
+    [
+        ["um", "mom", "cice"],
+        # AMIP configurations
+        ["um"],
+    ],
+)
+def test_access_esm1p5_set_model_runtime(tmp_path, submodels):
+    config = {
+        "model": "access",
+        "submodels": [{"name": f"{name}_dir", "model": name} for name in submodels],
+    }
+    exp = make_experiment(
+        tmp_path,
+        config,
+        {
+            "um_dir/namelists": "&NLSTCGEN\n DUMPFREQim= 0 , 0 , 0 , 1 ,\n/\n",
+            "cice_dir/cice_in.nml": "&setup_nml\n  , dumpfreq = 'm'\n/\n",
+        },
+    )
+    exp.setup_for_test_run(apply=False)
+    exp.model.set_model_runtime(seconds=86400)
+    exp.config_patch.apply()
+
+    with open(exp.config_path) as f:
+        doc = yaml.safe_load(f)
+    assert doc["runlog"] is False
+    assert doc["calendar"] == {
+        "runtime": {"years": 0, "months": 0, "days": 1, "seconds": 0}
+    }
+
+    um_nml = f90nml.read(exp.control_path / "um_dir" / "namelists")
+    assert um_nml["nlstcgen"]["dumpfreqim"] == [48, 0, 0, 0]
+
+    cice_nml = f90nml.read(exp.control_path / "cice_dir" / "cice_in.nml")
+    expected_dumpfreq = "d" if "cice" in submodels else "m"
+    assert cice_nml["setup_nml"]["dumpfreq"] == expected_dumpfreq
@@ -1,5 +1,6 @@
 """Test for bit reproducibility tests"""
 
+import json
 import shlex
 import shutil
 import subprocess
@@ -17,6 +18,11 @@ from tests.common import RESOURCES_DIR
 
 # Disable unknown marker warnings when importing _experiments
 warnings.filterwarnings("ignore", category=pytest.PytestUnknownMarkWarning)
+from model_config_tests.checksum_digest import (
+    CHECKSUM_DIGEST_KEY,
+    checksum_digest,
+    strip_checksum_digest,
+)
 from model_config_tests.config_tests.test_bit_reproducibility import _experiments
 from model_config_tests.exp_test_helper import ExpTestHelper
 from model_config_tests.models.accessesm1p5 import (
@@ -505,10 +511,18 @@ def check_checksum(output_path, checksum_path, model_name, match=True):
     test_checksum = output_path / "checksum" / f"historical-{hours}hr-checksum.json"
     assert test_checksum.exists()
 
+    # Check the digest stored for indexing matches the checksums
+    with open(test_checksum) as f:
+        checksums = json.load(f)
+    assert checksums[CHECKSUM_DIGEST_KEY] == checksum_digest(checksums)
+    checksums = strip_checksum_digest(checksums)
+
+    with open(checksum_path) as f:
+        expected_checksums = json.load(f)
     if match:
-        assert test_checksum.read_text() == checksum_path.read_text()
+        assert checksums == expected_checksums
     else:
-        assert test_checksum.read_text() != checksum_path.read_text()
+        assert checksums != expected_checksums
 
 
 @pytest.mark.parametrize("fail", [False, True])
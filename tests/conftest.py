@@ -1,4 +1,6 @@
 import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 import pytest
 
@@ -43,3 +45,36 @@ def isolated_config(config_cache, tmp_path):
     yield _prepare_isolated_config
 
     shutil.rmtree(tmp_path)
+
+
+@pytest.fixture
+def http_server():
+    """Local HTTP server that stands in for remote artefacts. Responses are
+    set by path in the files attribute, and requested paths are recorded in
+    the requests attribute"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            httpd.requests.append(self.path)
+            content = httpd.files.get(self.path)
+            if content is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.files = {}
+    httpd.requests = []
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
@@ -0,0 +1,115 @@
+import json
+
+import pytest
+
+from model_config_tests.artifact_cache import (
+    ARTIFACT_CACHE_DIR_ENV,
+    ARTIFACT_CACHE_OFFLINE_ENV,
+    ARTIFACT_CACHE_TTL_ENV,
+    ArtifactCache,
+)
+
+SCHEMA = {"type": "object", "required": ["name"]}
+
+
+@pytest.fixture
+def server(http_server):
+    http_server.files.update(
+        {
+            "/schema.json": json.dumps(SCHEMA).encode(),
+            "/LICENSE.txt": b"Attribution 4.0 International\n",
+        }
+    )
+    return http_server
+
+
+def test_get_downloads_once(tmp_path, server):
+    cache = ArtifactCache(tmp_path / "cache")
+    url = f"{server.url}/schema.json"
+
+    assert cache.get_json(url) == SCHEMA
+    assert cache.get_json(url) == SCHEMA
+    assert server.requests == ["/schema.json"]
+
+    # Check the cache is shared with other instances using the directory
+    assert ArtifactCache(tmp_path / "cache").get_json(url) == SCHEMA
+    assert server.requests == ["/schema.json"]
+
+
+def test_get_expired(tmp_path, server):
+    cache = ArtifactCache(tmp_path / "cache", ttl=0)
+    url = f"{server.url}/LICENSE.txt"
+
+    assert cache.get_text(url) == "Attribution 4.0 International\n"
+    server.files["/LICENSE.txt"] = b"Updated\n"
+    assert cache.get_text(url) == "Updated\n"
+    assert server.requests == ["/LICENSE.txt", "/LICENSE.txt"]
+
+    # Check pinned files never expire
+    assert cache.get_text(url, pinned=True) == "Updated\n"
+    assert len(server.requests) == 2
+
+
+def test_get_expired_download_fails(tmp_path, server):
+    """Test the expired cached copy is used if downloading fails"""
+    cache = ArtifactCache(tmp_path / "cache", ttl=0)
+    url = f"{server.url}/LICENSE.txt"
+    cache.get(url)
+
+    server.files.pop("/LICENSE.txt")
+    with pytest.warns(UserWarning, match="using cached copy: HTTP status 404"):
+        assert cache.get_text(url) == "Attribution 4.0 International\n"
+
+
+def test_get_download_fails(tmp_path, server):
+    cache = ArtifactCache(tmp_path / "cache")
+    with pytest.raises(RuntimeError, match="Failed to download .*HTTP status 404"):
+        cache.get(f"{server.url}/missing.json")
+
+
+def test_get_offline(tmp_path, server):
+    url = f"{server.url}/schema.json"
+    offline_cache = ArtifactCache(tmp_path / "cache", ttl=0, offline=True)
+    with pytest.raises(RuntimeError, match="downloads are disabled in offline mode"):
+        offline_cache.get(url)
+
+    ArtifactCache(tmp_path / "cache").get(url)
+    # Check expired files are used in offline mode
+    assert offline_cache.get_json(url) == SCHEMA
+    assert server.requests == ["/schema.json"]
+
+
+def test_add(tmp_path):
+    """Test a cache pre-seeded with vendored files works offline"""
+    cache = ArtifactCache(tmp_path / "cache", offline=True)
+    url = "https://example.com/schema.json"
+    digest = cache.add(url, json.dumps(SCHEMA).encode())
+
+    assert cache.get_json(url) == SCHEMA
+    assert (tmp_path / "cache" / "blobs" / digest).exists()
+
+
+def test_get_corrupted_blob(tmp_path, server):
+    """Test content that doesn't match its digest is downloaded again"""
+    cache = ArtifactCache(tmp_path / "cache")
+    url = f"{server.url}/schema.json"
+    digest = cache.add(url, json.dumps(SCHEMA).encode())
+    (tmp_path / "cache" / "blobs" / digest).write_bytes(b"corrupted")
+
+    assert cache.get_json(url) == SCHEMA
+    assert server.requests == ["/schema.json"]
+
+
+def test_from_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv(ARTIFACT_CACHE_DIR_ENV, str(tmp_path / "cache"))
+    monkeypatch.setenv(ARTIFACT_CACHE_OFFLINE_ENV, "true")
+    monkeypatch.setenv(ARTIFACT_CACHE_TTL_ENV, "60")
+
+    cache = ArtifactCache.from_environment()
+    assert cache.cache_dir == tmp_path / "cache"
+    assert cache.offline
+    assert cache.ttl == 60
+
+    # Check explicit options take precedence
+    cache = ArtifactCache.from_environment(cache_dir=tmp_path / "other")
+    assert cache.cache_dir == tmp_path / "other"
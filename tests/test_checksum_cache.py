@@ -0,0 +1,141 @@
+import json
+import os
+
+import pytest
+
+from model_config_tests.checksum_cache import (
+    CHECKSUM_CACHE_VERSION,
+    ChecksumCache,
+    file_identity,
+)
+
+
+@pytest.fixture
+def output_file(tmp_path):
+    output_file = tmp_path / "output000" / "access-om2.out"
+    output_file.parent.mkdir()
+    output_file.write_text("[chksum] ht              -2390360641069121536\n")
+    return output_file
+
+
+def test_file_identity(output_file):
+    stat = output_file.stat()
+    assert file_identity(output_file) == [
+        str(output_file),
+        stat.st_size,
+        stat.st_mtime_ns,
+        stat.st_ino,
+    ]
+
+
+def test_checksum_cache_get_set(tmp_path, output_file):
+    cache = ChecksumCache(tmp_path / "checksum-cache.json")
+    checksums = {"output": {"ht": ["-2390360641069121536"]}}
+
+    assert cache.get("key", [output_file]) is None
+
+    cache.set("key", [output_file], checksums)
+    assert cache.get("key", [output_file]) == checksums
+    assert cache.get("other_key", [output_file]) is None
+
+    # Check returned checksums are copies of the cached values
+    cached = cache.get("key", [output_file])
+    cached["output"]["ht"].append("1")
+    assert cache.get("key", [output_file]) == checksums
+
+
+def test_checksum_cache_persisted(tmp_path, output_file):
+    cache_path = tmp_path / "checksum-cache.json"
+    checksums = {"output": {"ht": ["-2390360641069121536"]}}
+    ChecksumCache(cache_path).set("key", [output_file], checksums)
+
+    assert cache_path.exists()
+    assert ChecksumCache(cache_path).get("key", [output_file]) == checksums
+
+
+@pytest.mark.parametrize("change", ["append", "mtime", "replace", "delete"])
+def test_checksum_cache_invalidated(tmp_path, output_file, change):
+    """Test cached entries are invalidated when the output file changes"""
+    cache = ChecksumCache(tmp_path / "checksum-cache.json")
+    cache.set("key", [output_file], {"output": {}})
+
+    if change == "append":
+        with open(output_file, "a") as f:
+            f.write("[chksum] hu               6389284661071183872\n")
+    elif change == "mtime":
+        stat = output_file.stat()
+        os.utime(output_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    elif change == "replace":
+        # Same content, but a new file (and inode)
+        new_file = output_file.with_name("new.out")
+        new_file.write_text(output_file.read_text())
+        output_file.unlink()
+        new_file.rename(output_file)
+    elif change == "delete":
+        output_file.unlink()
+
+    assert cache.get("key", [output_file]) is None
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "not json",
+        json.dumps({"version": CHECKSUM_CACHE_VERSION + 1, "entries": {}}),
+    ],
+)
+def test_checksum_cache_invalid_file(tmp_path, output_file, content):
+    """Test corrupt cache files or different cache versions are discarded"""
+    cache_path = tmp_path / "checksum-cache.json"
+    cache_path.write_text(content)
+
+    cache = ChecksumCache(cache_path)
+    assert cache.get("key", [output_file]) is None
+
+    cache.set("key", [output_file], {"output": {}})
+    with open(cache_path) as f:
+        assert json.load(f)["version"] == CHECKSUM_CACHE_VERSION
+
+
+def test_checksum_cache_shared(tmp_path, output_file):
+    """Test caches sharing a file keep each other's entries"""
+    cache_path = tmp_path / "checksum-cache.json"
+    cache_1 = ChecksumCache(cache_path)
+    cache_2 = ChecksumCache(cache_path)
+    # Load both caches before either is written to
+    assert cache_1.get("key_1", [output_file]) is None
+    assert cache_2.get("key_2", [output_file]) is None
+
+    cache_1.set("key_1", [output_file], {"output": {"ht": ["1"]}})
+    cache_2.set("key_2", [output_file], {"output": {"ht": ["2"]}})
+    cache_1.set("key_3", [output_file], {"output": {"ht": ["3"]}})
+
+    cache = ChecksumCache(cache_path)
+    for key, checksum in [("key_1", "1"), ("key_2", "2"), ("key_3", "3")]:
+        assert cache.get(key, [output_file]) == {"output": {"ht": [checksum]}}
+    # Entries written by the other cache are also merged in memory
+    assert cache_1.get("key_2", [output_file]) == {"output": {"ht": ["2"]}}
+
+
+def test_checksum_cache_write_error(tmp_path, output_file):
+    """Test failing to write the cache raises a warning, not an error"""
+    cache_path = tmp_path / "not_a_dir" / "checksum-cache.json"
+    (tmp_path / "not_a_dir").write_text("")
+
+    cache = ChecksumCache(cache_path)
+    with pytest.warns(UserWarning, match="Failed to write checksum cache"):
+        cache.set("key", [output_file], {"output": {}})
+
+    # Entry is still cached in memory
+    assert cache.get("key", [output_file]) == {"output": {}}
+
+
+def test_checksum_cache_clear(tmp_path, output_file):
+    cache_path = tmp_path / "checksum-cache.json"
+    cache = ChecksumCache(cache_path)
+    cache.set("key", [output_file], {"output": {}})
+
+    cache.clear()
+
+    assert not cache_path.exists()
+    assert cache.get("key", [output_file]) is None
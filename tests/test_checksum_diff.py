@@ -0,0 +1,149 @@
+import json
+
+import pytest
+
+from model_config_tests.checksum_diff import (
+    ChecksumFile,
+    JsonStream,
+    diff_checksum_files,
+    diff_checksums,
+    format_checksum_diff,
+)
+
+EXPECTED = {
+    "schema_version": "1-0-0",
+    "output": {
+        "Temp": ["1", "2", "3"],
+        "Salt": ["4", "5", "6"],
+        "u": ["7", "8"],
+        "v": ["9"],
+    },
+}
+
+PRODUCED = {
+    "schema_version": "1-0-0",
+    "output": {
+        "Temp": ["1", "2", "3"],
+        "Salt": ["4", "0", "6"],
+        "u": ["7", "8", "9"],
+        "eta": ["10"],
+    },
+    "checksum_digest": "blake2b:0123",
+}
+
+
+def write_json(path, data, **kwargs):
+    with open(path, "w") as f:
+        json.dump(data, f, **kwargs)
+    return path
+
+
+def test_json_stream(tmp_path):
+    data = {"a": 12345, "b": {"é": ["ü", 1.5e10], "c": {}}, "d": [], "e": "x" * 50}
+    path = write_json(tmp_path / "data.json", data, ensure_ascii=False, indent=1)
+
+    # Use a small block size so values span blocks
+    with open(path, "rb") as f:
+        stream = JsonStream(f, block_size=3)
+        result = {}
+        for key in stream.members():
+            if key == "b":
+                result[key] = {}
+                for inner_key in stream.members():
+                    offset = stream.offset()
+                    result[key][inner_key] = stream.value()
+                    if inner_key == "é":
+                        value_offset = offset
+            else:
+                result[key] = stream.value()
+        assert stream.peek() == ""
+
+    assert result == data
+    with open(path, "rb") as f:
+        assert JsonStream(f, value_offset, block_size=3).value() == ["ü", 1.5e10]
+
+
+def test_json_stream_invalid(tmp_path):
+    path = tmp_path / "invalid.json"
+    path.write_text('{"a": [1, 2}')
+    with open(path, "rb") as f:
+        stream = JsonStream(f)
+        with pytest.raises(ValueError, match="Invalid JSON"):
+            for _ in stream.members():
+                stream.value()
+
+
+def test_checksum_file(tmp_path):
+    path = write_json(tmp_path / "checksums.json", PRODUCED, indent=2)
+    with ChecksumFile(path) as checksum_file:
+        fields = list(checksum_file.fields())
+        assert [field for field, _, _ in fields] == list(PRODUCED["output"])
+        assert checksum_file.schema_version == "1-0-0"
+        for field, checksums, offset in fields:
+            assert checksums == PRODUCED["output"][field]
+            assert checksum_file.read_field(offset) == checksums
+
+
+def test_diff_checksum_files(tmp_path):
+    expected_path = write_json(tmp_path / "expected.json", EXPECTED, indent=2)
+    produced_path = write_json(tmp_path / "produced.json", PRODUCED)
+
+    report = diff_checksum_files(expected_path, produced_path)
+    assert report == {
+        "schema_version": "1-0-0",
+        "expected": str(expected_path),
+        "produced": str(produced_path),
+        "equal": False,
+        "first_divergent_field": "Salt",
+        "first_divergent_index": 1,
+        "n_fields": 4,
+        "n_changed": 2,
+        "n_added": 1,
+        "n_removed": 1,
+        "changed": {"Salt": 1, "u": 2},
+        "added": ["eta"],
+        "removed": ["v"],
+    }
+
+    # Check the report is the same when comparing loaded checksums
+    in_memory_report = diff_checksums(EXPECTED, PRODUCED)
+    assert in_memory_report == {
+        key: value
+        for key, value in report.items()
+        if key not in ("expected", "produced")
+    }
+
+    assert format_checksum_diff(report) == (
+        "2 changed, 1 added and 1 removed fields. "
+        "First divergent field: Salt (timestep index 1)"
+    )
+
+
+def test_diff_checksum_files_equal(tmp_path):
+    expected_path = write_json(tmp_path / "expected.json", EXPECTED)
+    produced_path = write_json(tmp_path / "produced.json", EXPECTED, indent=4)
+
+    report = diff_checksum_files(expected_path, produced_path)
+    assert report["equal"]
+    assert report["first_divergent_field"] is None
+    assert report["first_divergent_index"] is None
+    assert format_checksum_diff(report) == "No differences in checksums"
+
+
+def test_diff_checksums_only_removed():
+    produced = {"schema_version": "1-0-0", "output": {"Temp": ["1", "2", "3"]}}
+    report = diff_checksums(EXPECTED, produced)
+    assert report["first_divergent_field"] == "Salt"
+    assert report["first_divergent_index"] is None
+    assert report["removed"] == ["Salt", "u", "v"]
+
+
+def test_diff_checksums_unsupported_schema_version(tmp_path):
+    produced = {"schema_version": "2-0-0", "output": {}}
+    with pytest.raises(ValueError, match="Unsupported checksum schema version"):
+        diff_checksums(EXPECTED, produced)
+
+    expected_path = write_json(tmp_path / "expected.json", EXPECTED)
+    produced_path = write_json(tmp_path / "produced.json", produced)
+    with pytest.raises(ValueError, match="Unsupported checksum schema version"):
+        diff_checksum_files(expected_path, produced_path)
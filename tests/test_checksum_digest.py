@@ -0,0 +1,40 @@
+from model_config_tests.checksum_digest import (
+    CHECKSUM_DIGEST_KEY,
+    add_checksum_digest,
+    checksum_digest,
+    strip_checksum_digest,
+)
+
+CHECKSUMS = {
+    "schema_version": "1-0-0",
+    "output": {"Temp": ["4C0F6BAD3F8E5E41"], "u": ["1F2C3A4B5D6E7F80", "ABCD"]},
+}
+
+
+def test_checksum_digest():
+    digest = checksum_digest(CHECKSUMS)
+    assert digest.startswith("blake2b:")
+    assert len(digest) == len("blake2b:") + 64
+
+    # Check the digest doesn't depend on key order
+    reordered = {
+        "output": dict(reversed(CHECKSUMS["output"].items())),
+        "schema_version": "1-0-0",
+    }
+    assert checksum_digest(reordered) == digest
+
+    # Check any change to the checksums changes the digest
+    changed = {**CHECKSUMS, "output": {**CHECKSUMS["output"], "u": ["ABCD"]}}
+    assert checksum_digest(changed) != digest
+
+    assert checksum_digest(None) is None
+
+
+def test_add_checksum_digest():
+    checksums = add_checksum_digest(CHECKSUMS)
+    assert checksums[CHECKSUM_DIGEST_KEY] == checksum_digest(CHECKSUMS)
+    assert CHECKSUM_DIGEST_KEY not in CHECKSUMS
+
+    # Check a stored digest is ignored
+    assert checksum_digest(checksums) == checksum_digest(CHECKSUMS)
+    assert strip_checksum_digest(checksums) == CHECKSUMS
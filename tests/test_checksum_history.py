@@ -0,0 +1,182 @@
+import json
+import sqlite3
+
+import pytest
+
+from model_config_tests.checksum_digest import add_checksum_digest, checksum_digest
+from model_config_tests.checksum_history import ChecksumHistory
+from model_config_tests.cmds.checksum_history_cmd import parse_args, run
+
+# Checksums of each commit, in commit order. Temp changes in commit c,
+# Salt is added in commit b and u is removed in commit d
+COMMITS = {
+    "a": {"Temp": ["1"], "u": ["2"]},
+    "b": {"Temp": ["1"], "u": ["2"], "Salt": ["3"]},
+    "c": {"Temp": ["4"], "u": ["2"], "Salt": ["3"]},
+    "d": {"Temp": ["4"], "Salt": ["3"]},
+    "e": {"Temp": ["1"], "u": ["2"]},
+}
+
+
+def checksums(output):
+    return {"schema_version": "1-0-0", "output": output}
+
+
+@pytest.fixture
+def history(tmp_path):
+    with ChecksumHistory(tmp_path / "history.sqlite") as history:
+        for commit, output in COMMITS.items():
+            history.add(checksums(output), "om2-1deg", commit, runtime_hours=3)
+        yield history
+
+
+def test_commits_with_digest(history):
+    digest = checksum_digest(checksums(COMMITS["a"]))
+    checksum_sets = history.commits_with_digest(digest)
+    assert [checksum_set["commit_id"] for checksum_set in checksum_sets] == ["a", "e"]
+    assert checksum_sets[0]["runtime_hours"] == 3
+    assert checksum_sets[0]["schema_version"] == "1-0-0"
+    assert history.commits_with_digest("blake2b:unknown") == []
+
+
+@pytest.mark.parametrize(
+    "field, commit", [("Temp", "c"), ("Salt", "b"), ("u", "d"), ("missing", None)]
+)
+def test_first_change(history, field, commit):
+    checksum_set = history.first_change("om2-1deg", field)
+    if commit is None:
+        assert checksum_set is None
+    else:
+        assert checksum_set["commit_id"] == commit
+
+
+def test_first_change_separates_runtimes(history):
+    # Checksums for another runtime don't count as a change
+    history.add(checksums({"Temp": ["9"]}), "om2-1deg", "a", runtime_hours=24)
+    history.add(checksums({"Temp": ["9"]}), "om2-1deg", "b", runtime_hours=24)
+    assert history.first_change("om2-1deg", "Temp")["commit_id"] == "c"
+    assert history.first_change("om2-1deg", "Temp", runtime_hours=24) is None
+
+
+def test_first_change_commit_time(history):
+    # Commits are ordered by commit time, not the order they were added
+    for commit, value, commit_time in [("new", "2", "2021"), ("old", "1", "2020")]:
+        history.add(
+            checksums({"Temp": [value]}),
+            "om2-025deg",
+            commit,
+            runtime_hours=3,
+            commit_time=commit_time,
+        )
+    assert history.first_change("om2-025deg", "Temp")["commit_id"] == "new"
+
+
+def test_add_replaces_existing(history):
+    history.add(checksums(COMMITS["a"]), "om2-1deg", "c", runtime_hours=3)
+    digest = checksum_digest(checksums(COMMITS["a"]))
+    commits = [row["commit_id"] for row in history.commits_with_digest(digest)]
+    assert commits == ["a", "c", "e"]
+    assert history.first_change("om2-1deg", "Temp")["commit_id"] == "d"
+
+
+def test_add_keyed_by_model_version(history):
+    """Test checksums of a commit with another model version are kept, and
+    checksums with the same model version are replaced"""
+    for model_version, value in [("2024.03.0", "5"), ("2025.01.0", "6")]:
+        history.add(
+            checksums({"Temp": [value]}),
+            "om2-1deg",
+            "a",
+            runtime_hours=3,
+            model_version=model_version,
+        )
+    history.add(checksums({"Temp": ["7"]}), "om2-1deg", "a", 3, "2025.01.0")
+    history.add(checksums({"Temp": ["8"]}), "om2-1deg", "a", 3)
+
+    checksum_sets = [
+        history.commits_with_digest(checksum_digest(checksums({"Temp": [value]})))
+        for value in ["5", "6", "7", "8"]
+    ]
+    assert [[row["model_version"] for row in rows] for rows in checksum_sets] == [
+        ["2024.03.0"],
+        [],
+        ["2025.01.0"],
+        [None],
+    ]
+    # The checksums of commit a without a model version were replaced
+    digest = checksum_digest(checksums(COMMITS["a"]))
+    assert [row["commit_id"] for row in history.commits_with_digest(digest)] == ["e"]
+
+
+def test_unsupported_version(tmp_path):
+    db_path = tmp_path / "history.sqlite"
+    with sqlite3.connect(db_path) as connection:
+        connection.execute("PRAGMA user_version = 1")
+    connection.close()
+    with pytest.raises(RuntimeError, match="database version 1"):
+        ChecksumHistory(db_path)
+
+
+def test_add_again_keeps_commit_order(tmp_path):
+    """Test adding a commit again doesn't move it to the end of the commits
+    without commit times"""
+    with ChecksumHistory(tmp_path / "history.sqlite") as history:
+        for commit, value in [("a", "1"), ("b", "2"), ("c", "2")]:
+            history.add(checksums({"Temp": [value]}), "om2-1deg", commit, 3)
+        assert history.first_change("om2-1deg", "Temp")["commit_id"] == "b"
+
+        history.add(checksums({"Temp": ["1"]}), "om2-1deg", "a", 3, source="again")
+        assert history.first_change("om2-1deg", "Temp")["commit_id"] == "b"
+        digest = checksum_digest(checksums({"Temp": ["1"]}))
+        assert history.commits_with_digest(digest)[0]["source"] == "again"
+
+
+def test_ingest_output_dir(tmp_path):
+    checksum_dir = tmp_path / "output" / "checksum"
+    checksum_dir.mkdir(parents=True)
+    for hours in [3, 24]:
+        with open(checksum_dir / f"historical-{hours}hr-checksum.json", "w") as f:
+            json.dump(add_checksum_digest(checksums(COMMITS["a"])), f)
+    (checksum_dir / "other.json").write_text("{}")
+
+    with ChecksumHistory(tmp_path / "history.sqlite") as history:
+        paths = history.ingest_output_dir(
+            tmp_path / "output", "om2-1deg", "a", model_version="2024.03.0"
+        )
+        assert [path.name for path in paths] == [
+            "historical-24hr-checksum.json",
+            "historical-3hr-checksum.json",
+        ]
+        checksum_sets = history.commits_with_digest(
+            checksum_digest(checksums(COMMITS["a"]))
+        )
+        assert {row["runtime_hours"] for row in checksum_sets} == {3, 24}
+        assert {row["model_version"] for row in checksum_sets} == {"2024.03.0"}
+
+        with pytest.raises(ValueError, match="Not a historical checksum file"):
+            history.ingest_file(checksum_dir / "other.json", "om2-1deg", "a")
+
+
+def test_checksum_history_cmd(tmp_path, capsys):
+    db = tmp_path / "history.sqlite"
+    for commit in ["a", "b", "c"]:
+        checksum_file = tmp_path / commit / "historical-3hr-checksum.json"
+        checksum_file.parent.mkdir()
+        checksum_file.write_text(json.dumps(checksums(COMMITS[commit])))
+        args = ["--db", str(db), "ingest", str(checksum_file)]
+        args += ["--configuration", "om2-1deg", "--commit", commit]
+        assert run(parse_args(args)) == 0
+    assert "Added" in capsys.readouterr().out
+
+    # Query commits by the digest of a checksum file
+    checksum_file = tmp_path / "a" / "historical-3hr-checksum.json"
+    assert run(parse_args(["--db", str(db), "commits", str(checksum_file)])) == 0
+    assert capsys.readouterr().out.startswith("om2-1deg a (3hr, schema 1-0-0)")
+
+    args = ["--db", str(db), "first-change", "Temp", "--configuration", "om2-1deg"]
+    assert run(parse_args(args)) == 0
+    assert capsys.readouterr().out.startswith("om2-1deg c ")
+
+    args = ["--db", str(db), "first-change", "u", "--configuration", "om2-1deg"]
+    assert run(parse_args(args)) == 1
+    assert capsys.readouterr().out == "Checksums of u did not change\n"
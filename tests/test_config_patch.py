@@ -0,0 +1,273 @@
+import f90nml
+import pytest
+import yaml
+
+from model_config_tests.config_patch import (
+    ConfigDocument,
+    ConfigPatch,
+    format_namelist_value,
+    patch_namelist,
+    patch_namelist_lines,
+)
+
+ACCESSOM2_NML = """\
+&accessom2_nml
+    log_level = 'INFO'
+    ice_ocean_timestep = 5400
+/
+
+&date_manager_nml
+    forcing_start_date = '1900-01-01T00:00:00'
+    restart_period = 5, 0, 0   ! years, months, seconds
+/
+"""
+
+WAV_IN = """\
+&output_date_nml
+  date%field%outffile  = '1'
+  date%field%stride    = '3600'
+  date%restart%stride  = '86400'
+/
+"""
+
+RUNCONFIG = """\
+ALLCOMP_attributes::
+     OCN_model = mom
+::
+
+CLOCK_attributes::
+     restart_n = 1
+     restart_option = nyears
+     stop_n = 1
+     stop_option = nyears
+::
+"""
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (1, "1"),
+        (1.5, "1.5"),
+        (True, ".true."),
+        ("d", "'d'"),
+        ("it's", "'it''s'"),
+        ([48, 0, 0, 0], "48, 0, 0, 0"),
+    ],
+)
+def test_format_namelist_value(value, expected):
+    assert format_namelist_value(value) == expected
+
+
+def test_patch_namelist_lines():
+    """Test only the lines of the patched variables are changed"""
+    lines = ACCESSOM2_NML.splitlines(keepends=True)
+    patched = patch_namelist_lines(
+        lines, {"DATE_MANAGER_NML": {"Restart_Period": [0, 0, 10800]}}
+    )
+
+    assert patched == [
+        (
+            "    restart_period = 0, 0, 10800   ! years, months, seconds\n"
+            if "restart_period" in line
+            else line
+        )
+        for line in lines
+    ]
+
+
+def test_patch_namelist_lines_derived_type():
+    lines = WAV_IN.splitlines(keepends=True)
+    patched = patch_namelist_lines(
+        lines, {"output_date_nml": {"date": {"restart": {"stride": 21600}}}}
+    )
+    assert patched[3] == "  date%restart%stride  = 21600\n"
+    assert patched[:3] + patched[4:] == lines[:3] + lines[4:]
+
+
+@pytest.mark.parametrize(
+    "nml, patch",
+    [
+        # Variable not in namelist
+        (ACCESSOM2_NML, {"date_manager_nml": {"new_variable": 1}}),
+        # Group not in namelist
+        (ACCESSOM2_NML, {"new_nml": {"restart_period": 1}}),
+        # Array over multiple lines
+        ("&nml\n x = 1,\n     2\n/\n", {"nml": {"x": [3, 4]}}),
+        # Multiple assignments on one line
+        ("&nml\n x = 1, y = 2\n/\n", {"nml": {"x": 3}}),
+        # Assigned more than once
+        ("&nml\n x = 1\n x = 2\n/\n", {"nml": {"x": 3}}),
+        # Assigned by index
+        ("&nml\n x(1) = 1\n/\n", {"nml": {"x": 3}}),
+        # Group ended after a value, so y is not in the first group
+        ("&nml\n x = 1 /\n&nml2\n y = 2\n/\n", {"nml": {"y": 3}}),
+        # One line group, so y is not in the first group
+        ("&nml x = 1 /\n&nml2\n y = 2\n/\n", {"nml": {"y": 3}}),
+        # Assigned on the group line
+        ("&nml x = 1\n y = 2\n/\n", {"nml": {"x": 3}}),
+        # Quoted string over multiple lines
+        ("&nml\n s = 'a\n /b'\n x = 1\n/\n", {"nml": {"x": 3}}),
+    ],
+)
+def test_patch_namelist_lines_unsupported(nml, patch):
+    """Test None is returned when lines can't be patched in place"""
+    assert patch_namelist_lines(nml.splitlines(keepends=True), patch) is None
+
+
+@pytest.mark.parametrize(
+    "nml",
+    [
+        # Group ended after a value
+        "&nml\n x = 1 /\n&nml2\n y = 2 ! a / in a comment\n s = 'a/b'\n/\n",
+        # One line group
+        "&nml x = 1 /\n&nml2\n y = 2 ! a / in a comment\n s = 'a/b'\n/\n",
+    ],
+)
+def test_patch_namelist_lines_group_end(nml):
+    """Test groups ending on the same line as values are tracked"""
+    lines = nml.splitlines(keepends=True)
+    patched = patch_namelist_lines(lines, {"nml2": {"y": 3, "s": "c"}})
+    assert patched[-3:] == [
+        " y = 3 ! a / in a comment\n",
+        " s = 'c'\n",
+        "/\n",
+    ]
+    assert patched[:-3] == lines[:-3]
+
+
+def set_nested(nml, patch):
+    """Set namelist values from a nested patch dictionary"""
+    for key, value in patch.items():
+        if isinstance(value, dict) and key in nml:
+            set_nested(nml[key], value)
+        else:
+            nml[key] = value
+
+
+@pytest.mark.parametrize(
+    "nml, patch",
+    [
+        (ACCESSOM2_NML, {"date_manager_nml": {"restart_period": [0, 0, 10800]}}),
+        (ACCESSOM2_NML, {"date_manager_nml": {"new_variable": "value"}}),
+        (WAV_IN, {"output_date_nml": {"date": {"restart": {"stride": 21600}}}}),
+        ("&nml\n x = 1,\n     2\n/\n", {"nml": {"x": [3, 4, 5]}}),
+        ("&nml\n x = 1 /\n&nml2\n y = 2\n/\n", {"nml": {"y": 3}}),
+        ("&nml x = 1 /\n&nml2\n y = 2\n/\n", {"nml": {"y": 3}}),
+    ],
+)
+def test_patch_namelist(tmp_path, nml, patch):
+    """Test patched namelists match reading, updating and writing the
+    namelist with f90nml"""
+    path = tmp_path / "input.nml"
+    path.write_text(nml)
+    path.chmod(0o640)
+
+    patch_namelist(path, patch)
+
+    expected = f90nml.reads(nml)
+    set_nested(expected, patch)
+    assert f90nml.read(path) == expected
+    assert path.stat().st_mode & 0o777 == 0o640
+    # Check no temporary files are left behind
+    assert [p.name for p in tmp_path.iterdir()] == ["input.nml"]
+
+
+def test_config_patch_apply(tmp_path):
+    """Test all edits are applied in one pass per file"""
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text("model: access-om3\nrunlog: true\n")
+    nml_path = tmp_path / "accessom2.nml"
+    nml_path.write_text(ACCESSOM2_NML)
+    wav_in_path = tmp_path / "wav_in"
+    wav_in_path.write_text(WAV_IN)
+    runconfig_path = tmp_path / "nuopc.runconfig"
+    runconfig_path.write_text(RUNCONFIG)
+
+    config_patch = ConfigPatch()
+    assert not config_patch.pending
+
+    config_patch.edit_yaml(config_path, lambda doc: doc.update(runlog=False))
+    config_patch.edit_yaml(config_path, lambda doc: doc.update(experiment="exp"))
+    config_patch.patch_namelist(nml_path, {"accessom2_nml": {"log_level": "DEBUG"}})
+    config_patch.patch_namelist(
+        nml_path, {"date_manager_nml": {"restart_period": [0, 0, 10800]}}
+    )
+    config_patch.patch_namelist(
+        wav_in_path, {"output_date_nml": {"date": {"restart": {"stride": 10800}}}}
+    )
+    runconfig = config_patch.runconfig(runconfig_path)
+    assert config_patch.runconfig(runconfig_path) is runconfig
+    assert runconfig.get("ALLCOMP_attributes", "OCN_model") == "mom"
+    runconfig.set("CLOCK_attributes", "stop_n", "10800")
+    runconfig.set("CLOCK_attributes", "stop_option", "nseconds")
+
+    # Check nothing is written until the patch is applied
+    assert config_path.read_text() == "model: access-om3\nrunlog: true\n"
+    assert nml_path.read_text() == ACCESSOM2_NML
+    assert runconfig_path.read_text() == RUNCONFIG
+    assert config_patch.pending
+
+    config_patch.apply()
+    assert not config_patch.pending
+
+    with open(config_path) as f:
+        assert yaml.safe_load(f) == {
+            "model": "access-om3",
+            "runlog": False,
+            "experiment": "exp",
+        }
+
+    nml = f90nml.read(nml_path)
+    assert nml["accessom2_nml"]["log_level"] == "DEBUG"
+    assert nml["date_manager_nml"]["restart_period"] == [0, 0, 10800]
+
+    wav_in = f90nml.read(wav_in_path)
+    assert wav_in["output_date_nml"]["date"]["restart"]["stride"] == 10800
+
+    assert runconfig_path.read_text() == RUNCONFIG.replace(
+        "stop_n = 1", "stop_n = 10800"
+    ).replace("stop_option = nyears", "stop_option = nseconds")
+
+
+def test_config_document(tmp_path):
+    """Test the document is read once, edited in memory and written once"""
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text("model: access-om2\n")
+
+    document = ConfigDocument(config_path)
+    assert document.data == {"model": "access-om2"}
+    assert document.data is document.data
+    assert not document.modified
+
+    document.edit(lambda doc: doc.update(runlog=False))
+    assert document.modified
+    assert document.data == {"model": "access-om2", "runlog": False}
+    assert config_path.read_text() == "model: access-om2\n"
+
+    document.flush()
+    assert not document.modified
+    with open(config_path) as f:
+        assert yaml.safe_load(f) == {"model": "access-om2", "runlog": False}
+
+    # Check an unmodified document is re-read if the file changes on disk
+    config_path.write_text("model: access-om3\n")
+    assert document.data == {"model": "access-om3"}
+
+
+def test_config_patch_shares_documents(tmp_path):
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text("model: access-om2\n")
+
+    config_patch = ConfigPatch()
+    document = config_patch.document(config_path)
+    assert config_patch.document(config_path) is document
+
+    config_patch.edit_yaml(config_path, lambda doc: doc.update(runlog=False))
+    # Edits are visible to everything sharing the document before writing
+    assert document.data["runlog"] is False
+    assert config_patch.pending
+
+    config_patch.apply()
+    assert not config_patch.pending
+    assert config_patch.document(config_path) is document
@@ -0,0 +1,187 @@
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import pytest
+import yaml
+
+from model_config_tests.cmds import config_tests_cmd
+from model_config_tests.cmds.config_tests_cmd import (
+    CONFIG_TESTS_DIR,
+    HERE,
+    WORKER_ERROR_EXIT_CODE,
+    configuration_labels,
+    merge_junit_reports,
+    parse_batch_args,
+    run_batch,
+)
+
+JUNIT_REPORT = """\
+<?xml version="1.0" encoding="utf-8"?>
+<testsuites><testsuite name="pytest" errors="0" failures="{failures}" skipped="0"
+tests="2" time="0.5"><testcase classname="test_config.TestConfig" name="test_a"/>
+<testcase classname="test_config.TestConfig" name="test_b"/></testsuite></testsuites>
+"""
+
+
+def test_parse_batch_args():
+    batch_args, pytest_args = parse_batch_args(
+        ["--control-paths", "a", "b", "-m", "config", "--junitxml=out.xml"]
+    )
+    assert batch_args.control_paths == [Path("a"), Path("b")]
+    assert batch_args.junitxml == "out.xml"
+    assert pytest_args == ["-m", "config"]
+
+    # Check --control-path is not treated as an abbreviation
+    batch_args, pytest_args = parse_batch_args(["--control-path", "a"])
+    assert batch_args.control_paths is None
+    assert pytest_args == ["--control-path", "a"]
+
+
+def test_configuration_labels(tmp_path):
+    paths = [tmp_path / "a" / "om2", tmp_path / "b" / "om2", tmp_path / "esm1p5"]
+    paths.append(tmp_path / "c" / "om2")
+    assert configuration_labels(paths) == ["om2", "om2-1", "esm1p5", "om2-2"]
+
+
+def test_merge_junit_reports(tmp_path):
+    reports = {}
+    for label, failures in [("release-om2", 0), ("dev-om2", 1)]:
+        reports[label] = tmp_path / f"{label}.xml"
+        reports[label].write_text(JUNIT_REPORT.format(failures=failures))
+    reports["missing"] = tmp_path / "missing.xml"
+
+    output = tmp_path / "combined.xml"
+    merge_junit_reports(reports, output)
+
+    root = ET.parse(output).getroot()
+    assert root.tag == "testsuites"
+    assert root.get("tests") == "4"
+    assert root.get("failures") == "1"
+    assert root.get("time") == "1.000"
+    assert [suite.get("name") for suite in root] == ["release-om2", "dev-om2"]
+    assert root[1][0].get("classname") == "dev-om2.test_config.TestConfig"
+
+
+def test_run_batch(tmp_path, capsys):
+    """Test QA tests run for each configuration, with a combined report"""
+    configs = {
+        "passing": {"model": "access-om2"},
+        "failing": {"model": "access-om2", "qsub_flags": "-l storage=gdata/ik11"},
+    }
+    control_paths = []
+    for name, config in configs.items():
+        control_path = tmp_path / name
+        control_path.mkdir()
+        with open(control_path / "config.yaml", "w") as f:
+            yaml.dump(config, f)
+        control_paths.append(control_path)
+
+    junitxml = tmp_path / "report.xml"
+    errcode = run_batch(
+        str(HERE.parent.parent / CONFIG_TESTS_DIR),
+        control_paths,
+        ["-m", "config", "-k", "test_no_storage_qsub_flags", "-p", "no:sugar"],
+        workers=2,
+        junitxml=str(junitxml),
+    )
+
+    assert errcode == 1
+    output = capsys.readouterr().out
+    assert f"passing ({control_paths[0]}): passed" in output
+    assert f"failing ({control_paths[1]}): failed (1)" in output
+
+    root = ET.parse(junitxml).getroot()
+    assert {suite.get("name"): suite.get("failures") for suite in root} == {
+        "passing": "0",
+        "failing": "1",
+    }
+
+
+@pytest.mark.parametrize("output_path", [None, "outputs"])
+def test_run_batch_output_paths(tmp_path, monkeypatch, output_path):
+    """Test each configuration has its own output directory, including when
+    --output-path isn't set"""
+    monkeypatch.setenv("TMPDIR", str(tmp_path))
+    calls = {}
+
+    def run_configuration(test_path, control_path, pytest_args, junitxml):
+        calls[control_path] = pytest_args
+        return 0, ""
+
+    # Run in threads, so the patched function is called
+    monkeypatch.setattr(config_tests_cmd, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(config_tests_cmd, "run_configuration", run_configuration)
+
+    control_paths = [tmp_path / "release-om2", tmp_path / "dev-om2"]
+    if output_path is not None:
+        output_path = tmp_path / output_path
+    errcode = run_batch(
+        "tests", control_paths, ["-m", "config"], output_path=output_path
+    )
+
+    assert errcode == 0
+    expected_output_path = output_path or tmp_path / "test-model-repro"
+    assert calls == {
+        control_path: [
+            "-m",
+            "config",
+            f"--output-path={expected_output_path / control_path.name}",
+        ]
+        for control_path in control_paths
+    }
+
+
+def test_run_batch_worker_error(tmp_path, monkeypatch, capsys):
+    """Test a configuration whose worker fails is reported as failed, and
+    the other configurations' results and report are kept"""
+
+    def run_configuration(test_path, control_path, pytest_args, junitxml):
+        if control_path.name == "broken":
+            raise BrokenProcessPool("A child process terminated abruptly")
+        Path(junitxml).write_text(JUNIT_REPORT.format(failures=0))
+        return 0, "2 passed"
+
+    monkeypatch.setattr(config_tests_cmd, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(config_tests_cmd, "run_configuration", run_configuration)
+
+    control_paths = [tmp_path / "broken", tmp_path / "working"]
+    junitxml = tmp_path / "report.xml"
+    errcode = run_batch(
+        "tests",
+        control_paths,
+        [],
+        junitxml=str(junitxml),
+        output_path=tmp_path / "output",
+    )
+
+    assert errcode == WORKER_ERROR_EXIT_CODE
+    output = capsys.readouterr().out
+    assert (
+        f"broken ({control_paths[0]}): failed ({WORKER_ERROR_EXIT_CODE}): "
+        "BrokenProcessPool: A child process terminated abruptly"
+    ) in output
+    assert f"working ({control_paths[1]}): passed" in output
+    root = ET.parse(junitxml).getroot()
+    assert [suite.get("name") for suite in root] == ["working"]
+
+
+def test_slow_imports_are_lazy():
+    """Test modules with slow imports aren't imported when the command starts
+    and the configuration tests are collected"""
+    code = (
+        "import sys, model_config_tests.cmds.config_tests_cmd, "
+        "model_config_tests.config_tests.conftest, "
+        "model_config_tests.config_tests.qa.test_config, "
+        "model_config_tests.config_tests.test_bit_reproducibility; "
+        "print(' '.join(sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    packages = {name.split(".")[0] for name in result.stdout.split()}
+    lazy_packages = {"netCDF4", "requests", "jsonschema", "payu", "ruamel"}
+    assert packages & lazy_packages == set()
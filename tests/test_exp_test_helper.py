@@ -1,5 +1,10 @@
+import json
+import os
 import shutil
 import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from unittest.mock import MagicMock, Mock, patch
 
@@ -7,6 +12,7 @@ import pytest
 import yaml
 from netCDF4 import Dataset
 
+from model_config_tests.checksum_cache import CHECKSUM_CACHE_FILENAME
 from model_config_tests.exp_test_helper import (
     Experiments,
     ExpTestHelper,
@@ -14,9 +20,12 @@ from model_config_tests.exp_test_helper import (
     parse_gadi_pbs_ids,
     parse_pbs_submitted_jobs,
     parse_run_id,
+    setup_exp,
     wait_for_payu_jobs,
 )
 from model_config_tests.models.accessom3 import AccessOm3
+from model_config_tests.models.mom5 import mom5_extract_checksums
+from model_config_tests.util import DirectoryReaper
 from tests.common import RESOURCES_DIR
 
 LOG_DIR = RESOURCES_DIR / "experiment-logs"
@@ -89,6 +98,19 @@ def test_experiment_setup_for_test_run(exp, tmp_path):
     }
 
     assert config == expected_config
+    assert exp.config == expected_config
+
+
+def test_experiment_setup_for_test_run_deferred(exp):
+    exp.setup_for_test_run(apply=False)
+    # Check the edits are shared but not written until before payu is run
+    assert exp.config["runlog"] is False
+    assert exp.config_document.modified
+    assert (exp.control_path / "config.yaml").read_text() == "model: access-om2\n"
+
+    exp.config_patch.apply()
+    with open(exp.control_path / "config.yaml") as f:
+        assert yaml.safe_load(f) == exp.config
 
 
 def test_experiment_setup_for_test_run_remove_postprocessing(exp, tmp_path):
@@ -144,6 +166,10 @@ def test_experiment_submit_payu_run(mock_run, exp):
 
     assert exp.run_id == "1234567.gadi-pbs"
 
+    # Check payu is run in the control directory
+    for call in mock_run.call_args_list:
+        assert call.kwargs["cwd"] == exp.control_path
+
     # Check that the working directory is restored
     assert current_working_dir == Path.cwd()
 
@@ -162,6 +188,69 @@ def test_experiment_submit_payu_run_n_runs(mock_run, exp):
     assert mock_run.call_args[0][0] == expected_run_args
 
 
+FAKE_PAYU_SCRIPT = """#!{python}
+import json, os, sys, time
+cwd = os.getcwd()
+with open({log!r}, "a") as f:
+    f.write(json.dumps({{"cwd": cwd, "pwd": os.environ["PWD"], "args": sys.argv[1:]}}))
+    f.write("\\n")
+# Give other invocations time to run at the same time
+time.sleep(0.05)
+if sys.argv[1] == "run":
+    # Job ID is the experiment number in the control directory name
+    print(os.path.basename(cwd).split("_")[-1] + ".gadi-pbs")
+"""
+
+
+def test_experiment_run_payu_concurrently(tmp_path, monkeypatch):
+    """Stress test many concurrent payu invocations each run in their own
+    experiment control directory"""
+    n_exps = 8
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    log = tmp_path / "payu_calls.log"
+    payu = bin_dir / "payu"
+    payu.write_text(FAKE_PAYU_SCRIPT.format(python=sys.executable, log=str(log)))
+    payu.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+    lab_path = tmp_path / "lab"
+    exps = []
+    for i in range(n_exps):
+        control_path = tmp_path / "control" / f"exp_{i}"
+        control_path.mkdir(parents=True)
+        with open(control_path / "config.yaml", "w") as f:
+            yaml.dump({"model": "access-om2"}, f)
+        exps.append(ExpTestHelper(control_path=control_path, lab_path=lab_path))
+
+    def setup_and_submit(exp):
+        exp.setup()
+        exp.submit_payu_run()
+
+    owd = Path.cwd()
+    with ThreadPoolExecutor(max_workers=n_exps) as executor:
+        list(executor.map(setup_and_submit, exps))
+    assert Path.cwd() == owd
+
+    for i, exp in enumerate(exps):
+        assert exp.run_id == f"{i}.gadi-pbs"
+
+    calls = [json.loads(line) for line in log.read_text().splitlines()]
+    assert len(calls) == n_exps * 4
+    for call in calls:
+        assert call["pwd"] == call["cwd"]
+
+    # Check each experiment ran setup twice, then sweep and run
+    commands_by_dir = {}
+    for call in calls:
+        commands_by_dir.setdefault(call["cwd"], []).append(call["args"][0])
+    assert sorted(commands_by_dir) == sorted(
+        os.path.realpath(exp.control_path) for exp in exps
+    )
+    for commands in commands_by_dir.values():
+        assert commands == ["setup", "setup", "sweep", "run"]
+
+
 @patch("subprocess.run")
 def test_experiment_submit_payu_run_disabled(mock_run, exp):
     """Payu run is not called when disabled field is set to True"""
@@ -431,6 +520,7 @@ def test_experiment_wait_for_payu_run(exp, tmp_path):
 
         output_filenames = [Path(filepath).name for filepath in output_files]
         assert output_filenames == test_files
+        assert exp.current_job_id == "137776068.gadi-pbs"
 
 
 def test_experiment_wait_for_payu_run_disabled(exp):
@@ -525,6 +615,42 @@ def test_extract_checksums_split_uses_first_tile(exp_with_restarts):
     assert checksums["output"]["DTBT"][0] == "AC87F8AC28BD1436"
 
 
+def test_experiment_extract_checksums_cached(exp):
+    """Test repeated checksum extraction uses the checksum cache, until the
+    output file changes"""
+    exp.output000.mkdir(parents=True)
+    output_file = exp.output000 / "access-om2.out"
+    output_file.write_text("[chksum] ht              -2390360641069121536\n")
+
+    with patch(
+        "model_config_tests.models.accessom2.mom5_extract_checksums",
+        wraps=mom5_extract_checksums,
+    ) as mock_extract:
+        checksums = exp.extract_checksums()
+        assert checksums == {
+            "schema_version": "1-0-0",
+            "output": {"ht": ["-2390360641069121536"]},
+        }
+        assert exp.extract_checksums() == checksums
+        assert exp.extract_full_checksums() == checksums["output"]
+        assert mock_extract.call_count == 2
+
+        # Check cache is stored next to the archived output
+        assert (exp.archive_path / CHECKSUM_CACHE_FILENAME).exists()
+
+        # Check cache is used by a new experiment instance
+        new_exp = ExpTestHelper(control_path=exp.control_path, lab_path=exp.lab_path)
+        assert new_exp.extract_checksums() == checksums
+        assert mock_extract.call_count == 2
+
+        # Check the checksums are re-extracted when the output changes
+        with open(output_file, "a") as f:
+            f.write("[chksum] hu               6389284661071183872\n")
+        checksums = exp.extract_checksums()
+        assert checksums["output"]["hu"] == ["6389284661071183872"]
+        assert mock_extract.call_count == 3
+
+
 def test_experiments_check_experiment_error(tmp_path):
     with patch("model_config_tests.exp_test_helper.setup_exp") as mock_setup_exp:
         # Create an experiment that will error later on
@@ -568,6 +694,230 @@ def test_experiments_check_experiment_error(tmp_path):
         exps.check_experiment("error_exp")
 
 
+def test_experiments_wait_for_all_experiments_concurrently(tmp_path, capsys):
+    """Test experiments are waited on at the same time with a shared job
+    tracker, and completions are reported in the order they finish"""
+    slow_exp_finished = threading.Event()
+    fast_exp_reported = threading.Event()
+
+    def report(*args, **kwargs):
+        print(*args, **kwargs)
+        if "Experiment fast_exp completed" in str(args[0]):
+            fast_exp_reported.set()
+
+    def wait_slow(job_tracker):
+        # Only finishes once the other experiment has finished and been
+        # reported, so the order of completion is deterministic
+        assert fast_exp_reported.wait(timeout=10)
+        slow_exp_finished.set()
+
+    def wait_fast(job_tracker):
+        pass
+
+    exps = Experiments(
+        control_path=tmp_path / "control",
+        output_path=tmp_path / "output",
+    )
+    for exp_name, wait in [("slow_exp", wait_slow), ("fast_exp", wait_fast)]:
+        mock_exp = Mock(autospec=ExpTestHelper)
+        mock_exp.wait_for_payu_run.side_effect = wait
+        exps.experiments[exp_name] = mock_exp
+
+    with patch("model_config_tests.exp_test_helper.print", report, create=True):
+        exps.wait_for_all_experiments(catch_errors=True)
+
+    assert slow_exp_finished.is_set()
+    assert exps.experiment_errors == {}
+
+    # Check experiments shared the same job tracker
+    trackers = {
+        exp.wait_for_payu_run.call_args.kwargs["job_tracker"]
+        for exp in exps.experiments.values()
+    }
+    assert len(trackers) == 1
+
+    output = capsys.readouterr().out
+    assert output.index("Experiment fast_exp completed") < output.index(
+        "Experiment slow_exp completed"
+    )
+
+
+def make_om2_experiment(tmp_path, exp_name):
+    """Create an ACCESS-OM2 experiment with a shared lab directory"""
+    control_path = tmp_path / "control" / exp_name
+    control_path.mkdir(parents=True)
+    with open(control_path / "config.yaml", "w") as f:
+        yaml.dump({"model": "access-om2"}, f)
+    return ExpTestHelper(control_path=control_path, lab_path=tmp_path / "lab")
+
+
+@pytest.mark.parametrize("cancel_diverged", [False, True])
+def test_experiments_wait_for_all_experiments_live_compare(tmp_path, cancel_diverged):
+    """Test divergent checksums of running experiments are reported before
+    the jobs finish, and the jobs are cancelled if requested"""
+    cancelled = threading.Event()
+    divergence_found = threading.Event()
+
+    def run_model(exp, hu_checksum):
+        def wait_for_payu_run(job_tracker):
+            exp.current_job_id = f"{exp.exp_name}.gadi-pbs"
+            # payu writes the model stdout to the control directory while
+            # the model is running, then moves it to the work directory
+            output_file = exp.control_path / "access-om2.out"
+            with open(output_file, "w") as f:
+                f.write("[chksum] ht  1\n")
+                f.write(f"[chksum] hu  {hu_checksum}\n")
+                f.flush()
+                # Keep running until the divergence has been found
+                assert divergence_found.wait(timeout=10)
+            exp.work_path.mkdir(parents=True)
+            shutil.move(output_file, exp.work_path / "access-om2.out")
+            if cancel_diverged:
+                assert cancelled.wait(timeout=10)
+                raise RuntimeError("Payu run job failed with exit status 271")
+
+        return wait_for_payu_run
+
+    exps = Experiments(
+        control_path=tmp_path / "control",
+        output_path=tmp_path / "output",
+    )
+    for exp_name, hu_checksum in [("exp_1", 2), ("exp_2", 3)]:
+        exp = make_om2_experiment(tmp_path, exp_name)
+        exp.wait_for_payu_run = run_model(exp, hu_checksum)
+        exps.experiments[exp_name] = exp
+
+    def report(*args, **kwargs):
+        print(*args, **kwargs)
+        if "diverged" in str(args[0]):
+            divergence_found.set()
+
+    with (
+        patch("model_config_tests.exp_test_helper.print", report, create=True),
+        patch(
+            "model_config_tests.exp_test_helper.qdel_jobs",
+            side_effect=lambda job_ids: cancelled.set(),
+        ) as mock_qdel,
+    ):
+        exps.wait_for_all_experiments(
+            catch_errors=True,
+            live_compare=[("exp_1", "exp_2")],
+            cancel_diverged=cancel_diverged,
+            live_poll_interval=0.01,
+        )
+
+    assert exps.live_divergences[("exp_1", "exp_2")]["expected"] == ["hu", "2"]
+    message = (
+        "Checksums of experiment exp_2 diverged from exp_1: checksum record 1 "
+        "of hu (timestep index 0) is 3, expected 2"
+    )
+    if cancel_diverged:
+        mock_qdel.assert_called_once_with(["exp_1.gadi-pbs", "exp_2.gadi-pbs"])
+        assert exps.experiment_errors == {
+            "exp_1": f"Cancelled. {message}",
+            "exp_2": f"Cancelled. {message}",
+        }
+        with pytest.raises(RuntimeError, match="Cancelled. Checksums of experiment"):
+            exps.check_experiment("exp_2")
+    else:
+        mock_qdel.assert_not_called()
+        assert exps.experiment_errors == {}
+
+
+def test_experiments_wait_for_all_experiments_live_compare_no_checksums(
+    tmp_path, capsys
+):
+    """Test a live comparison that doesn't compare any checksums is
+    reported, rather than treated as equal checksums"""
+    exps = Experiments(
+        control_path=tmp_path / "control",
+        output_path=tmp_path / "output",
+    )
+    for exp_name in ["exp_1", "exp_2"]:
+        exp = make_om2_experiment(tmp_path, exp_name)
+        exp.wait_for_payu_run = Mock()
+        exps.experiments[exp_name] = exp
+
+    exps.wait_for_all_experiments(
+        catch_errors=True, live_compare=[("exp_1", "exp_2")], live_poll_interval=0.01
+    )
+
+    assert exps.live_divergences == {}
+    output = capsys.readouterr().out
+    assert "No checksums of experiments exp_1 and exp_2 were compared" in output
+
+
+def test_experiments_setup_and_submit_all(tmp_path):
+    """Test experiments are submitted at the same time, and a submission
+    error is isolated to its experiment"""
+    # Each successful submission waits for the other, so would time out if
+    # experiments were submitted one at a time
+    barrier = threading.Barrier(2, timeout=10)
+    mock_exps = {}
+
+    def mock_setup_exp(control_path, output_path, exp_name, keep_archive, **kwargs):
+        mock_exp = Mock(autospec=ExpTestHelper)
+        if exp_name == "error_exp":
+            mock_exp.submit_payu_run.side_effect = RuntimeError(
+                "Failed to run payu setup"
+            )
+        else:
+            mock_exp.submit_payu_run.side_effect = lambda **kwargs: barrier.wait()
+        mock_exps[exp_name] = mock_exp
+        return mock_exp
+
+    exps = Experiments(
+        control_path=tmp_path / "control",
+        output_path=tmp_path / "output",
+    )
+    with patch(
+        "model_config_tests.exp_test_helper.setup_exp", side_effect=mock_setup_exp
+    ):
+        exps.setup_and_submit_all(
+            {
+                "exp_1": {"model_runtime": 86400, "n_runs": 2},
+                "error_exp": {"model_runtime": None, "n_runs": None},
+                "exp_2": {"model_runtime": None, "n_runs": 1},
+            },
+            max_workers=3,
+        )
+
+    assert exps.experiment_errors == {"error_exp": "Failed to run payu setup"}
+    mock_exps["exp_1"].model.set_model_runtime.assert_called_once_with(seconds=86400)
+    mock_exps["exp_1"].submit_payu_run.assert_called_once_with(n_runs=2)
+
+    # Check experiments with submission errors are not waited on
+    exps.wait_for_all_experiments()
+    mock_exps["error_exp"].wait_for_payu_run.assert_not_called()
+    mock_exps["exp_2"].wait_for_payu_run.assert_called_once()
+    with pytest.raises(RuntimeError, match="Failed to run payu setup"):
+        exps.check_experiment("error_exp")
+
+
+def test_setup_exp_with_reaper(tmp_path):
+    """Test pre-existing archive and work directories are moved to the trash
+    and deleted by the reaper"""
+    control_path = tmp_path / "base-experiment"
+    control_path.mkdir()
+    with open(control_path / "config.yaml", "w") as f:
+        yaml.dump({"model": "access-om2"}, f)
+
+    output_path = tmp_path / "output"
+    archive_path = output_path / "lab" / "archive" / "exp"
+    work_path = output_path / "lab" / "work" / "exp"
+    for path in [archive_path / "output000", work_path]:
+        path.mkdir(parents=True)
+
+    reaper = DirectoryReaper(output_path / "lab" / ".trash")
+    exp = setup_exp(control_path, output_path, "exp", reaper=reaper)
+    assert exp.archive_path == archive_path
+    assert not archive_path.exists()
+    assert not work_path.exists()
+
+    reaper.reap()
+    assert not (output_path / "lab" / ".trash").exists()
+
+
 @patch("subprocess.run")
 def test_setup_reproduce_error(mock_run, exp):
     """Test that payu setup --repro fails raises an error and return to original work directory"""
@@ -0,0 +1,78 @@
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+import yaml
+
+from model_config_tests import experiment_comparison
+from model_config_tests.experiment_comparison import (
+    ExperimentChecksumStore,
+    extract_experiment_checksums,
+)
+
+CHECKSUMS = {
+    "exp1": {"schema_version": "1-0-0", "output": {"a": ["0"], "b": ["1"]}},
+    "exp2": {"output": {"b": ["1"], "a": ["0"]}, "schema_version": "1-0-0"},
+    "exp3": {"schema_version": "1-0-0", "output": {"a": ["0"], "b": ["2"]}},
+    "exp4": {"schema_version": "1-0-0", "output": {"a": ["0"], "b": ["1"]}},
+}
+
+
+def fake_extract(experiment: Path) -> dict:
+    if experiment.name not in CHECKSUMS:
+        raise FileNotFoundError(f"No output in {experiment}")
+    return CHECKSUMS[experiment.name]
+
+
+def test_experiment_checksum_store(tmp_path):
+    experiments = [tmp_path / name for name in ["exp1", "exp2", "exp3", "exp4"]]
+    store = ExperimentChecksumStore(experiments, max_workers=2)
+
+    with patch.object(
+        experiment_comparison, "extract_experiment_checksums", side_effect=fake_extract
+    ) as mock_extract:
+        assert store.equivalence_classes() == [
+            [experiments[0], experiments[1], experiments[3]],
+            [experiments[2]],
+        ]
+        assert store.equivalent(experiments[0], experiments[1])
+        assert not store.equivalent(experiments[0], experiments[2])
+        assert store.checksums(experiments[2]) == CHECKSUMS["exp3"]
+
+    # Each experiment is only extracted once
+    assert sorted(call.args[0] for call in mock_extract.call_args_list) == experiments
+
+
+def test_experiment_checksum_store_errors(tmp_path):
+    experiments = [tmp_path / "exp1", tmp_path / "missing", tmp_path / "exp3"]
+    store = ExperimentChecksumStore(experiments)
+
+    with patch.object(
+        experiment_comparison, "extract_experiment_checksums", side_effect=fake_extract
+    ):
+        assert store.equivalence_classes() == [[experiments[0]], [experiments[2]]]
+        with pytest.raises(
+            RuntimeError, match="Error extracting checksums for missing"
+        ):
+            store.equivalent(experiments[0], experiments[1])
+        with pytest.raises(KeyError):
+            store.checksums(tmp_path / "other")
+
+
+def test_extract_experiment_checksums_read_only(tmp_path):
+    """Test extracting checksums doesn't write to the experiment archive"""
+    archive_path = tmp_path / "lab" / "archive" / "exp1"
+    (archive_path / "output000").mkdir(parents=True)
+    (archive_path / "output000" / "access-om2.out").write_text(
+        "[chksum] ht  1\n[chksum] ht  2\n"
+    )
+    experiment = tmp_path / "exp1"
+    experiment.mkdir()
+    (experiment / "archive").symlink_to(archive_path, target_is_directory=True)
+    with open(experiment / "config.yaml", "w") as f:
+        yaml.dump({"model": "access-om2"}, f)
+
+    checksums = extract_experiment_checksums(experiment)
+
+    assert checksums == {"ht": ["1", "2"]}
+    assert sorted(path.name for path in archive_path.iterdir()) == ["output000"]
@@ -0,0 +1,156 @@
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from model_config_tests.live_compare import (
+    LiveComparison,
+    OutputFollower,
+    format_live_divergence,
+)
+from model_config_tests.models.mom5 import parse_checksum_line
+
+# Stand-in for a running model, which writes a line with the timestep and
+# checksums of two fields every timestep. From the divergent timestep on,
+# the checksums of the "hu" field are changed
+FAKE_MODEL = """
+import sys
+import time
+
+path, n_steps, divergent_step, delay = sys.argv[1:]
+with open(path, "w") as f:
+    for step in range(int(n_steps)):
+        f.write(f"Timestep {step}\\n")
+        for field in ["ht", "hu"]:
+            checksum = 1000 * step + len(field)
+            if 0 <= int(divergent_step) <= step and field == "hu":
+                checksum = -checksum
+            f.write(f"[chksum] {field:<16}{checksum}\\n")
+        f.flush()
+        time.sleep(float(delay))
+"""
+
+
+def start_fake_model(path, n_steps, divergent_step=-1, delay=0.0):
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            FAKE_MODEL,
+            str(path),
+            str(n_steps),
+            str(divergent_step),
+            str(delay),
+        ]
+    )
+
+
+@pytest.fixture
+def fake_models():
+    processes = []
+
+    def start(*args, **kwargs):
+        process = start_fake_model(*args, **kwargs)
+        processes.append(process)
+        return process
+
+    yield start
+
+    for process in processes:
+        process.kill()
+        process.wait()
+
+
+def test_output_follower(tmp_path):
+    """Test only complete lines are read, including from a file that does
+    not exist yet and after the file is moved"""
+    output_file = tmp_path / "control" / "access-om2.out"
+    follower = OutputFollower(output_file, block_size=4)
+    assert list(follower.read_lines()) == []
+
+    output_file.parent.mkdir()
+    (tmp_path / "work").mkdir()
+    with open(output_file, "wb") as f:
+        f.write(b"[chksum] ht  12")
+        f.flush()
+        assert list(follower.read_lines()) == []
+
+        f.write(b"34\n\n[chksum] hu  5")
+        f.flush()
+        assert list(follower.read_lines()) == [b"[chksum] ht  1234", b""]
+
+        # payu moves the model stdout from the control directory to the
+        # work directory once the model has finished
+        output_file.rename(tmp_path / "work" / "access-om2.out")
+        f.write(b"6\nlast line")
+        f.flush()
+        assert list(follower.read_lines()) == [b"[chksum] hu  56"]
+        assert list(follower.read_lines(final=True)) == [b"last line"]
+
+    follower.close()
+
+
+def test_live_comparison_equal(tmp_path, fake_models):
+    expected = fake_models(tmp_path / "expected.out", n_steps=5)
+    produced = fake_models(tmp_path / "produced.out", n_steps=5)
+    expected.wait()
+    produced.wait()
+
+    comparison = LiveComparison(
+        tmp_path / "expected.out", tmp_path / "produced.out", parse_checksum_line
+    )
+    stop = threading.Event()
+    stop.set()
+    assert comparison.follow(stop, poll_interval=0.01) is None
+    assert comparison.n_compared == 10
+
+
+def test_live_comparison_reports_divergence_early(tmp_path, fake_models):
+    """Test divergence is reported while the fake models are still running"""
+    expected = fake_models(tmp_path / "expected.out", n_steps=1000, delay=0.01)
+    produced = fake_models(
+        tmp_path / "produced.out", n_steps=1000, divergent_step=2, delay=0.01
+    )
+
+    comparison = LiveComparison(
+        tmp_path / "expected.out", tmp_path / "produced.out", parse_checksum_line
+    )
+    # Stop following if the divergence is not found before the models finish
+    stop = threading.Event()
+    timer = threading.Timer(60, stop.set)
+    timer.start()
+    try:
+        report = comparison.follow(stop, poll_interval=0.01)
+    finally:
+        timer.cancel()
+
+    assert expected.poll() is None
+    assert produced.poll() is None
+    assert report == {
+        "record_index": 5,
+        "field": "hu",
+        "field_index": 2,
+        "expected": ["hu", "2002"],
+        "produced": ["hu", "-2002"],
+    }
+    assert format_live_divergence(report) == (
+        "checksum record 5 of hu (timestep index 2) is -2002, expected 2002"
+    )
+
+
+def test_live_comparison_different_fields(tmp_path):
+    (tmp_path / "expected.out").write_text("[chksum] ht  1\n[chksum] hu  2\n")
+    (tmp_path / "produced.out").write_text("[chksum] ht  1\n[chksum] htr  2\n")
+
+    comparison = LiveComparison(
+        tmp_path / "expected.out", tmp_path / "produced.out", parse_checksum_line
+    )
+    report = comparison.poll()
+    assert report["record_index"] == 1
+    assert format_live_divergence(report) == (
+        "checksum record 1 is htr 2, expected hu 2"
+    )
+    # The report is kept once the records have diverged
+    assert comparison.poll() is report
+    comparison.close()
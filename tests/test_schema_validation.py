@@ -0,0 +1,83 @@
+import copy
+from unittest.mock import patch
+
+import jsonschema
+import pytest
+from jsonschema.exceptions import SchemaError, ValidationError
+
+from model_config_tests.schema_validation import (
+    format_validation_report,
+    get_validator,
+    schema_digest,
+    validate,
+    validate_many,
+)
+
+SCHEMA = {
+    "$schema": "https://json-schema.org/draft/2020-12/schema",
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "keywords": {"type": "array", "items": {"type": "string"}},
+        "license": {"enum": ["CC-BY-4.0"]},
+    },
+}
+
+
+def test_schema_digest():
+    reordered = dict(reversed(list(SCHEMA.items())))
+    assert schema_digest(reordered) == schema_digest(SCHEMA)
+    assert schema_digest({**SCHEMA, "required": ["name"]}) != schema_digest(SCHEMA)
+
+
+def test_get_validator_reused():
+    """Test the schema is only checked once for schemas with the same
+    content"""
+    schema = copy.deepcopy(SCHEMA)
+    schema["title"] = "test_get_validator_reused"
+    with patch.object(
+        jsonschema.Draft202012Validator,
+        "check_schema",
+        wraps=jsonschema.Draft202012Validator.check_schema,
+    ) as mock_check_schema:
+        validator = get_validator(schema)
+        assert get_validator(dict(schema)) is validator
+    mock_check_schema.assert_called_once()
+
+    # Check changes to the schema passed in don't affect the validator
+    schema["properties"]["name"]["type"] = "integer"
+    assert validator.is_valid({"name": "test"})
+
+
+def test_get_validator_invalid_schema():
+    with pytest.raises(SchemaError):
+        get_validator({"type": "not-a-type"})
+
+
+def test_validate():
+    validate({"name": "test", "keywords": ["ocean"]}, SCHEMA)
+
+    with pytest.raises(ValidationError, match="1 is not of type 'string'"):
+        validate({"name": 1}, SCHEMA)
+
+
+def test_validate_many():
+    report = validate_many(
+        {
+            "valid/metadata.yaml": {"name": "test"},
+            "invalid/metadata.yaml": {
+                "name": 1,
+                "keywords": ["ocean", 2],
+                "license": "MIT",
+            },
+        },
+        SCHEMA,
+    )
+
+    assert list(report) == ["invalid/metadata.yaml"]
+    assert len(report["invalid/metadata.yaml"]) == 3
+
+    formatted = format_validation_report(report)
+    assert formatted.splitlines()[0] == "invalid/metadata.yaml: 3 validation error(s)"
+    assert "  keywords/1: 2 is not of type 'string'" in formatted
+    assert "  license: 'MIT' is not one of ['CC-BY-4.0']" in formatted
@@ -1,12 +1,21 @@
 import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import Mock, patch
 
 import pytest
 
 from model_config_tests.util import (
+    DirectoryReaper,
     JobInfoCache,
+    QsubJobTracker,
+    clone_tree,
     extract_job_info,
-    qstat_all_jobs,
+    iter_lines_with_prefix,
+    job_output_exit_status,
+    qstat_jobs,
     wait_for_qsub,
 )
 
@@ -55,24 +64,40 @@ def job_info_cache():
     cache.clear()
 
 
-def test_qstat_all_jobs():
-    """Test qstat query for all jobs"""
+def test_qstat_jobs():
+    """Test qstat query for given jobs only keeps the required fields"""
     example_output = json.dumps(TEST_QSTAT_JSON)
     with patch("subprocess.run") as mock_run:
-        # Patch the subprocess.run stdout to return the example output
         example_result = Mock()
         example_result.stdout = example_output
         mock_run.return_value = example_result
 
-        result = qstat_all_jobs()
-        assert result == TEST_QSTAT_JSON
+        result = qstat_jobs(["12345.gadi-pbs", "67890.gadi-pbs"])
         mock_run.assert_called_once_with(
-            ["qstat", "-x", "-f", "-F", "json"],
+            ["qstat", "-x", "-f", "-F", "json", "12345.gadi-pbs", "67890.gadi-pbs"],
             capture_output=True,
             text=True,
-            check=True,
         )
 
+    assert result["timestamp"] == TEST_QSTAT_JSON["timestamp"]
+    assert result["Jobs"] == {
+        "12345.gadi-pbs": {"job_state": "F", "Exit_status": 0},
+        "67890.gadi-pbs": {"job_state": "Q"},
+    }
+    assert extract_job_info(result) == extract_job_info(TEST_QSTAT_JSON)
+
+
+def test_qstat_jobs_no_output():
+    """Test qstat query raises an error if no job information is output"""
+    with patch("subprocess.run") as mock_run:
+        example_result = Mock()
+        example_result.stdout = ""
+        example_result.stderr = "qstat: Unknown Job Id 9999.gadi-pbs"
+        mock_run.return_value = example_result
+
+        with pytest.raises(RuntimeError, match="Unknown Job Id 9999.gadi-pbs"):
+            qstat_jobs(["9999.gadi-pbs"])
+
 
 def test_extract_job_info():
     """Test extracting job info from qstat output"""
@@ -87,12 +112,12 @@ def test_wait_for_qsub_job_found_in_cache(job_info_cache):
     """Test wait_for_qsub when job is found in cache."""
     job_info_cache.set({"5678": {"job_state": "F"}})
     with (
-        patch("model_config_tests.util.qstat_all_jobs") as mock_qstat_all_jobs,
+        patch("model_config_tests.util.qstat_jobs") as mock_qstat_jobs,
         patch("time.sleep") as mock_sleep,
     ):
-        mock_qstat_all_jobs.return_value = TEST_QSTAT_JSON
+        mock_qstat_jobs.return_value = TEST_QSTAT_JSON
         result = wait_for_qsub("5678")
-        mock_qstat_all_jobs.assert_not_called()
+        mock_qstat_jobs.assert_not_called()
         mock_sleep.assert_not_called()
 
     assert result == {"job_state": "F"}
@@ -101,26 +126,26 @@ def test_wait_for_qsub_job_found_in_cache(job_info_cache):
 def test_wait_for_qsub_job_not_found(job_info_cache):
     """Test wait_for_qsub when job is not found in cache."""
     with (
-        patch("model_config_tests.util.qstat_all_jobs") as mock_qstat_all_jobs,
+        patch("model_config_tests.util.qstat_jobs") as mock_qstat_jobs,
         patch("time.sleep") as mock_sleep,
     ):
-        mock_qstat_all_jobs.return_value = TEST_QSTAT_JSON
+        mock_qstat_jobs.return_value = TEST_QSTAT_JSON
 
         with pytest.raises(RuntimeError, match="Job ID 9999 not found in qstat output"):
             wait_for_qsub("9999")
 
-        mock_qstat_all_jobs.assert_called()
+        mock_qstat_jobs.assert_called()
         mock_sleep.assert_called()
 
 
 def test_wait_for_qsub_job_completes(job_info_cache):
     """Test wait_for_qsub when job completes after waiting."""
     with (
-        patch("model_config_tests.util.qstat_all_jobs") as mock_qstat_all_jobs,
+        patch("model_config_tests.util.qstat_jobs") as mock_qstat_jobs,
         patch("time.sleep") as mock_sleep,
     ):
         # Simulate job not found initially, then found and completed
-        mock_qstat_all_jobs.side_effect = [
+        mock_qstat_jobs.side_effect = [
             {"Jobs": {"1234": {"job_state": "R"}}},  # First call
             {"Jobs": {"1234": {"job_state": "F"}}},  # Second call
         ]
@@ -128,5 +153,415 @@ def test_wait_for_qsub_job_completes(job_info_cache):
         result = wait_for_qsub("1234")
         assert result["job_state"] == "F"
 
-        mock_qstat_all_jobs.assert_called()
+        mock_qstat_jobs.assert_called()
         mock_sleep.assert_called()
+
+
+# End of a PBS job stdout file, with the resource usage summary
+JOB_STDOUT = """payu: Model exited successfully.
+======================================================================================
+                  Resource Usage on 2025-03-27 18:10:40:
+   Job Id:             1234.gadi-pbs
+   Exit Status:        0
+   Service Units:      13.23
+======================================================================================
+"""
+
+
+@pytest.fixture
+def fake_qstat(tmp_path, monkeypatch):
+    """Fixture to put a fake qstat script on PATH. Each call of the script
+    returns the next job state from the states file, and logs the call"""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    states_file = tmp_path / "qstat_states.json"
+    calls_file = tmp_path / "qstat_calls.log"
+
+    script = bin_dir / "qstat"
+    script.write_text(
+        f"""#!{sys.executable}
+import json
+with open({str(states_file)!r}) as f:
+    states = json.load(f)
+state = states.pop(0) if len(states) > 1 else states[0]
+with open({str(states_file)!r}, "w") as f:
+    json.dump(states, f)
+with open({str(calls_file)!r}, "a") as f:
+    f.write("called\\n")
+print(json.dumps({{"Jobs": {{"1234.gadi-pbs": {{"job_state": state}}}}}}))
+"""
+    )
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+    def set_states(states):
+        states_file.write_text(json.dumps(states))
+
+    def n_calls():
+        return len(calls_file.read_text().splitlines()) if calls_file.exists() else 0
+
+    return set_states, n_calls
+
+
+def test_wait_for_qsub_backoff(job_info_cache, fake_qstat):
+    """Test qstat polling interval grows towards the maximum interval"""
+    set_states, n_calls = fake_qstat
+    set_states(["Q", "R", "R", "R", "R", "F"])
+
+    with patch("time.sleep") as mock_sleep:
+        result = wait_for_qsub(
+            "1234.gadi-pbs", initial_interval=10, max_interval=60, backoff_factor=2
+        )
+
+    assert result["job_state"] == "F"
+    assert n_calls() == 6
+    sleeps = [call.args[0] for call in mock_sleep.call_args_list]
+    assert sleeps == [10, 20, 40, 60, 60, 60]
+
+
+def test_wait_for_qsub_output_files(job_info_cache, fake_qstat, tmp_path):
+    """Test job output files in the control directory are used as a
+    completion signal, without waiting for the next qstat query"""
+    set_states, n_calls = fake_qstat
+    set_states(["R"])
+    control_path = tmp_path / "control"
+    control_path.mkdir()
+
+    def sleep(seconds):
+        # Simulate PBS copying the job output files after the job finishes
+        if mock_sleep.call_count == 3:
+            (control_path / "test_jobname.o1234").write_text(JOB_STDOUT)
+            (control_path / "test_jobname.e1234").touch()
+
+    with patch("time.sleep", side_effect=sleep) as mock_sleep:
+        result = wait_for_qsub(
+            "1234.gadi-pbs",
+            control_path=control_path,
+            initial_interval=10,
+            file_poll_interval=5,
+        )
+
+    assert result == {"job_state": "F", "Exit_status": 0}
+    # Only one qstat query was made, after the initial interval
+    assert n_calls() == 1
+    sleeps = [call.args[0] for call in mock_sleep.call_args_list]
+    assert sleeps == [5, 5, 5]
+
+
+def test_wait_for_qsub_partial_output_file(job_info_cache, fake_qstat, tmp_path):
+    """Test a job stdout file that is still being copied, without the exit
+    status, is not treated as the job having finished"""
+    set_states, n_calls = fake_qstat
+    set_states(["R", "F"])
+    control_path = tmp_path / "control"
+    control_path.mkdir()
+    (control_path / "test_jobname.o1234").write_text(
+        JOB_STDOUT[: JOB_STDOUT.index("Exit Status")]
+    )
+    (control_path / "test_jobname.e1234").touch()
+
+    with patch("time.sleep") as mock_sleep:
+        result = wait_for_qsub(
+            "1234.gadi-pbs",
+            control_path=control_path,
+            initial_interval=10,
+            file_poll_interval=5,
+        )
+
+    # Finished by qstat rather than the output files
+    assert result["job_state"] == "F"
+    assert n_calls() == 2
+    assert mock_sleep.call_count == 6
+
+
+def test_job_output_exit_status(tmp_path):
+    """Test the exit status is only returned once both output files are
+    written, including the exit status in the stdout file"""
+    assert job_output_exit_status(tmp_path, "1234.gadi-pbs") is None
+    (tmp_path / "test_jobname.e1234").touch()
+    stdout_file = tmp_path / "test_jobname.o1234"
+    stdout_file.write_text(JOB_STDOUT[: JOB_STDOUT.index("Exit Status")])
+    assert job_output_exit_status(tmp_path, "1234.gadi-pbs") is None
+
+    stdout_file.write_text(
+        JOB_STDOUT.replace("Exit Status:        0", "Exit Status:        1")
+    )
+    assert job_output_exit_status(tmp_path, "1234.gadi-pbs") == 1
+    assert job_output_exit_status(tmp_path, "5678.gadi-pbs") is None
+
+
+def fake_qstat_jobs(job_states):
+    """Return a fake qstat_jobs that logs the queried job IDs, and reports
+    each job as running until it has been queried its given number of times"""
+    calls = []
+
+    def qstat_jobs(job_ids):
+        calls.append(sorted(job_ids))
+        jobs = {}
+        for job_id in job_ids:
+            if job_id in job_states:
+                n_queries = sum(job_id in call for call in calls)
+                finished = n_queries >= job_states[job_id]
+                jobs[job_id] = {"job_state": "F" if finished else "R"}
+        return {"Jobs": jobs}
+
+    return qstat_jobs, calls
+
+
+def test_qsub_job_tracker_batches_jobs(job_info_cache):
+    """Test all outstanding jobs are queried in one qstat call, and jobs
+    finish in the order they complete"""
+    qstat_jobs, calls = fake_qstat_jobs({"1.gadi-pbs": 3, "2.gadi-pbs": 1})
+    tracker = QsubJobTracker(initial_interval=0.05, max_interval=0.05)
+    finished = []
+
+    def wait(job_id):
+        result = tracker.wait(job_id)
+        finished.append(job_id)
+        return result
+
+    with (
+        patch("model_config_tests.util.qstat_jobs", side_effect=qstat_jobs),
+        ThreadPoolExecutor(max_workers=2) as executor,
+    ):
+        futures = [
+            executor.submit(wait, job_id) for job_id in ["1.gadi-pbs", "2.gadi-pbs"]
+        ]
+        results = [future.result(timeout=10) for future in futures]
+
+    assert all(result["job_state"] == "F" for result in results)
+    assert finished == ["2.gadi-pbs", "1.gadi-pbs"]
+    assert calls == [
+        ["1.gadi-pbs", "2.gadi-pbs"],
+        ["1.gadi-pbs"],
+        ["1.gadi-pbs"],
+    ]
+    # Check job info cache is updated with the latest job states
+    assert job_info_cache.get()["1.gadi-pbs"]["job_state"] == "F"
+
+
+def test_qsub_job_tracker_output_files(job_info_cache, tmp_path):
+    """Test job output files finish a job before it is reported by qstat"""
+    qstat_jobs, calls = fake_qstat_jobs({"1234.gadi-pbs": 100})
+    tracker = QsubJobTracker(
+        initial_interval=10, max_interval=10, file_poll_interval=0.01
+    )
+
+    def write_output_files():
+        (tmp_path / "test_jobname.o1234").write_text(JOB_STDOUT)
+        (tmp_path / "test_jobname.e1234").touch()
+
+    timer = threading.Timer(0.1, write_output_files)
+    with patch("model_config_tests.util.qstat_jobs", side_effect=qstat_jobs):
+        timer.start()
+        result = tracker.wait("1234.gadi-pbs", control_path=tmp_path)
+        timer.join()
+
+    assert result == {"job_state": "F", "Exit_status": 0}
+    assert calls == []
+
+
+def test_qsub_job_tracker_partial_output_file(job_info_cache, tmp_path):
+    """Test a job stdout file without the exit status doesn't finish a job"""
+    qstat_jobs, calls = fake_qstat_jobs({"1234.gadi-pbs": 2})
+    tracker = QsubJobTracker(
+        initial_interval=0.05, max_interval=0.05, file_poll_interval=0.01
+    )
+    (tmp_path / "test_jobname.o1234").write_text(
+        JOB_STDOUT[: JOB_STDOUT.index("Exit Status")]
+    )
+    (tmp_path / "test_jobname.e1234").touch()
+
+    with patch("model_config_tests.util.qstat_jobs", side_effect=qstat_jobs):
+        result = tracker.wait("1234.gadi-pbs", control_path=tmp_path)
+
+    # Finished by qstat rather than the output files
+    assert result == {"job_state": "F", "Exit_status": None}
+    assert len(calls) == 2
+
+
+def test_qsub_job_tracker_qstat_retry(job_info_cache):
+    """Test failed qstat queries are retried, and jobs are only failed after
+    repeated failures"""
+    qstat_jobs, calls = fake_qstat_jobs({"1.gadi-pbs": 2})
+    results = [RuntimeError("qstat command failed"), None, None]
+
+    def flaky_qstat_jobs(job_ids):
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return qstat_jobs(job_ids)
+
+    tracker = QsubJobTracker(initial_interval=0.01, max_interval=0.01)
+    with patch("model_config_tests.util.qstat_jobs", side_effect=flaky_qstat_jobs):
+        assert tracker.wait("1.gadi-pbs")["job_state"] == "F"
+    assert results == []
+
+    tracker = QsubJobTracker(
+        initial_interval=0.01, max_interval=0.01, max_qstat_failures=3
+    )
+    failing = Mock(side_effect=RuntimeError("qstat command failed"))
+    with patch("model_config_tests.util.qstat_jobs", failing):
+        with pytest.raises(RuntimeError, match="qstat command failed"):
+            tracker.wait("2.gadi-pbs")
+    assert failing.call_count == 3
+
+
+def test_qsub_job_tracker_job_not_found(job_info_cache):
+    """Test an error is raised only for the job missing from qstat output"""
+    qstat_jobs, _ = fake_qstat_jobs({"1.gadi-pbs": 1})
+    tracker = QsubJobTracker(initial_interval=0.01)
+
+    with (
+        patch("model_config_tests.util.qstat_jobs", side_effect=qstat_jobs),
+        ThreadPoolExecutor(max_workers=2) as executor,
+    ):
+        found = executor.submit(tracker.wait, "1.gadi-pbs")
+        missing = executor.submit(tracker.wait, "9999.gadi-pbs")
+
+        assert found.result(timeout=10)["job_state"] == "F"
+        with pytest.raises(RuntimeError, match="Job ID 9999.gadi-pbs not found"):
+            missing.result(timeout=10)
+
+
+def test_qsub_job_tracker_close(job_info_cache):
+    """Test closing the tracker stops all waiting threads"""
+    qstat_jobs, _ = fake_qstat_jobs({})
+    tracker = QsubJobTracker(initial_interval=10)
+
+    with (
+        patch("model_config_tests.util.qstat_jobs", side_effect=qstat_jobs),
+        ThreadPoolExecutor(max_workers=2) as executor,
+    ):
+        futures = [
+            executor.submit(tracker.wait, job_id)
+            for job_id in ["1.gadi-pbs", "2.gadi-pbs"]
+        ]
+        threading.Timer(0.1, tracker.close).start()
+
+        for future in futures:
+            with pytest.raises(RuntimeError, match="Stopped waiting for job ID"):
+                future.result(timeout=10)
+
+
+@pytest.mark.parametrize("block_size", [1, 3, 16, 1024])
+def test_iter_lines_with_prefix(tmp_path, block_size):
+    """Test prefixed lines are found across block boundaries"""
+    filename = tmp_path / "example.out"
+    filename.write_bytes(
+        b"[match] first\n"
+        b"no match\n"
+        b"not at start [match]\n"
+        b"\n"
+        b"[match] second\r\n"
+        b"[match] last line without newline"
+    )
+
+    lines = list(iter_lines_with_prefix(filename, b"[match]", block_size=block_size))
+
+    assert lines == [
+        b"[match] first",
+        b"[match] second\r",
+        b"[match] last line without newline",
+    ]
+
+
+@pytest.fixture
+def config_tree(tmp_path):
+    """Fixture for a configuration with small and large, mutable, writable
+    and read-only files, and a symlink"""
+    config = tmp_path / "config"
+    (config / "manifests").mkdir(parents=True)
+    (config / "ocean").mkdir()
+    (config / "config.yaml").write_text("model: access-om2\n")
+    (config / "manifests" / "input.yaml").write_bytes(b"a" * 2048)
+    (config / "ocean" / "input.nml").write_text("&ocean_nml\n/\n")
+    (config / "ocean" / "diag_table").write_text("diag table\n")
+    (config / "ocean" / "forcing.nc").write_bytes(b"\0" * 4096)
+    (config / "ocean" / "forcing.nc").chmod(0o444)
+    (config / "ocean" / "grid_spec.nc").write_bytes(b"\1" * 4096)
+    (config / "INPUT").symlink_to(tmp_path / "inputs")
+    return config
+
+
+def test_clone_tree(config_tree, tmp_path):
+    """Test only large read-only files are hardlinked if reflinks aren't
+    supported, and mutable and writable files are copied"""
+    clone = tmp_path / "clone"
+    with patch("model_config_tests.util.reflink_file", return_value=False):
+        counts = clone_tree(config_tree, clone, hardlink_min_size=1024)
+
+    assert counts == {"reflink": 0, "hardlink": 1, "copy": 5}
+    assert (clone / "INPUT").is_symlink()
+    assert os.readlink(clone / "INPUT") == os.readlink(config_tree / "INPUT")
+
+    src_files = sorted(path.relative_to(config_tree) for path in config_tree.rglob("*"))
+    assert src_files == sorted(path.relative_to(clone) for path in clone.rglob("*"))
+
+    def same_inode(relative_path):
+        return (config_tree / relative_path).stat().st_ino == (
+            clone / relative_path
+        ).stat().st_ino
+
+    assert same_inode("ocean/forcing.nc")
+    for relative_path in [
+        "config.yaml",
+        "manifests/input.yaml",
+        "ocean/input.nml",
+        "ocean/diag_table",
+        "ocean/grid_spec.nc",
+    ]:
+        assert not same_inode(relative_path)
+
+    # Check modifying a cloned mutable file in place doesn't change the source
+    with open(clone / "manifests" / "input.yaml", "w") as f:
+        f.write("modified")
+    assert (config_tree / "manifests" / "input.yaml").read_bytes() == b"a" * 2048
+
+    # Check writing to a large writable file in place doesn't change the source
+    with open(clone / "ocean" / "grid_spec.nc", "r+b") as f:
+        f.write(b"modified")
+    assert (config_tree / "ocean" / "grid_spec.nc").read_bytes() == b"\1" * 4096
+
+
+def test_clone_tree_hardlink_unsupported(config_tree, tmp_path):
+    """Test falling back to copies when hardlinks fail"""
+    clone = tmp_path / "clone"
+    with (
+        patch("model_config_tests.util.reflink_file", return_value=False),
+        patch("os.link", side_effect=OSError(18, "Invalid cross-device link")),
+    ):
+        counts = clone_tree(config_tree, clone, hardlink_min_size=1024)
+
+    assert counts == {"reflink": 0, "hardlink": 0, "copy": 6}
+    assert (clone / "ocean" / "forcing.nc").read_bytes() == b"\0" * 4096
+
+
+def test_directory_reaper(tmp_path):
+    """Test directories are moved to the trash, and deleted on reap"""
+    trash_path = tmp_path / "lab" / ".trash"
+    archive_path = tmp_path / "lab" / "archive" / "exp"
+    (archive_path / "output000").mkdir(parents=True)
+    (archive_path / "output000" / "ocean.nc").write_bytes(b"data")
+
+    reaper = DirectoryReaper(trash_path)
+    # Block background deletion until the trash has been checked
+    with patch("model_config_tests.util._remove_path") as mock_remove_path:
+        reaper.trash(archive_path)
+        reaper.trash(tmp_path / "lab" / "work" / "missing")
+
+        # Check the original path can be reused straight away
+        assert not archive_path.exists()
+        trashed = list(trash_path.iterdir())
+        assert len(trashed) == 1
+        assert trashed[0].name.startswith("exp-")
+        assert (trashed[0] / "output000" / "ocean.nc").exists()
+        with pytest.warns(UserWarning, match="Failed to delete all directories"):
+            reaper.reap()
+        mock_remove_path.assert_called_once_with(trashed[0])
+
+    # Check leftovers from a previous session are deleted
+    reaper = DirectoryReaper(trash_path)
+    reaper.reap_leftovers()
+    reaper.reap()
+    assert not trash_path.exists()